@@ -0,0 +1,125 @@
+# broadcast.py
+import asyncio
+import time
+
+SEND_TIMEOUT = 1.0 # Seconds a single send may take before it counts as a timeout
+MAX_LAG = 5.0 # Seconds a client may stay behind the newest state before it is evicted
+EVICT_CLOSE_CODE = 1013 # "Try again later"
+
+
+class Outbox:
+    """Outbound slot for one websocket that only ever holds the newest payload.
+
+    A dedicated writer task drains the slot, so a slow client only delays itself and a
+    burst of updates collapses into a single send of the latest state.
+    """
+
+    def __init__(self, websocket, welcome=None, send_timeout=SEND_TIMEOUT, max_lag=MAX_LAG, latency=None):
+        self.websocket = websocket
+        self.latency = latency # Histogram (api/metrics.py) of offer-to-delivered time, or None
+        self.send_timeout = send_timeout
+        self.max_lag = max_lag
+        self.pending = welcome
+        self.behind_since = time.monotonic() if welcome is not None else None # When the oldest undelivered update was offered
+        self.pending_since = self.behind_since # When the payload now waiting in the slot was offered (the first one coalesced into it)
+        self.wakeup = asyncio.Event()
+        if welcome is not None:
+            self.wakeup.set()
+        self.sent = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.evicted = False
+        self.task = asyncio.create_task(self.run())
+
+    @property
+    def depth(self):
+        return 0 if self.pending is None else 1
+
+    def offer(self, payload):
+        if self.evicted:
+            return
+        if self.pending is not None:
+            self.coalesced += 1
+        else:
+            self.pending_since = time.monotonic()
+            if self.behind_since is None:
+                self.behind_since = self.pending_since
+        self.pending = payload
+        self.wakeup.set()
+
+    async def run(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            if self.pending is None:
+                continue
+            payload, self.pending = self.pending, None
+            offered = self.behind_since
+            try:
+                await asyncio.wait_for(self.websocket.send_json(payload), self.send_timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                if self.pending is None: # Nothing newer arrived - retry this payload on the next wakeup
+                    self.pending = payload
+                    self.pending_since = offered
+                self.wakeup.set()
+                if time.monotonic() - self.behind_since > self.max_lag:
+                    await self.evict()
+                    return
+                continue
+            except Exception:
+                return # Socket is gone - the endpoint's receive loop cleans up
+            self.sent += 1
+            if self.latency is not None:
+                self.latency.observe(time.monotonic() - offered)
+            self.behind_since = None if self.pending is None else self.pending_since # Behind since the waiting payload was offered, not since now
+
+    async def evict(self):
+        self.evicted = True
+        self.pending = None
+        try:
+            await asyncio.wait_for(self.websocket.close(code=EVICT_CLOSE_CODE), self.send_timeout)
+        except Exception:
+            pass
+
+    def stop(self):
+        self.task.cancel()
+
+
+class Broadcaster:
+    """Fans the latest state out to a set of websockets without awaiting any of them."""
+
+    def __init__(self, send_timeout=SEND_TIMEOUT, max_lag=MAX_LAG, latency=None):
+        self.send_timeout = send_timeout
+        self.max_lag = max_lag
+        self.latency = latency
+        self.outboxes = {}
+        self.evictions = 0
+
+    def add(self, websocket, welcome=None):
+        # welcome is delivered first and is never coalesced away (e.g. a client's own user id)
+        outbox = Outbox(websocket, welcome, self.send_timeout, self.max_lag, self.latency)
+        self.outboxes[websocket] = outbox
+        return outbox
+
+    def remove(self, websocket):
+        outbox = self.outboxes.pop(websocket, None)
+        if outbox is not None:
+            if outbox.evicted:
+                self.evictions += 1
+            outbox.stop()
+
+    def publish(self, payload, exclude=None):
+        for websocket, outbox in self.outboxes.items():
+            if websocket is not exclude:
+                outbox.offer(payload)
+
+    def stats(self):
+        return {
+            "connections": len(self.outboxes),
+            "queue_depth": sum(outbox.depth for outbox in self.outboxes.values()),
+            "sent": sum(outbox.sent for outbox in self.outboxes.values()),
+            "coalesced": sum(outbox.coalesced for outbox in self.outboxes.values()),
+            "timeouts": sum(outbox.timeouts for outbox in self.outboxes.values()),
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,189 @@
+# controls.py
+# Controller input for /ws/robotcontrol.
+#
+# Binary frame (little endian, 13 bytes) sent by JoyStickController.vue:
+#   uint8  frame type   (JOYSTICK_FRAME_TYPE)
+#   uint8  user id
+#   uint16 sequence     (wraps at 65536)
+#   uint32 timestamp    (client clock, ms, wraps)
+#   int16  x, y         (joystick position * AXIS_SCALE, -1.0..1.0)
+#   uint8  buttons      (bitmask, see BUTTONS)
+#
+# Old clients still send JSON text frames ({"type": "joystick", "joystick": "x: 0.12, y: -0.40"} and
+# {"type": "buttons", "buttons": ["A"]}); both formats end up as the same input dict.
+import json
+import math
+import socket
+import struct
+import time
+
+JOYSTICK_FRAME = struct.Struct("<BBHIhhB")
+JOYSTICK_FRAME_TYPE = 1
+AXIS_SCALE = 32767
+BUTTONS = ("A", "B", "X", "Y") # Bit 0 = A, bit 1 = B, ...
+SEQUENCE_MODULO = 1 << 16
+
+# Local UDP bridge into the pygame simulation - must match BRIDGE_FRAME in simulation/input_bridge.py
+BRIDGE_ADDRESS = ("127.0.0.1", 8023)
+BRIDGE_FRAME = struct.Struct("<BBHIhhBBd")
+
+
+def new_input(user_id):
+    return {"userid": user_id, "seq": None, "timestamp": None, "x": 0.0, "y": 0.0, "buttons": 0}
+
+
+def buttons_to_mask(labels):
+    mask = 0
+    for label in labels:
+        if label in BUTTONS:
+            mask |= 1 << BUTTONS.index(label)
+    return mask
+
+
+def mask_to_buttons(mask):
+    return [label for i, label in enumerate(BUTTONS) if mask & (1 << i)]
+
+
+def encode_joystick_frame(user_id, seq, timestamp, x, y, buttons):
+    # Mirror of the client encoder - used by tools and the load tester
+    return JOYSTICK_FRAME.pack(
+        JOYSTICK_FRAME_TYPE,
+        user_id,
+        seq % SEQUENCE_MODULO,
+        int(timestamp) & 0xFFFFFFFF,
+        max(-AXIS_SCALE, min(AXIS_SCALE, round(x * AXIS_SCALE))),
+        max(-AXIS_SCALE, min(AXIS_SCALE, round(y * AXIS_SCALE))),
+        buttons,
+    )
+
+
+def decode_joystick_frame(data):
+    if len(data) != JOYSTICK_FRAME.size:
+        raise ValueError(f"Joystick frame must be {JOYSTICK_FRAME.size} bytes, got {len(data)}")
+    frame_type, user_id, seq, timestamp, x, y, buttons = JOYSTICK_FRAME.unpack(data)
+    if frame_type != JOYSTICK_FRAME_TYPE:
+        raise ValueError(f"Unknown frame type {frame_type}")
+    return {"userid": user_id, "seq": seq, "timestamp": timestamp, "x": x / AXIS_SCALE, "y": y / AXIS_SCALE, "buttons": buttons}
+
+
+def decode_text_frame(text):
+    # Any JSON text frame must be an object - anything else is malformed, like a bad binary frame
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError(f"Text frame must be a JSON object, got {type(data).__name__}")
+    return data
+
+
+def parse_axis(text):
+    # "x: 0.12" -> 0.12, clamped to the stick's range like a binary frame
+    value = float(text.split(":")[1])
+    if not math.isfinite(value):
+        raise ValueError(f"Bad joystick axis {value!r}")
+    return max(-1.0, min(1.0, value))
+
+
+def parse_text_message(data, latest_inputs):
+    # Legacy JSON protocol - each message only carries the joystick or the buttons, so merge into the user's previous input
+    user_id = data.get("userid")
+    if user_id is not None and (not isinstance(user_id, int) or isinstance(user_id, bool) or not 0 <= user_id <= 0xFF):
+        raise ValueError(f"Bad user id {user_id!r}")
+    controller_input = dict(latest_inputs.get(user_id))
+    controller_input["seq"] = None
+    controller_input["timestamp"] = None
+    if data.get("type") == "joystick":
+        position = data.get("joystick", "")
+        if not isinstance(position, str):
+            raise ValueError(f"Bad joystick position {position!r}")
+        if position.startswith("x:"):
+            x_part, y_part = position.split(",")
+            controller_input["x"] = parse_axis(x_part)
+            controller_input["y"] = parse_axis(y_part)
+        elif position in ("Ended", "Idle"):
+            controller_input["x"] = 0.0
+            controller_input["y"] = 0.0
+    elif data.get("type") == "buttons":
+        buttons = data.get("buttons", [])
+        if not isinstance(buttons, list):
+            raise ValueError(f"Bad buttons {buttons!r}")
+        controller_input["buttons"] = buttons_to_mask(buttons)
+    else:
+        raise ValueError(f"Unknown message type {data.get('type')!r}")
+    return controller_input
+
+
+def is_newer(seq, last_seq):
+    # Sequence numbers wrap, so compare on the circle - anything up to half the range ahead counts as newer
+    if seq is None or last_seq is None:
+        return True
+    return 0 < (seq - last_seq) % SEQUENCE_MODULO < SEQUENCE_MODULO // 2
+
+
+class LatestInputs:
+    """Latest controller input per user - newer frames overwrite older ones, so a tick only ever sees the newest state."""
+
+    def __init__(self):
+        self.inputs = {}
+        self.superseded = {} # Frames overwritten before anyone read them
+        self.out_of_order = {} # Frames dropped because a newer sequence number had already arrived
+        self.unread = set()
+
+    def get(self, user_id):
+        return self.inputs.get(user_id) or new_input(user_id)
+
+    def update(self, controller_input):
+        user_id = controller_input["userid"]
+        previous = self.inputs.get(user_id)
+        if previous is not None and not is_newer(controller_input["seq"], previous["seq"]):
+            self.out_of_order[user_id] = self.out_of_order.get(user_id, 0) + 1
+            return False
+        if user_id in self.unread:
+            self.superseded[user_id] = self.superseded.get(user_id, 0) + 1
+        self.inputs[user_id] = controller_input
+        self.unread.add(user_id)
+        return True
+
+    def snapshot(self):
+        # Called once per tick - the newest input for every user
+        self.unread.clear()
+        return dict(self.inputs)
+
+    def remove(self, user_id):
+        self.inputs.pop(user_id, None)
+        self.unread.discard(user_id)
+
+
+class InputBridgeSender:
+    """Forwards every accepted controller input to the simulation over local UDP.
+
+    sendto() on a local datagram socket never waits for the receiver, so this is safe to call
+    from the event loop; if the simulation is not running the datagrams are simply dropped.
+    """
+
+    def __init__(self, address=BRIDGE_ADDRESS):
+        self.address = address
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sent = 0
+        self.errors = 0
+
+    def send(self, controller_input, active=True):
+        frame = BRIDGE_FRAME.pack(
+            JOYSTICK_FRAME_TYPE,
+            controller_input["userid"] or 0,
+            (controller_input["seq"] or 0) % SEQUENCE_MODULO,
+            (controller_input["timestamp"] or 0) & 0xFFFFFFFF,
+            max(-AXIS_SCALE, min(AXIS_SCALE, round(controller_input["x"] * AXIS_SCALE))),
+            max(-AXIS_SCALE, min(AXIS_SCALE, round(controller_input["y"] * AXIS_SCALE))),
+            controller_input["buttons"],
+            1 if active else 0,
+            time.time(),
+        )
+        try:
+            self.sock.sendto(frame, self.address)
+            self.sent += 1
+        except OSError: # Buffer full or nothing listening - input is latest-value, the next frame replaces it
+            self.errors += 1
+
+    def release(self, user_id):
+        # Phone disconnected - the simulation hands the robot back to the AI
+        self.send(new_input(user_id), active=False)
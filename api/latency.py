@@ -0,0 +1,165 @@
+# latency.py
+# Round-trip and input-age instrumentation for /ws/mobile and /ws/robotcontrol.
+#
+# Every PING_INTERVAL the server sends {"type": "ping", "id": n, "server": <server ms>} and the client answers
+# {"type": "pong", "id": n, "server": <echoed>, "client": <client ms>} (performance.now()). The round trip gives the
+# RTT, and the client stamp half an RTT after the ping gives the offset between the two clocks, which turns the
+# client timestamp in every joystick frame (and in mobile messages that carry "t") into a one-way input age.
+# Sequence numbers (the joystick frame's, "seq" on mobile messages) are checked for gaps, reorders and duplicates.
+#
+# Samples go into fixed-size rolling windows; histograms and percentiles are only computed when someone asks
+# (GET /latency, /ws/tv/debug for pages/tv/debug.vue).
+import asyncio
+import itertools
+import math
+import time
+from collections import deque
+
+PING_INTERVAL = 1.0 # Seconds between pings
+LATENCY_SAMPLES = 600 # Rolling window per metric and connection
+OFFSET_SAMPLES = 10 # Clock offset comes from the lowest-RTT pong among the last few
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+TIMESTAMP_MODULO = 1 << 32 # Client timestamps are uint32 milliseconds
+SEQUENCE_MODULO = 1 << 16
+
+
+def now_ms():
+    return time.monotonic() * 1000
+
+
+def _signed(value, modulo):
+    value %= modulo
+    return value - modulo if value >= modulo // 2 else value
+
+
+def summarize(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    histogram = {}
+    bucket = 0
+    for bound in HISTOGRAM_BUCKETS_MS:
+        count = 0
+        while bucket < len(ordered) and ordered[bucket] <= bound:
+            count += 1
+            bucket += 1
+        histogram[f"le_{bound}"] = count
+    histogram["inf"] = len(ordered) - bucket
+    return {
+        "samples": len(ordered),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p90_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))],
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        "max_ms": ordered[-1],
+        "histogram": histogram,
+    }
+
+
+class ConnectionLatency:
+    """Latency and ordering statistics for one websocket."""
+
+    def __init__(self, connection_id, endpoint, room_id):
+        self.connection_id = connection_id
+        self.endpoint = endpoint
+        self.room_id = room_id
+        self.user_id = None
+        self.connected_at = time.time()
+        self.rtt = deque(maxlen=LATENCY_SAMPLES)
+        self.input_age = deque(maxlen=LATENCY_SAMPLES)
+        self.offsets = deque(maxlen=OFFSET_SAMPLES) # (rtt, client clock - server clock)
+        self.offset = None
+        self.pings_sent = 0
+        self.pongs = 0
+        self.messages = 0
+        self.last_seq = None
+        self.gaps = 0 # Sequence numbers skipped when a newer message arrived (one that turns up later is also a reorder)
+        self.reorders = 0 # Messages that arrived after a newer one
+        self.duplicates = 0
+
+    def ping(self, ping_id):
+        self.pings_sent += 1
+        return {"type": "ping", "id": ping_id, "server": now_ms()}
+
+    def pong(self, data):
+        server = data.get("server")
+        client = data.get("client")
+        if not isinstance(server, (int, float)):
+            return
+        rtt = now_ms() - server
+        if rtt < 0:
+            return
+        self.pongs += 1
+        self.rtt.append(rtt)
+        if isinstance(client, (int, float)):
+            self.offsets.append((rtt, _signed(client - (server + rtt / 2), TIMESTAMP_MODULO)))
+            self.offset = min(self.offsets)[1]
+
+    def message(self, seq=None, client_timestamp=None):
+        # Called for every input message - seq and client_timestamp are optional (old clients send neither). Raises
+        # ValueError for values of the wrong type, before anything is counted, so the endpoint can drop the message.
+        if seq is not None and (not isinstance(seq, int) or isinstance(seq, bool)):
+            raise ValueError(f"Bad sequence number {seq!r}")
+        if client_timestamp is not None and (not isinstance(client_timestamp, (int, float)) or isinstance(client_timestamp, bool) or not math.isfinite(client_timestamp)):
+            raise ValueError(f"Bad client timestamp {client_timestamp!r}")
+        self.messages += 1
+        if seq is not None:
+            if self.last_seq is None:
+                self.last_seq = seq
+            else:
+                step = (seq - self.last_seq) % SEQUENCE_MODULO
+                if step == 0:
+                    self.duplicates += 1
+                elif step < SEQUENCE_MODULO // 2:
+                    self.gaps += step - 1
+                    self.last_seq = seq
+                else:
+                    self.reorders += 1
+        if client_timestamp is not None and self.offset is not None:
+            age = _signed(now_ms() + self.offset - client_timestamp, TIMESTAMP_MODULO)
+            self.input_age.append(max(0.0, age))
+
+    def stats(self):
+        return {
+            "id": self.connection_id,
+            "endpoint": self.endpoint,
+            "room": self.room_id,
+            "userid": self.user_id,
+            "connected_s": round(time.time() - self.connected_at, 1),
+            "messages": self.messages,
+            "pings": self.pings_sent,
+            "pongs": self.pongs,
+            "gaps": self.gaps,
+            "reorders": self.reorders,
+            "duplicates": self.duplicates,
+            "rtt": summarize(self.rtt),
+            "input_age": summarize(self.input_age),
+        }
+
+
+class LatencyMonitor:
+    def __init__(self, ping_interval=PING_INTERVAL):
+        self.ping_interval = ping_interval
+        self.connections = {}
+        self.ids = itertools.count(1)
+
+    def open(self, websocket, endpoint, room_id):
+        # Starts pinging the socket; the endpoint must call close() with the returned tracker
+        tracker = ConnectionLatency(next(self.ids), endpoint, room_id)
+        self.connections[tracker.connection_id] = tracker
+        tracker.pinger = asyncio.create_task(self._ping(websocket, tracker))
+        return tracker
+
+    def close(self, tracker):
+        self.connections.pop(tracker.connection_id, None)
+        tracker.pinger.cancel()
+
+    async def _ping(self, websocket, tracker):
+        for ping_id in itertools.count(1):
+            await asyncio.sleep(self.ping_interval)
+            try:
+                await websocket.send_json(tracker.ping(ping_id))
+            except Exception:
+                return # Socket is gone - the endpoint's receive loop cleans up
+
+    def stats(self):
+        return {"connections": [tracker.stats() for tracker in self.connections.values()]}
@@ -0,0 +1,32 @@
+# lobby.py
+import asyncio
+
+
+class LobbyNotifier:
+    """Versioned change notification for the lobby.
+
+    Every change to the lobby bumps ``version``; waiters sleep on a condition until the
+    version moves past the one they last saw, so nobody has to poll.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._condition = asyncio.Condition()
+
+    async def publish(self):
+        async with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+
+    async def wait_for_change(self, seen_version):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.version != seen_version)
+            return self.version
+
+
+async def wait_for_disconnect(websocket):
+    # Drain incoming frames until the client goes away - lets a send-only socket notice disconnects while idle
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
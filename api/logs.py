@@ -0,0 +1,127 @@
+# logs.py
+# Structured logging that never writes from the event loop or the game loop.
+#
+# configure_logging() puts a QueueHandler on the root logger and starts a QueueListener thread that formats and writes
+# the records (JSON lines by default, LOG_FORMAT=text for humans). Logging call sites only pay for the level check,
+# the per-site rate limit and a put_nowait; when the queue is full the record is counted and dropped, never waited on.
+#
+# Every call site (file and line) gets a token bucket of LOG_RATE records per second with bursts of LOG_BURST. Records
+# over the limit are dropped and the next one that gets through carries "suppressed": <count>.
+#
+# Modules log through logging.getLogger(__name__) and pass structured fields with extra={...}. The API configures this
+# in api.main's startup hook; the standalone pygame simulation only logs warnings and role changes at DEBUG, so it
+# sets up plain logging.basicConfig instead.
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json") # "json" or "text"
+LOG_RATE = float(os.environ.get("LOG_RATE", 5)) # Records per second per call site
+LOG_BURST = float(os.environ.get("LOG_BURST", 20))
+LOG_QUEUE_SIZE = 10000
+# LogRecord attributes - anything else on a record came in through extra={...}
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "suppressed"}
+
+
+class SiteRateLimit(logging.Filter):
+    """Token bucket per call site. Runs in the caller's thread without a lock - under contention the count is approximate."""
+
+    def __init__(self, rate=LOG_RATE, burst=LOG_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.sites = {} # (pathname, lineno) -> [tokens, last refill, suppressed]
+
+    def filter(self, record):
+        now = time.monotonic()
+        site = self.sites.get((record.pathname, record.lineno))
+        if site is None:
+            site = self.sites[(record.pathname, record.lineno)] = [self.burst, now, 0]
+        site[0] = min(self.burst, site[0] + (now - site[1]) * self.rate)
+        site[1] = now
+        if site[0] < 1:
+            site[2] += 1
+            return False
+        site[0] -= 1
+        record.suppressed = site[2]
+        site[2] = 0
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only merge the arguments here (they may change after the call); formatting happens in the writer thread.
+        # A copy, like QueueHandler.prepare - other handlers on the logger still get the caller's record as it was.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        text = super().format(record)
+        fields = {key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS}
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if getattr(record, "suppressed", 0):
+            text += f" (suppressed {record.suppressed})"
+        return text
+
+
+def configure_logging(level=LOG_LEVEL, log_format=LOG_FORMAT, stream=None):
+    # Returns the listener - call stop() on it at shutdown to flush what is still queued
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(SiteRateLimit())
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if isinstance(existing, DroppingQueueHandler):
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    listener = logging.handlers.QueueListener(log_queue, writer, respect_handler_level=False)
+    listener.start()
+    return listener
@@ -1,19 +1,116 @@
 # main.py
 import asyncio
-from fastapi import FastAPI, WebSocket
+import logging
+import os
+import struct
+from fastapi import FastAPI, Response, WebSocket, WebSocketDisconnect
+from api.controls import decode_joystick_frame, decode_text_frame, parse_text_message
+from api.latency import LatencyMonitor
+from api.lobby import wait_for_disconnect
+from api.logs import configure_logging
+from api.match_stream import STREAM_RATE
+from api.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from api.rooms import (DEFAULT_ROOM, ROOM_FULL_CLOSE_CODE, ROOM_INVALID_CLOSE_CODE, ROOM_MOVED_CLOSE_CODE,
+                       ROOM_NO_SIMULATION_CLOSE_CODE, RoomManager, broker_from_env, valid_room_id)
+from api.simulation import ExternalSimulation, HeadlessSimulation
+log_listener = None # Started by the startup hook, so importing api.main starts no threads
+log = logging.getLogger(__name__)
 app = FastAPI()
+app.add_middleware(MetricsMiddleware) # Websocket connections and messages per endpoint for /metrics
 
 # write a get method to return some text
 
-connectedUsers = 0
-maxConnectedUsers = 2
+stream_rate = int(os.environ.get("MATCH_STREAM_RATE", STREAM_RATE))
+# The default room plays the pygame game on this machine ("external") or its own game inside the API ("headless");
+# every other room runs inside the API unless ROOM_SIMULATION is "none" (lobby and controls only, e.g. for load tests)
+default_room_simulation = os.environ.get("DEFAULT_ROOM_SIMULATION", "external")
+room_simulation = os.environ.get("ROOM_SIMULATION", "headless")
+# Every room id a client makes up would otherwise start another game on this worker; 0 lifts the limit
+max_rooms = int(os.environ.get("MAX_ROOMS", 8 if room_simulation == "headless" else 0))
+# "process" by default: strategy code in a thread holds the GIL and delays every socket on the event loop
+simulation_offload = os.environ.get("SIMULATION_OFFLOAD", "process") # "process" or "thread"
+external_simulation = ExternalSimulation(rate=stream_rate) if default_room_simulation == "external" else None
 
-gameState = {
-    "connectedUsers": connectedUsers,
-    "maxConnectedUsers": maxConnectedUsers,
-    "connections": [],
-    "difficulty": ""
-}
+
+async def create_simulation(room_id):
+    kind = default_room_simulation if room_id == DEFAULT_ROOM else room_simulation
+    if kind == "external":
+        return external_simulation
+    if kind == "none":
+        return None
+    simulation = HeadlessSimulation(offload=simulation_offload, stream_rate=stream_rate)
+    await simulation.start()
+    return simulation
+
+
+latency_monitor = LatencyMonitor() # RTT, input age and sequence statistics per phone socket
+room_manager = RoomManager(broker=broker_from_env(), worker_url=os.environ.get("ROOM_WORKER_URL", ""), simulation_factory=create_simulation, max_rooms=max_rooms)
+
+
+def send_queue_depths():
+    # Read off the outboxes when /metrics is scraped - a TV viewer counts one while the newest frame is still unsent
+    depths = {("tv",): 0, ("spectate",): 0, ("mobile",): 0}
+    for room in room_manager.rooms.values():
+        depths[("mobile",)] += sum(outbox.depth for outbox in room.mobile_broadcaster.outboxes.values())
+        if room.simulation is None:
+            continue
+        stream = room.simulation.match_stream
+        if stream.frame is not None:
+            depths[("tv",)] += sum(viewer.last_frame != stream.frame.index for viewer in stream.viewers)
+        depths[("spectate",)] += sum(len(spectator.queue) for spectator in room.simulation.spectator_hub.spectators)
+    return depths
+
+
+registry.gauge("football_send_queue_depth", "Updates waiting to be sent, per broadcast tier.", ("tier",), collect=send_queue_depths)
+registry.gauge("football_rooms", "Rooms hosted by this worker.", collect=lambda: {(): len(room_manager.rooms)})
+
+
+@app.on_event("startup")
+async def start_rooms():
+    global external_simulation, log_listener
+    log_listener = configure_logging() # Records are written by a background thread, never from the event loop
+    if external_simulation is not None:
+        try:
+            await external_simulation.start()
+        except OSError as e: # Another API process on this machine already owns the pygame game
+            log.warning("local simulation port unavailable, the default room is hosted elsewhere", extra={"error": str(e)})
+            external_simulation = None
+            await room_manager.start()
+            return
+    await room_manager.start(persistent_rooms=[DEFAULT_ROOM])
+
+
+@app.on_event("shutdown")
+def stop_rooms():
+    room_manager.stop()
+    registry.stop()
+    for room in room_manager.rooms.values():
+        if room.simulation is not None:
+            room.simulation.stop()
+    if log_listener is not None:
+        log_listener.stop() # Last, so whatever the rest logged while stopping is written
+
+
+async def join_room(websocket, room_id):
+    # The socket's room on this worker, or None after closing the socket when the room is invalid or lives elsewhere
+    if not valid_room_id(room_id):
+        await websocket.accept() # Closing before the handshake is an HTTP 403, and the client never sees the code
+        await websocket.close(code=ROOM_INVALID_CLOSE_CODE)
+        return None
+    try:
+        room, owner_url = await room_manager.acquire(room_id)
+    except (TimeoutError, EOFError) as e: # The room's game did not start
+        log.warning("room simulation failed to start", extra={"room": room_id, "error": str(e)})
+        await websocket.accept()
+        await websocket.close(code=1011)
+        return None
+    if room is None:
+        await websocket.accept()
+        if owner_url is None:
+            await websocket.close(code=ROOM_FULL_CLOSE_CODE)
+        else:
+            await websocket.close(code=ROOM_MOVED_CLOSE_CODE, reason=owner_url)
+    return room
 
 
 @app.get("/")
@@ -21,62 +118,235 @@ def read_root():
     return {"Hello": "World"}
 
 
+@app.get("/latency")
+def latency():
+    return latency_monitor.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text format - only rendered here, so nothing is spent on it while nobody scrapes
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/rooms")
+def list_rooms():
+    return room_manager.stats()
+
+
+@app.get("/rooms/{room_id}")
+async def locate_room(room_id: str):
+    # Which worker to connect to for this room - the owner, or the least-loaded worker for a new room
+    _, url = await room_manager.broker.locate(room_id)
+    return {"room": room_id, "url": url if url is not None else room_manager.worker_url}
+
+
 @app.websocket("/ws/tv/onloading")
-async def websocket_tv_onloading(websocket: WebSocket):
+async def websocket_tv_onloading(websocket: WebSocket, room: str = DEFAULT_ROOM):
+    room = await join_room(websocket, room)
+    if room is None:
+        return
     await websocket.accept()
     previous_connected_users = None
+    disconnected = asyncio.create_task(wait_for_disconnect(websocket))
     try:
         while True:
-            if gameState["connectedUsers"] != previous_connected_users:
-                await websocket.send_text(str(gameState["connectedUsers"]))
-                previous_connected_users = gameState["connectedUsers"]
-            await asyncio.sleep(1)  # Adjust the interval as needed
+            seen_version = room.lobby_notifier.version
+            if room.game_state["connectedUsers"] != previous_connected_users:
+                await websocket.send_text(str(room.game_state["connectedUsers"]))
+                previous_connected_users = room.game_state["connectedUsers"]
+            # Sleep until the lobby changes or the TV goes away - no polling
+            changed = asyncio.create_task(room.lobby_notifier.wait_for_change(seen_version))
+            await asyncio.wait({changed, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                changed.cancel()
+                return
     except Exception as e:
-        print(f"Error: {e}")
+        log.warning("websocket error", extra={"endpoint": "/ws/tv/onloading", "error": repr(e)})
     finally:
-        await websocket.close()
+        room_manager.release(room)
+        if not disconnected.done():
+            disconnected.cancel()
+            await websocket.close()
+
+
+@app.websocket("/ws/tv/game")
+async def websocket_tv_game(websocket: WebSocket, room: str = DEFAULT_ROOM):
+    room = await join_room(websocket, room)
+    if room is None:
+        return
+    await websocket.accept()
+    if room.simulation is None:
+        room_manager.release(room)
+        await websocket.close(code=ROOM_NO_SIMULATION_CLOSE_CODE)
+        return
+    match_stream = room.simulation.match_stream
+    await websocket.send_json(match_stream.hello())
+    viewer = match_stream.add_viewer(websocket)
+    disconnected = False
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                disconnected = True
+                break
+            if message.get("text") is not None:
+                try:
+                    data = decode_text_frame(message["text"])
+                    if "ack" in data:
+                        viewer.ack(data["ack"])
+                except (ValueError, TypeError) as e: # Malformed ack - ignore it, keep streaming
+                    log.warning("malformed viewer frame", extra={"room": room.room_id, "error": str(e)})
+    except Exception as e:
+        log.warning("websocket error", extra={"endpoint": "/ws/tv/game", "error": repr(e)})
+    finally:
+        match_stream.remove_viewer(viewer)
+        room_manager.release(room)
+        if not disconnected and not viewer.evicted:
+            await websocket.close()
+
+
+@app.websocket("/ws/tv/debug")
+async def websocket_tv_debug(websocket: WebSocket):
+    # Pushes the /latency statistics to pages/tv/debug.vue once per ping interval
+    await websocket.accept()
+    disconnected = asyncio.create_task(wait_for_disconnect(websocket))
+    try:
+        while not disconnected.done():
+            await websocket.send_json(latency_monitor.stats())
+            await asyncio.wait({disconnected}, timeout=latency_monitor.ping_interval)
+    except Exception as e:
+        log.warning("websocket error", extra={"endpoint": "/ws/tv/debug", "error": repr(e)})
+    finally:
+        if not disconnected.done():
+            disconnected.cancel()
+            await websocket.close()
+
+
+@app.websocket("/ws/spectate")
+async def websocket_spectate(websocket: WebSocket, room: str = DEFAULT_ROOM):
+    room = await join_room(websocket, room)
+    if room is None:
+        return
+    await websocket.accept()
+    if room.simulation is None:
+        room_manager.release(room)
+        await websocket.close(code=ROOM_NO_SIMULATION_CLOSE_CODE)
+        return
+    await websocket.send_json(room.simulation.match_stream.hello())
+    spectator = room.simulation.spectator_hub.subscribe(websocket)
+    try:
+        await wait_for_disconnect(websocket)
+    except Exception as e:
+        log.warning("websocket error", extra={"endpoint": "/ws/spectate", "error": repr(e)})
+    finally:
+        room.simulation.spectator_hub.unsubscribe(spectator)
+        room_manager.release(room)
 
 
 @app.websocket("/ws/mobile")
-async def websocket_mobile(websocket: WebSocket):
-    if gameState["connectedUsers"] >= gameState["maxConnectedUsers"]:
+async def websocket_mobile(websocket: WebSocket, room: str = DEFAULT_ROOM):
+    room = await join_room(websocket, room)
+    if room is None:
+        return
+    game_state = room.game_state
+    if game_state["connectedUsers"] >= game_state["maxConnectedUsers"]:
+        room_manager.release(room)
         await websocket.close()
         return
     else:
-        gameState["connectedUsers"] += 1
-        user_id = gameState["connectedUsers"]
+        game_state["connectedUsers"] += 1
+        user_id = game_state["connectedUsers"]
         await websocket.accept()
 
-        async def broadcast():
-            for connection in gameState["connections"]:
-                await connection.send_json({'userid': user_id, 'connectedUsers': gameState["connectedUsers"], 'difficulty': gameState["difficulty"]})
+        def lobby_update():
+            return {'userid': user_id, 'connectedUsers': game_state["connectedUsers"], 'difficulty': game_state["difficulty"]}
 
-        gameState["connections"].append(websocket)
-        await broadcast()
+        def broadcast(exclude=None):
+            # Non-blocking - each phone's writer task sends the newest update when it can
+            room.mobile_broadcaster.publish(lobby_update(), exclude=exclude)
+
+        game_state["connections"].append(websocket)
+        room.mobile_broadcaster.add(websocket, welcome=lobby_update()) # The joining phone learns its own user id first
+        await room.lobby_notifier.publish()
+        broadcast(exclude=websocket)
+        tracker = latency_monitor.open(websocket, "mobile", room.room_id)
+        tracker.user_id = user_id
 
         try:
             while True:
-                data = await websocket.receive_json()
-                if data.get("type") == "difficulty":
-                    gameState["difficulty"] = data["difficulty"]
-                await broadcast()
+                text = await websocket.receive_text()
+                try:
+                    data = decode_text_frame(text)
+                    if data.get("type") == "pong":
+                        tracker.pong(data)
+                        continue
+                    tracker.message(data.get("seq"), data.get("t"))
+                    difficulty = data["difficulty"] if data.get("type") == "difficulty" else None
+                    if difficulty is not None and not isinstance(difficulty, str):
+                        raise ValueError(f"Bad difficulty {difficulty!r}")
+                except (ValueError, TypeError, KeyError) as e: # Malformed message - drop it, keep the connection
+                    log.warning("malformed mobile message", extra={"room": room.room_id, "error": str(e)})
+                    continue
+                if difficulty is not None:
+                    game_state["difficulty"] = difficulty
+                    await room.lobby_notifier.publish()
+                broadcast()
+        except WebSocketDisconnect: # The phone went away - the normal way out of the loop
+            pass
         except Exception as e:
-            print(f"Error: {e}")
+            log.warning("websocket error", extra={"endpoint": "/ws/mobile", "error": repr(e)})
         finally:
-            gameState["connectedUsers"] -= 1
-            gameState["connections"].remove(websocket)
-            await broadcast()
+            latency_monitor.close(tracker)
+            game_state["connectedUsers"] -= 1
+            game_state["connections"].remove(websocket)
+            room.mobile_broadcaster.remove(websocket)
+            await room.lobby_notifier.publish()
+            broadcast()
+            room_manager.release(room)
 
 
 @app.websocket("/ws/robotcontrol")
-async def websocket_robotcontrol(websocket: WebSocket):
+async def websocket_robotcontrol(websocket: WebSocket, room: str = DEFAULT_ROOM):
+    room = await join_room(websocket, room)
+    if room is None:
+        return
     await websocket.accept()
+    tracker = latency_monitor.open(websocket, "robotcontrol", room.room_id)
+    user_ids = set()
+    disconnected = False
     try:
         while True:
-            data = await websocket.receive_text()
-            print(f"Received data: {data}")
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                disconnected = True
+                break
+            try:
+                if message.get("bytes") is not None:
+                    controller_input = decode_joystick_frame(message["bytes"])
+                else:
+                    data = decode_text_frame(message["text"])
+                    if data.get("type") == "pong":
+                        tracker.pong(data)
+                        continue
+                    log.debug("controller message", extra={"room": room.room_id, "data": message["text"]})
+                    controller_input = parse_text_message(data, room.controller_inputs)
+                tracker.message(controller_input["seq"], controller_input["timestamp"])
+                tracker.user_id = controller_input["userid"]
+                user_ids.add(controller_input["userid"])
+                if room.controller_inputs.update(controller_input) and room.simulation is not None:
+                    room.simulation.send_input(controller_input)
+            except (ValueError, TypeError, KeyError, struct.error) as e: # Malformed frame - drop it, keep the connection
+                log.warning("malformed controller frame", extra={"room": room.room_id, "error": str(e)})
 
     except Exception as e:
-        print(f"Error: {e}")
+        log.warning("websocket error", extra={"endpoint": "/ws/robotcontrol", "error": repr(e)})
     finally:
-        await websocket.close()
+        for user_id in user_ids: # Robot goes back to the AI when its phone goes away, and a reconnect starts a fresh sequence
+            room.controller_inputs.remove(user_id)
+            if room.simulation is not None:
+                room.simulation.release(user_id)
+        latency_monitor.close(tracker)
+        room_manager.release(room)
+        if not disconnected:
+            await websocket.close()
@@ -0,0 +1,326 @@
+# match_stream.py
+# Live match state for the TV (/ws/tv/game).
+#
+# The simulation sends a float snapshot every frame over local UDP (simulation/state_publisher.py). MatchStream
+# samples the newest one STREAM_RATE times a second, quantises it to FIELD_COUNT uint16 fields (see FIELDS) and
+# sends every TV one binary frame (little endian):
+#   keyframe: uint8 KEYFRAME_TYPE, uint32 frame, uint16 keyframe id,      FIELD_COUNT x uint16
+#   delta:    uint8 DELTA_TYPE,    uint32 frame, uint16 base keyframe id, uint32 changed-field mask, uint16 per changed field
+# A delta carries only the fields that differ from the last keyframe the TV acknowledged ({"ack": <keyframe id>}),
+# so any single delta can be applied on its own - a TV that skipped frames just gets the next delta. A new keyframe is
+# cut every KEYFRAME_INTERVAL frames; a TV that has not acknowledged a keyframe yet, or whose acknowledged keyframe has
+# dropped out of the KEYFRAME_HISTORY, gets the current frame as a keyframe.
+# Spectators (api/spectators.py) never acknowledge anything and get every frame whole:
+#   state:    uint8 STATE_TYPE,    uint32 frame,                          FIELD_COUNT x uint16
+import asyncio
+import math
+import struct
+import time
+from collections import OrderedDict
+from api.broadcast import EVICT_CLOSE_CODE, MAX_LAG, SEND_TIMEOUT
+from api.metrics import fanout_latency
+
+# Must match simulation/state_publisher.py
+STATE_ADDRESS = ("127.0.0.1", 8024)
+ROBOT_IDS = ("A1", "A2", "A3", "A4", "B1", "B2", "B3", "B4")
+SNAPSHOT = struct.Struct("<IBff" + "fff" * len(ROBOT_IDS) + "BBff")
+PITCH_SIZE = (900, 600) # PITCH_WIDTH, PITCH_HEIGHT in simulation/constants_and_util.py
+
+STREAM_RATE = 30 # Frames per second sent to each TV
+KEYFRAME_INTERVAL = 30 # Frames between keyframes
+KEYFRAME_HISTORY = 32 # Keyframes a TV may still acknowledge and receive deltas against
+POSITION_SCALE = 8 # 1/8 pixel
+ANGLE_SCALE = 65536 # Full turn
+TIMER_SCALE = 10 # 1/10 second
+
+FIELDS = (
+    ["ball_x", "ball_y"]
+    + [f"{robot_id}_{axis}" for robot_id in ROBOT_IDS for axis in ("x", "y", "angle")]
+    + ["score_a", "score_b", "timer", "possession_a", "game_state"]
+)
+FIELD_COUNT = len(FIELDS)
+KEYFRAME_TYPE = 1
+DELTA_TYPE = 2
+STATE_TYPE = 3
+KEYFRAME_HEADER = struct.Struct("<BIH")
+KEYFRAME_BODY = struct.Struct(f"<{FIELD_COUNT}H")
+DELTA_HEADER = struct.Struct("<BIHI")
+STATE_HEADER = struct.Struct("<BI")
+KEYFRAME_ID_MODULO = 1 << 16
+
+tv_fanout_latency = fanout_latency.labels("tv")
+
+
+def _clamp_u16(value):
+    return max(0, min(0xFFFF, round(value)))
+
+
+def quantize_snapshot(snapshot):
+    # SNAPSHOT tuple -> FIELD_COUNT ints in FIELDS order
+    _, game_state, ball_x, ball_y, *rest = snapshot
+    robot_values = rest[:3 * len(ROBOT_IDS)]
+    score_a, score_b, elapsed, possession_a = rest[3 * len(ROBOT_IDS):]
+    values = [_clamp_u16(ball_x * POSITION_SCALE), _clamp_u16(ball_y * POSITION_SCALE)]
+    for i in range(0, len(robot_values), 3):
+        x, y, angle = robot_values[i:i + 3]
+        values.append(_clamp_u16(x * POSITION_SCALE))
+        values.append(_clamp_u16(y * POSITION_SCALE))
+        values.append(round((angle % (2 * math.pi)) / (2 * math.pi) * ANGLE_SCALE) % ANGLE_SCALE)
+    values.extend((score_a, score_b, _clamp_u16(elapsed * TIMER_SCALE), _clamp_u16(possession_a * 100), game_state))
+    return tuple(values)
+
+
+def encode_keyframe(frame_index, keyframe_id, values):
+    return KEYFRAME_HEADER.pack(KEYFRAME_TYPE, frame_index & 0xFFFFFFFF, keyframe_id) + KEYFRAME_BODY.pack(*values)
+
+
+def encode_delta(frame_index, base_id, base_values, values):
+    mask = 0
+    changed = []
+    for i, (old, new) in enumerate(zip(base_values, values)):
+        if old != new:
+            mask |= 1 << i
+            changed.append(new)
+    return DELTA_HEADER.pack(DELTA_TYPE, frame_index & 0xFFFFFFFF, base_id, mask) + struct.pack(f"<{len(changed)}H", *changed)
+
+
+def encode_state(frame_index, values):
+    return STATE_HEADER.pack(STATE_TYPE, frame_index & 0xFFFFFFFF) + KEYFRAME_BODY.pack(*values)
+
+
+def decode_frame(data, keyframes):
+    # Reference decoder (the TV does the same in pages/tv/game.vue) - returns (frame index, keyframe id or None, values)
+    frame_type = data[0]
+    if frame_type == KEYFRAME_TYPE:
+        _, frame_index, keyframe_id = KEYFRAME_HEADER.unpack_from(data)
+        values = KEYFRAME_BODY.unpack_from(data, KEYFRAME_HEADER.size)
+        keyframes[keyframe_id] = values
+        return frame_index, keyframe_id, values
+    if frame_type == DELTA_TYPE:
+        _, frame_index, base_id, mask = DELTA_HEADER.unpack_from(data)
+        if base_id not in keyframes:
+            raise ValueError(f"Delta against unknown keyframe {base_id}")
+        values = list(keyframes[base_id])
+        offset = DELTA_HEADER.size
+        for i in range(FIELD_COUNT):
+            if mask & (1 << i):
+                values[i] = struct.unpack_from("<H", data, offset)[0]
+                offset += 2
+        return frame_index, None, tuple(values)
+    if frame_type == STATE_TYPE:
+        _, frame_index = STATE_HEADER.unpack_from(data)
+        return frame_index, None, KEYFRAME_BODY.unpack_from(data, STATE_HEADER.size)
+    raise ValueError(f"Unknown frame type {frame_type}")
+
+
+class Frame:
+    """One sampled, quantised match state. Encodings are cached, so TVs on the same base share the bytes."""
+
+    def __init__(self, index, values):
+        self.index = index
+        self.values = values
+        self.keyframe_id = None
+        self.created = time.monotonic()
+        self.encoded = {} # Base keyframe id (None = sent as a keyframe) -> bytes
+
+
+class _SnapshotProtocol(asyncio.DatagramProtocol):
+    def __init__(self, stream):
+        self.stream = stream
+
+    def datagram_received(self, data, addr):
+        self.stream.receive(data)
+
+
+class TvViewer:
+    """One /ws/tv/game socket. Only ever sends the newest frame - frames produced while a send is in flight are skipped."""
+
+    def __init__(self, websocket, stream):
+        self.websocket = websocket
+        self.stream = stream
+        self.acked = None # Newest keyframe id the TV confirmed
+        self.last_frame = None # Index of the last frame sent
+        self.behind_since = None
+        self.wakeup = asyncio.Event()
+        self.wakeup.set() # Send the current frame straight away
+        self.sent = 0
+        self.keyframes_sent = 0
+        self.resyncs = 0 # Times the TV's acknowledged keyframe had expired and it was sent a keyframe instead
+        self.timeouts = 0
+        self.evicted = False
+        self.task = asyncio.create_task(self.run())
+
+    def ack(self, keyframe_id):
+        if keyframe_id in self.stream.keyframes:
+            self.acked = keyframe_id
+
+    async def run(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            frame = self.stream.frame
+            if frame is None or frame.index == self.last_frame:
+                continue
+            base_id = self.acked
+            if base_id is not None and base_id not in self.stream.keyframes: # Deltas are against the base, not the last frame sent
+                self.resyncs += 1
+                self.acked = base_id = None
+            payload = self.stream.encode(frame, base_id)
+            try:
+                await asyncio.wait_for(self.websocket.send_bytes(payload), SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                if self.behind_since is None:
+                    self.behind_since = time.monotonic()
+                elif time.monotonic() - self.behind_since > MAX_LAG:
+                    await self.evict()
+                    return
+                self.last_frame = None # The frame may be half-sent - start again from a keyframe
+                self.acked = None
+                self.wakeup.set()
+                continue
+            except Exception:
+                return # Socket is gone - the endpoint's receive loop cleans up
+            self.behind_since = None
+            self.last_frame = frame.index
+            self.sent += 1
+            tv_fanout_latency.observe(time.monotonic() - frame.created)
+            if payload[0] == KEYFRAME_TYPE:
+                self.keyframes_sent += 1
+
+    async def evict(self):
+        self.evicted = True
+        try:
+            await asyncio.wait_for(self.websocket.close(code=EVICT_CLOSE_CODE), SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    def stop(self):
+        self.task.cancel()
+
+
+class MatchStream:
+    """Samples the simulation's snapshots at a fixed rate and fans the frames out to every TV."""
+
+    def __init__(self, rate=STREAM_RATE, keyframe_interval=KEYFRAME_INTERVAL, spectator_hub=None):
+        self.rate = rate
+        self.keyframe_interval = keyframe_interval
+        self.spectator_hub = spectator_hub # Gets every frame too (api/spectators.py)
+        self.snapshot = None # Newest SNAPSHOT tuple from the simulation
+        self.snapshots_received = 0
+        self.last_sequence = None
+        self.frame = None
+        self.keyframes = OrderedDict() # Keyframe id -> values, oldest first
+        self.next_keyframe_id = 0
+        self.frames_since_keyframe = 0
+        self.viewers = set()
+        self.transport = None
+        self.task = None
+
+    async def start(self, address=STATE_ADDRESS):
+        # address=None when the snapshots are fed directly (a simulation running inside the API, api/simulation.py)
+        if address is not None:
+            loop = asyncio.get_running_loop()
+            self.transport, _ = await loop.create_datagram_endpoint(lambda: _SnapshotProtocol(self), local_addr=address)
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+        if self.transport is not None:
+            self.transport.close()
+
+    def receive(self, data):
+        if len(data) != SNAPSHOT.size:
+            return
+        self.feed(SNAPSHOT.unpack(data))
+
+    def feed(self, snapshot):
+        # snapshot is a SNAPSHOT tuple - the newest one is sampled on the next frame
+        self.snapshot = snapshot
+        self.snapshots_received += 1
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        period = 1 / self.rate
+        next_time = loop.time()
+        while True:
+            next_time += period
+            delay = next_time - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_time = loop.time() # Overran a whole period - skip ahead rather than burst
+            self.tick()
+
+    def tick(self):
+        if self.snapshot is None or self.snapshot[0] == self.last_sequence:
+            return # Simulation not running or paused - nothing new to send
+        self.last_sequence = self.snapshot[0]
+        frame = Frame(0 if self.frame is None else self.frame.index + 1, quantize_snapshot(self.snapshot))
+        self.frames_since_keyframe += 1
+        if not self.keyframes or self.frames_since_keyframe >= self.keyframe_interval:
+            self.add_keyframe(frame)
+            self.frames_since_keyframe = 0
+        self.frame = frame
+        for viewer in self.viewers:
+            viewer.wakeup.set()
+        if self.spectator_hub is not None:
+            self.spectator_hub.publish(frame)
+
+    def add_keyframe(self, frame):
+        frame.keyframe_id = self.next_keyframe_id
+        self.next_keyframe_id = (self.next_keyframe_id + 1) % KEYFRAME_ID_MODULO
+        self.keyframes[frame.keyframe_id] = frame.values
+        while len(self.keyframes) > KEYFRAME_HISTORY:
+            self.keyframes.popitem(last=False)
+
+    def encode(self, frame, base_id=None):
+        # Keyframes always go out whole (so TVs can acknowledge them); other frames as a delta when the TV has a usable base
+        if frame.keyframe_id is None and base_id in self.keyframes:
+            key = base_id
+        else:
+            if frame.keyframe_id is None:
+                self.add_keyframe(frame)
+            key = None
+        payload = frame.encoded.get(key)
+        if payload is None:
+            if key is None:
+                payload = encode_keyframe(frame.index, frame.keyframe_id, frame.values)
+            else:
+                payload = encode_delta(frame.index, key, self.keyframes[key], frame.values)
+            frame.encoded[key] = payload
+        return payload
+
+    def hello(self):
+        # First (JSON) message on /ws/tv/game - everything the TV needs to decode the binary frames
+        return {
+            "type": "hello",
+            "robots": list(ROBOT_IDS),
+            "fields": FIELDS,
+            "rate": self.rate,
+            "pitch": {"width": PITCH_SIZE[0], "height": PITCH_SIZE[1]},
+            "positionScale": POSITION_SCALE,
+            "angleScale": ANGLE_SCALE,
+            "timerScale": TIMER_SCALE,
+        }
+
+    def add_viewer(self, websocket):
+        viewer = TvViewer(websocket, self)
+        self.viewers.add(viewer)
+        return viewer
+
+    def remove_viewer(self, viewer):
+        self.viewers.discard(viewer)
+        viewer.stop()
+
+    def stats(self):
+        return {
+            "viewers": len(self.viewers),
+            "snapshots_received": self.snapshots_received,
+            "frame": None if self.frame is None else self.frame.index,
+            "sent": sum(viewer.sent for viewer in self.viewers),
+            "keyframes_sent": sum(viewer.keyframes_sent for viewer in self.viewers),
+            "resyncs": sum(viewer.resyncs for viewer in self.viewers),
+            "timeouts": sum(viewer.timeouts for viewer in self.viewers),
+        }
@@ -0,0 +1,204 @@
+# metrics.py
+# Prometheus text-format metrics for GET /metrics.
+#
+# Hot paths only ever do a plain integer/float increment or a bisect into a histogram's bucket list. Everything runs on
+# the event loop thread, so there are no locks. Gauges that can be read off existing state (queue depths, viewers)
+# are not tracked at all - their collect callbacks walk the rooms when /metrics is scraped. The text is only rendered on
+# a scrape, and the event-loop lag probe only runs while the server is being scraped (it starts with a scrape and stops
+# LOOP_LAG_IDLE seconds after the last one), so an unscraped server pays for the counters and nothing else. Rates ("messages per second") come from rate() over the *_total counters in Prometheus.
+import asyncio
+import time
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LOOP_LAG_INTERVAL = 0.25 # Seconds between event-loop lag probes
+LOOP_LAG_IDLE = 60.0 # Seconds without a scrape before the probe stops - several scrape intervals (5 s in monitoring/)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.bounds = buckets
+        self.counts = [0] * (len(buckets) + 1) # Per bucket (not cumulative), the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Family:
+    """One metric name with a child per label combination."""
+
+    def __init__(self, kind, name, documentation, labelnames=(), buckets=None, collect=None):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self.collect = collect # Called on scrape instead of keeping children: returns {label values tuple: value}
+        self.children = {}
+
+    def labels(self, *values):
+        # Bind the child once, outside the hot path, and keep the reference
+        child = self.children.get(values)
+        if child is None:
+            if self.kind == "histogram":
+                child = Histogram(self.buckets)
+            elif self.kind == "counter":
+                child = Counter()
+            else:
+                child = Gauge()
+            self.children[values] = child
+        return child
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        if self.collect is not None:
+            for values, value in self.collect().items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+            return
+        for values, child in list(self.children.items()):
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(child.bounds + (float("inf"),), child.counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, values)} {cumulative}")
+
+
+class Registry:
+    def __init__(self):
+        self.families = []
+        self.lag_task = None
+        self.last_scrape = None
+
+    def _add(self, family):
+        self.families.append(family)
+        return family
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Family("counter", name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), collect=None):
+        return self._add(Family("gauge", name, documentation, labelnames, collect=collect))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Family("histogram", name, documentation, labelnames, buckets=tuple(buckets)))
+
+    def render(self):
+        self.last_scrape = time.monotonic()
+        if self.lag_task is None or self.lag_task.done(): # First scrape, or the first since the probe went idle
+            self.lag_task = asyncio.create_task(self.probe_loop_lag())
+        lines = []
+        for family in self.families:
+            family.render(lines)
+        return "\n".join(lines) + "\n"
+
+    async def probe_loop_lag(self):
+        # How late a sleep wakes up is how long callbacks waited behind other work on the loop
+        while time.monotonic() - self.last_scrape < LOOP_LAG_IDLE:
+            expected = time.perf_counter() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            loop_lag.observe(max(0.0, time.perf_counter() - expected))
+
+    def stop(self):
+        if self.lag_task is not None:
+            self.lag_task.cancel()
+
+
+registry = Registry()
+
+connections = registry.gauge("football_ws_connections", "Open websocket connections per endpoint.", ("endpoint",))
+messages_received = registry.counter("football_ws_messages_received_total", "Websocket messages received per endpoint.", ("endpoint",))
+messages_sent = registry.counter("football_ws_messages_sent_total", "Websocket messages sent per endpoint.", ("endpoint",))
+fanout_latency = registry.histogram(
+    "football_fanout_latency_seconds",
+    "Time from a state being published to a client's send completing, per broadcast tier (tv, spectate, mobile).",
+    ("tier",),
+)
+loop_lag = registry.histogram("football_event_loop_lag_seconds", "How late the event loop runs a timer, probed while /metrics is scraped.").labels()
+tick_duration = registry.histogram(
+    "football_simulation_tick_duration_seconds", "Wall time of one headless simulation step.", buckets=(0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.066, 0.1)
+).labels()
+tick_lateness = registry.histogram(
+    "football_simulation_tick_lateness_seconds", "How late each headless simulation tick starts against its schedule."
+).labels()
+dropped_ticks = registry.counter("football_simulation_dropped_ticks_total", "Ticks skipped by headless simulations that fell too far behind.").labels()
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting websocket connections and messages per endpoint.
+
+    Only accepted sockets are counted, so the endpoint label is always one of the app's routes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "websocket":
+            await self.app(scope, receive, send)
+            return
+        endpoint = scope["path"]
+        received = sent = None # Bound on accept
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "websocket.receive" and received is not None:
+                received.inc()
+            return message
+
+        async def counting_send(message):
+            nonlocal received, sent
+            kind = message["type"]
+            if kind == "websocket.send":
+                sent.inc()
+            elif kind == "websocket.accept":
+                received = messages_received.labels(endpoint)
+                sent = messages_sent.labels(endpoint)
+                connections.labels(endpoint).inc()
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            if sent is not None:
+                connections.labels(endpoint).dec()
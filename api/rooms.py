@@ -0,0 +1,296 @@
+# rooms.py
+# Rooms (one match each) and the broker that shards them across API worker processes.
+#
+# Every room has its own lobby (what used to be the module-level gameState), controller inputs, broadcasters and
+# simulation handle (api/simulation.py). A room is created by the first socket that names it (?room=<id>, DEFAULT_ROOM
+# when omitted) and garbage-collected ROOM_IDLE_TIMEOUT seconds after its last socket leaves.
+#
+# With several API processes, each one listens on its own address (ROOM_WORKER_URL) and the broker records which
+# worker owns which room. GET /rooms/{room_id} on any worker returns the owner, or the least-loaded live worker for a
+# new room; a socket that reaches a worker that does not own its room is closed with ROOM_MOVED_CLOSE_CODE and the
+# owner's address as the close reason.
+#   InProcessBroker - a single API process (the default)
+#   SQLiteBroker    - local stand-in for a shared broker: workers on one machine share a SQLite file (ROOM_BROKER_PATH)
+import asyncio
+import logging
+import os
+import re
+import socket
+import sqlite3
+import time
+from contextlib import closing
+from api.broadcast import Broadcaster
+from api.controls import LatestInputs
+from api.lobby import LobbyNotifier
+from api.metrics import fanout_latency
+
+DEFAULT_ROOM = "default"
+ROOM_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+MAX_USERS = 2 # Phones per room
+ROOM_IDLE_TIMEOUT = 60.0 # Seconds an empty room is kept before it is collected
+ROOM_GC_INTERVAL = 5.0 # Seconds between garbage collection sweeps (and broker heartbeats)
+WORKER_TIMEOUT = 15.0 # A worker that has not sent a heartbeat for this long no longer owns its rooms
+ROOM_MOVED_CLOSE_CODE = 4001 # Room lives on another worker - the close reason is its address
+ROOM_INVALID_CLOSE_CODE = 4002
+ROOM_FULL_CLOSE_CODE = 4003 # This worker already hosts max_rooms rooms
+ROOM_NO_SIMULATION_CLOSE_CODE = 4004 # Nothing to stream - the room has no running simulation
+
+log = logging.getLogger(__name__)
+
+
+def valid_room_id(room_id):
+    return bool(ROOM_ID_PATTERN.match(room_id))
+
+
+class Room:
+    def __init__(self, room_id, max_users=MAX_USERS, simulation=None):
+        self.room_id = room_id
+        self.game_state = {
+            "connectedUsers": 0,
+            "maxConnectedUsers": max_users,
+            "connections": [],
+            "difficulty": ""
+        }
+        self.lobby_notifier = LobbyNotifier() # Published on every game_state change so TV sockets wake up immediately
+        self.mobile_broadcaster = Broadcaster(latency=fanout_latency.labels("mobile")) # One latest-state outbox per phone - a slow phone never stalls the others
+        self.controller_inputs = LatestInputs() # Newest joystick/button state per user, read once per simulation tick
+        self.simulation = simulation # None until the room has a running simulation
+        self.sockets = 0
+        self.empty_since = time.monotonic()
+
+
+class InProcessBroker:
+    """Room ownership for a single API process - every room belongs to the only worker."""
+
+    def __init__(self, worker_timeout=WORKER_TIMEOUT):
+        self.worker_timeout = worker_timeout
+        self.workers = {} # Worker id -> (url, last heartbeat)
+        self.owners = {} # Room id -> worker id
+
+    def _live_workers(self):
+        now = time.time()
+        return {worker_id: url for worker_id, (url, seen) in self.workers.items() if now - seen <= self.worker_timeout}
+
+    async def heartbeat(self, worker_id, url):
+        self.workers[worker_id] = (url, time.time())
+
+    async def locate(self, room_id):
+        # Owner of the room, or the live worker with the fewest rooms if nobody owns it yet
+        live = self._live_workers()
+        owner = self.owners.get(room_id)
+        if owner in live:
+            return owner, live[owner]
+        if not live:
+            return None, None
+        loads = {worker_id: 0 for worker_id in live}
+        for worker_id in self.owners.values():
+            if worker_id in loads:
+                loads[worker_id] += 1
+        worker_id = min(loads, key=lambda w: (loads[w], w))
+        return worker_id, live[worker_id]
+
+    async def claim(self, room_id, worker_id, url):
+        # Take the room unless a live worker already owns it; returns the owner either way
+        live = self._live_workers()
+        owner = self.owners.get(room_id)
+        if owner is not None and owner != worker_id and owner in live:
+            return owner, live[owner]
+        self.owners[room_id] = worker_id
+        return worker_id, url
+
+    async def release(self, room_id, worker_id):
+        if self.owners.get(room_id) == worker_id:
+            del self.owners[room_id]
+
+
+class SQLiteBroker:
+    """Room ownership shared by API processes on one machine through a SQLite file.
+
+    Stands in for an external broker so several workers can be run and tested locally. Every call is a short
+    transaction run in a thread, so the event loop never waits on the file lock.
+    """
+
+    def __init__(self, path, worker_timeout=WORKER_TIMEOUT):
+        self.path = path
+        self.worker_timeout = worker_timeout
+        with closing(self._connect()) as db:
+            db.execute("CREATE TABLE IF NOT EXISTS workers (worker_id TEXT PRIMARY KEY, url TEXT, seen REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS rooms (room_id TEXT PRIMARY KEY, worker_id TEXT)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+
+    async def heartbeat(self, worker_id, url):
+        await asyncio.to_thread(self._heartbeat, worker_id, url)
+
+    async def locate(self, room_id):
+        return await asyncio.to_thread(self._locate, room_id)
+
+    async def claim(self, room_id, worker_id, url):
+        return await asyncio.to_thread(self._claim, room_id, worker_id, url)
+
+    async def release(self, room_id, worker_id):
+        await asyncio.to_thread(self._release, room_id, worker_id)
+
+    def _heartbeat(self, worker_id, url):
+        with closing(self._connect()) as db:
+            db.execute(
+                "INSERT INTO workers (worker_id, url, seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(worker_id) DO UPDATE SET url = excluded.url, seen = excluded.seen",
+                (worker_id, url, time.time()),
+            )
+
+    def _owner(self, db, room_id):
+        return db.execute(
+            "SELECT w.worker_id, w.url FROM rooms r JOIN workers w ON w.worker_id = r.worker_id WHERE r.room_id = ? AND w.seen >= ?",
+            (room_id, time.time() - self.worker_timeout),
+        ).fetchone()
+
+    def _locate(self, room_id):
+        with closing(self._connect()) as db:
+            owner = self._owner(db, room_id)
+            if owner is not None:
+                return owner
+            least_loaded = db.execute(
+                "SELECT w.worker_id, w.url FROM workers w LEFT JOIN rooms r ON r.worker_id = w.worker_id "
+                "WHERE w.seen >= ? GROUP BY w.worker_id ORDER BY COUNT(r.room_id), w.worker_id LIMIT 1",
+                (time.time() - self.worker_timeout,),
+            ).fetchone()
+            return least_loaded if least_loaded is not None else (None, None)
+
+    def _claim(self, room_id, worker_id, url):
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            owner = self._owner(db, room_id)
+            if owner is not None and owner[0] != worker_id:
+                db.execute("COMMIT")
+                return owner
+            db.execute("INSERT OR REPLACE INTO rooms (room_id, worker_id) VALUES (?, ?)", (room_id, worker_id))
+            db.execute("COMMIT")
+            return worker_id, url
+
+    def _release(self, room_id, worker_id):
+        with closing(self._connect()) as db:
+            db.execute("DELETE FROM rooms WHERE room_id = ? AND worker_id = ?", (room_id, worker_id))
+
+
+def broker_from_env():
+    # ROOM_BROKER=sqlite (with ROOM_BROKER_PATH) when running several API processes, otherwise in-process
+    if os.environ.get("ROOM_BROKER", "inprocess") == "sqlite":
+        return SQLiteBroker(os.environ.get("ROOM_BROKER_PATH", "rooms.sqlite3"))
+    return InProcessBroker()
+
+
+class RoomManager:
+    def __init__(self, broker=None, worker_url="", simulation_factory=None, max_users=MAX_USERS, idle_timeout=ROOM_IDLE_TIMEOUT, max_rooms=0):
+        self.broker = broker or InProcessBroker()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.worker_url = worker_url
+        self.simulation_factory = simulation_factory # async room id -> started simulation handle or None
+        self.max_users = max_users
+        self.idle_timeout = idle_timeout
+        self.max_rooms = max_rooms # 0 = no limit
+        self.rooms = {}
+        self.creating = {} # Room id -> task claiming and building it, so concurrent first sockets share one room
+        self.collecting = {} # Room id -> event set once its ownership is released, so a new socket claims it afresh
+        self.persistent = set() # Rooms that are never collected (e.g. the one driving the local pygame game)
+        self.created = 0
+        self.collected = 0
+        self.task = None
+
+    async def start(self, persistent_rooms=()):
+        await self.broker.heartbeat(self.worker_id, self.worker_url)
+        for room_id in persistent_rooms:
+            owner_id, _ = await self.broker.claim(room_id, self.worker_id, self.worker_url)
+            if owner_id == self.worker_id:
+                await self._build(room_id)
+                self.persistent.add(room_id)
+        self.task = asyncio.create_task(self.maintain())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def _open(self, room_id):
+        # Claims a new room and builds it - (room, None), or (None, owner url) when another worker owns it
+        owner_id, owner_url = await self.broker.claim(room_id, self.worker_id, self.worker_url)
+        if owner_id != self.worker_id:
+            return None, owner_url
+        try:
+            return await self._build(room_id), None
+        except Exception:
+            await self.broker.release(room_id, self.worker_id) # Let another worker (or the next socket) try again
+            raise
+
+    async def _build(self, room_id):
+        simulation = await self.simulation_factory(room_id) if self.simulation_factory else None
+        room = Room(room_id, self.max_users, simulation)
+        self.rooms[room_id] = room
+        self.created += 1
+        return room
+
+    async def acquire(self, room_id):
+        # Returns (room, None) when this worker owns the room, (None, owner url) when another worker does, or
+        # (None, None) when the room is new and this worker is full
+        collecting = self.collecting.get(room_id)
+        if collecting is not None: # Claiming before the release has gone through would have the release delete the claim
+            await collecting.wait()
+        room = self.rooms.get(room_id)
+        if room is None:
+            task = self.creating.get(room_id)
+            if task is None:
+                # Counted in creating before the first await, so concurrent new rooms cannot all pass the check
+                if self.max_rooms and len(self.rooms) + len(self.creating) >= self.max_rooms:
+                    return None, None
+                task = self.creating[room_id] = asyncio.create_task(self._open(room_id))
+                task.add_done_callback(lambda _: self.creating.pop(room_id, None))
+            room, owner_url = await asyncio.shield(task)
+            if room is None:
+                return None, owner_url
+        room.sockets += 1
+        return room, None
+
+    def release(self, room):
+        room.sockets -= 1
+        if room.sockets == 0:
+            room.empty_since = time.monotonic()
+
+    async def maintain(self):
+        while True:
+            await asyncio.sleep(ROOM_GC_INTERVAL)
+            try:
+                await self.broker.heartbeat(self.worker_id, self.worker_url)
+                await self.collect_garbage()
+            except Exception as e:
+                log.warning("room maintenance failed", extra={"worker": self.worker_id, "error": repr(e)})
+
+    async def collect_garbage(self):
+        now = time.monotonic()
+        for room_id, room in list(self.rooms.items()):
+            if room_id in self.persistent or room.sockets > 0 or now - room.empty_since < self.idle_timeout:
+                continue
+            del self.rooms[room_id]
+            if room.simulation is not None:
+                room.simulation.stop()
+            released = self.collecting[room_id] = asyncio.Event()
+            try:
+                await self.broker.release(room_id, self.worker_id)
+            finally:
+                del self.collecting[room_id]
+                released.set()
+            self.collected += 1
+
+    def stats(self):
+        return {
+            "worker": self.worker_id,
+            "rooms": {
+                room_id: {
+                    "sockets": room.sockets,
+                    "connectedUsers": room.game_state["connectedUsers"],
+                    "simulation": room.simulation.stats() if room.simulation is not None else None,
+                }
+                for room_id, room in self.rooms.items()
+            },
+            "created": self.created,
+            "collected": self.collected,
+        }
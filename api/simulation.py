@@ -0,0 +1,240 @@
+# simulation.py
+# Simulation handles owned by rooms (api/rooms.py). A handle takes controller input for its match and produces the
+# match stream the TV and spectators watch:
+#   send_input(controller_input), release(user_id), match_stream, spectator_hub, start(), stop(), stats()
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from api.controls import InputBridgeSender
+from api.logs import configure_logging
+from api.match_stream import STREAM_RATE, MatchStream
+from api.metrics import dropped_ticks, tick_duration, tick_lateness
+from api.spectators import SpectatorHub
+
+SIMULATION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "simulation")
+TICK_RATE = 60 # Ticks per second, like the pygame loop (each tick advances the game by DT)
+MAX_CATCH_UP = 5 # Ticks the loop may run back to back to catch up before it drops the backlog
+GOAL_PAUSE = 3.0 # Seconds the match stays on the goal before the kick-off
+TIMING_SAMPLES = 600
+INPUT_STATS_EVERY = 60 # Ticks between jitter buffer statistics sent back from the game
+START_TIMEOUT = 30.0 # Seconds a spawned game process has to import the simulation and report ready
+
+
+class ExternalSimulation:
+    """The pygame game (simulation/football_game.py) running next to the API, reached over local UDP.
+
+    Input goes out through the input bridge and snapshots come back on the state port, so only one API
+    process per machine can own it - start() raises OSError when another process already holds the port.
+    """
+
+    def __init__(self, rate=STREAM_RATE):
+        self.input_bridge = InputBridgeSender()
+        self.spectator_hub = SpectatorHub()
+        self.match_stream = MatchStream(rate=rate, spectator_hub=self.spectator_hub)
+
+    async def start(self):
+        await self.match_stream.start()
+        self.spectator_hub.start()
+
+    def stop(self):
+        self.match_stream.stop()
+        self.spectator_hub.stop()
+
+    def send_input(self, controller_input):
+        self.input_bridge.send(controller_input)
+
+    def release(self, user_id):
+        self.input_bridge.release(user_id)
+
+    def stats(self):
+        return {"kind": "external", "stream": self.match_stream.stats()}
+
+
+class _Inputs:
+    # Stands in for the simulation's InputBridgeReceiver - FootballGame.step() calls poll() once per tick
+    def __init__(self, buffered):
+        self.buffered = buffered
+
+    def poll(self):
+        return self.buffered.poll(time.time())
+
+
+class GameRunner:
+    """Owns one headless FootballGame and advances it a tick at a time. Lives in the worker thread or process."""
+
+    def __init__(self, tick_rate=TICK_RATE):
+        if SIMULATION_DIR not in sys.path:
+            sys.path.insert(0, SIMULATION_DIR)
+        from football_game import FootballGame # pygame, numpy, scipy and scikit-learn only load once a room needs a game
+        from constants_and_util import DT
+        from state_publisher import match_snapshot
+        from jitter_buffer import BufferedInputs
+        self.dt = DT
+        self.match_snapshot = match_snapshot
+        self.buffered = BufferedInputs() # Jitter buffer per phone (simulation/jitter_buffer.py)
+        self.game = FootballGame(headless=True, input_bridge=_Inputs(self.buffered))
+        self.goal_pause_ticks = round(GOAL_PAUSE * tick_rate)
+        self.pause_left = 0
+        self.sequence = 0
+
+    def tick(self, events):
+        # events: (user id, controller input or None when the phone left, API receive time) since the last tick.
+        # Returns the snapshot, plus the jitter buffer statistics every INPUT_STATS_EVERY ticks (None otherwise)
+        game = self.game
+        for user_id, controller_input, arrival in events:
+            if controller_input is None:
+                self.buffered.remove(user_id)
+            else:
+                self.buffered.push(controller_input, arrival)
+        if self.pause_left: # Goal celebration - hold the positions, then kick off again
+            self.pause_left -= 1
+            if self.pause_left == 0:
+                game.game_over = False
+                game.winning_team = None
+                game.current_game_state = game.GAME_STATE_PLAYING
+                game.setup_initial_positions()
+        elif game.step():
+            game.current_game_state = game.GAME_STATE_OVER
+            self.pause_left = self.goal_pause_ticks
+        game.game_time += self.dt
+        self.sequence += 1
+        input_stats = self.buffered.stats() if self.sequence % INPUT_STATS_EVERY == 0 else None
+        return self.match_snapshot(game, self.sequence), input_stats
+
+
+def _run_game_process(conn, tick_rate):
+    # Worker process: receives the input events for a tick, answers with the snapshot; None stops it
+    configure_logging() # Spawned, so the API's logging setup is not inherited
+    runner = GameRunner(tick_rate)
+    conn.send(None) # Ready
+    while True:
+        inputs = conn.recv()
+        if inputs is None:
+            return
+        conn.send(runner.tick(inputs))
+
+
+class HeadlessSimulation:
+    """Server-authoritative game running inside the API.
+
+    An asyncio task ticks at a fixed rate against an absolute schedule, so sleep overshoot never accumulates
+    into drift; when a tick overruns by more than MAX_CATCH_UP periods the backlog is dropped instead of
+    bursting. The game logic itself runs off the event loop - in a dedicated thread (offload="thread") or a
+    separate process (offload="process", which also keeps strategy work from holding the API's GIL).
+    """
+
+    def __init__(self, tick_rate=TICK_RATE, offload="thread", stream_rate=STREAM_RATE):
+        if offload not in ("thread", "process"):
+            raise ValueError(f"Unknown offload mode {offload!r}")
+        self.tick_rate = tick_rate
+        self.offload = offload
+        self.spectator_hub = SpectatorHub()
+        self.match_stream = MatchStream(rate=stream_rate, spectator_hub=self.spectator_hub)
+        self.events = [] # Controller frames and disconnects since the last tick, handed to the game's jitter buffers
+        self.input_stats = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="simulation") # One thread owns the game state
+        self.runner = None
+        self.process = None
+        self.conn = None
+        self.task = None
+        self.ticks = 0
+        self.dropped_ticks = 0
+        self.lateness = deque(maxlen=TIMING_SAMPLES) # How late each tick started against the schedule, seconds
+        self.durations = deque(maxlen=TIMING_SAMPLES) # Wall time of each game step, seconds
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self.offload == "process":
+            context = multiprocessing.get_context("spawn")
+            self.conn, child_conn = context.Pipe()
+            self.process = context.Process(target=_run_game_process, args=(child_conn, self.tick_rate), daemon=True)
+            self.process.start()
+            child_conn.close() # Only the child holds it now, so recv() sees EOF if the process dies
+            # poll() rather than recv(), so a process that hangs while starting does not hold the room forever
+            if not await loop.run_in_executor(self.executor, self.conn.poll, START_TIMEOUT):
+                self.process.kill()
+                self.executor.shutdown(wait=False)
+                raise TimeoutError(f"Game process not ready after {START_TIMEOUT} seconds")
+            self.conn.recv() # EOFError if it exited instead
+        else:
+            self.runner = await loop.run_in_executor(self.executor, GameRunner, self.tick_rate)
+        await self.match_stream.start(address=None)
+        self.spectator_hub.start()
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+        self.match_stream.stop()
+        self.spectator_hub.stop()
+        if self.process is not None:
+            self.executor.submit(self.conn.send, None)
+        self.executor.shutdown(wait=False)
+
+    def _step(self, events):
+        if self.process is not None:
+            self.conn.send(events)
+            return self.conn.recv()
+        return self.runner.tick(events)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        period = 1 / self.tick_rate
+        next_tick = loop.time()
+        while True:
+            started = loop.time()
+            lateness = started - next_tick
+            self.lateness.append(lateness)
+            tick_lateness.observe(max(0.0, lateness))
+            events, self.events = self.events, []
+            snapshot, input_stats = await loop.run_in_executor(self.executor, self._step, events)
+            if input_stats is not None:
+                self.input_stats = input_stats
+            duration = loop.time() - started
+            self.durations.append(duration)
+            tick_duration.observe(duration)
+            self.match_stream.feed(snapshot)
+            self.ticks += 1
+
+            next_tick += period
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -MAX_CATCH_UP * period: # Far behind (a slow strategy, a stalled host) - skip ahead
+                dropped = int(-delay / period)
+                self.dropped_ticks += dropped
+                dropped_ticks.inc(dropped)
+                next_tick += dropped * period
+
+    def send_input(self, controller_input):
+        self.events.append((controller_input["userid"], controller_input, time.time()))
+
+    def release(self, user_id):
+        self.events.append((user_id, None, time.time()))
+
+    def stats(self):
+        def percentiles(samples):
+            if not samples:
+                return None
+            ordered = sorted(samples)
+            return {
+                "p50_ms": ordered[len(ordered) // 2] * 1000,
+                "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+
+        return {
+            "kind": "headless",
+            "offload": self.offload,
+            "tick_rate": self.tick_rate,
+            "ticks": self.ticks,
+            "dropped_ticks": self.dropped_ticks,
+            "tick_lateness": percentiles(self.lateness),
+            "step_duration": percentiles(self.durations),
+            "inputs": self.input_stats, # Jitter buffer per user: late, stale, duplicates, depth, delay
+            "stream": self.match_stream.stats(),
+        }
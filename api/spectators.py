@@ -0,0 +1,130 @@
+# spectators.py
+# Fan-out tier for extra screens and visitors' phones watching the match (/ws/spectate).
+#
+# Each frame is serialised once (STATE_TYPE in api/match_stream.py) and the same immutable bytes object is handed to
+# every spectator. A spectator's queue holds at most SPECTATOR_QUEUE_SIZE frames and drops the oldest, so a slow phone
+# only ever falls behind by that many frames. Sends are awaited directly (no per-send wait_for, which costs a task per
+# message); a single watchdog evicts spectators whose send has been stuck for longer than MAX_LAG instead.
+#
+# Measured with benchmarks/spectator_fanout.py.
+import asyncio
+import time
+from collections import deque
+from api.broadcast import EVICT_CLOSE_CODE, MAX_LAG, SEND_TIMEOUT
+from api.match_stream import encode_state
+from api.metrics import fanout_latency
+
+spectator_fanout_latency = fanout_latency.labels("spectate")
+
+SPECTATOR_QUEUE_SIZE = 1 # Newest frame only
+SPECTATOR_EVERY = 2 # Spectators get every 2nd frame of the TV stream (15 Hz) - each send costs the server a syscall per socket
+WATCHDOG_INTERVAL = 1.0 # Seconds between checks for stuck spectators
+
+
+class Spectator:
+    def __init__(self, websocket, queue_size=SPECTATOR_QUEUE_SIZE, welcome=None):
+        self.websocket = websocket
+        self.queue = deque(maxlen=queue_size)
+        self.wakeup = asyncio.Event()
+        self.sending_since = None # Set while a send is in flight
+        self.sent = 0
+        self.dropped = 0 # Frames pushed out of the queue by newer ones
+        self.evicted = False
+        if welcome is not None:
+            self.offer(welcome)
+        self.task = asyncio.create_task(self.run())
+
+    def offer(self, payload, published=None):
+        # published is the monotonic time the frame was produced, for the fan-out latency histogram
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append((payload, published))
+        self.wakeup.set()
+
+    async def run(self):
+        while True:
+            if not self.queue:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            payload, published = self.queue.popleft()
+            self.sending_since = time.monotonic()
+            try:
+                await self.websocket.send_bytes(payload)
+            except Exception:
+                return # Socket is gone - the endpoint's receive loop cleans up
+            self.sending_since = None
+            self.sent += 1
+            if published is not None:
+                spectator_fanout_latency.observe(time.monotonic() - published)
+
+    async def evict(self):
+        self.evicted = True
+        self.task.cancel()
+        self.queue.clear()
+        try:
+            await asyncio.wait_for(self.websocket.close(code=EVICT_CLOSE_CODE), SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    def stop(self):
+        self.task.cancel()
+
+
+class SpectatorHub:
+    """Serialises each frame once and fans the shared bytes out to every spectator."""
+
+    def __init__(self, every=SPECTATOR_EVERY, queue_size=SPECTATOR_QUEUE_SIZE, max_lag=MAX_LAG):
+        self.every = every
+        self.queue_size = queue_size
+        self.max_lag = max_lag
+        self.spectators = set()
+        self.latest = None # Newest encoded frame, sent to spectators as they join
+        self.frames_published = 0
+        self.evictions = 0
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.watchdog())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    def publish(self, frame):
+        if frame.index % self.every:
+            return
+        payload = encode_state(frame.index, frame.values)
+        self.latest = payload
+        self.frames_published += 1
+        for spectator in self.spectators:
+            spectator.offer(payload, frame.created)
+
+    def subscribe(self, websocket):
+        spectator = Spectator(websocket, self.queue_size, welcome=self.latest)
+        self.spectators.add(spectator)
+        return spectator
+
+    def unsubscribe(self, spectator):
+        self.spectators.discard(spectator)
+        spectator.stop()
+
+    async def watchdog(self):
+        while True:
+            await asyncio.sleep(WATCHDOG_INTERVAL)
+            now = time.monotonic()
+            for spectator in list(self.spectators):
+                if spectator.sending_since is not None and now - spectator.sending_since > self.max_lag:
+                    self.spectators.discard(spectator)
+                    self.evictions += 1
+                    asyncio.create_task(spectator.evict())
+
+    def stats(self):
+        return {
+            "spectators": len(self.spectators),
+            "frames_published": self.frames_published,
+            "sent": sum(spectator.sent for spectator in self.spectators),
+            "dropped": sum(spectator.dropped for spectator in self.spectators),
+            "queue_depth": sum(len(spectator.queue) for spectator in self.spectators),
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,156 @@
+# hardware_in_loop.py
+# Runs the simulation's hardware-in-the-loop mode (simulation/vision_bridge.py) on recorded footage, with no camera,
+# and reports frame-to-decision latency, pipeline throughput and how far the poses it read are from the truth.
+#
+#   python benchmarks/hardware_in_loop.py                      # record a headless match as synthetic footage, replay it
+#   python benchmarks/hardware_in_loop.py --realtime           # replay at the video's frame rate through CameraCapture
+#   python benchmarks/hardware_in_loop.py --video match.mp4 --corners 40,40,1000,40,1000,680,40,680  # real footage
+#
+# The synthetic footage is a headless match drawn from above: green pitch with a margin around it, each robot's ArUco
+# marker (vision_bridge.ROBOT_MARKERS) turned to its heading, an orange ball. Its poses are the ground truth. Without
+# --realtime every frame is read and becomes one tick, so runs are repeatable.
+import argparse
+import contextlib
+import math
+import os
+import random
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+import scenarios # Puts simulation/ on sys.path
+
+from constants_and_util import BALL_RADIUS, PITCH_HEIGHT, PITCH_WIDTH, ROBOT_RADIUS # noqa: E402
+from football_game import FootballGame # noqa: E402
+from vision_bridge import MARKER_DICTIONARY, ROBOT_MARKERS, VisionBridge # noqa: E402
+
+DEFAULT_TICKS = 600
+DEFAULT_SEED = 2025
+DEFAULT_FPS = 30
+SCALE = 960 / PITCH_WIDTH # Image pixels per pitch unit
+MARGIN = 40 # Pixels of floor around the pitch
+PITCH_COLOUR = (40, 140, 40)
+BALL_COLOUR = (0, 140, 255) # Orange, BGR
+
+
+def marker_images(side):
+    # Each robot's marker with a white quiet zone, side x side pixels
+    dictionary = cv2.aruco.getPredefinedDictionary(MARKER_DICTIONARY)
+    border = side // 8
+    images = {}
+    for robot_id, marker_id in ROBOT_MARKERS.items():
+        marker = cv2.aruco.generateImageMarker(dictionary, marker_id, side - 2 * border)
+        marker = cv2.copyMakeBorder(marker, border, border, border, border, cv2.BORDER_CONSTANT, value=255)
+        images[robot_id] = cv2.cvtColor(marker, cv2.COLOR_GRAY2BGR)
+    return images
+
+
+def draw_frame(frame, game, markers):
+    frame[:] = (90, 90, 90)
+    cv2.rectangle(frame, (MARGIN, MARGIN), (MARGIN + int(PITCH_WIDTH * SCALE), MARGIN + int(PITCH_HEIGHT * SCALE)), PITCH_COLOUR, -1)
+    for robot in game.robots:
+        marker = markers[robot.robot_id]
+        side = marker.shape[0]
+        centre = (MARGIN + robot.x * SCALE, MARGIN + robot.y * SCALE)
+        # Marker centre onto the robot's centre, its top edge along the robot's heading
+        rotation = cv2.getRotationMatrix2D((side / 2, side / 2), -math.degrees(robot.angle), 1)
+        rotation[:, 2] += (centre[0] - side / 2, centre[1] - side / 2)
+        cv2.warpAffine(marker, rotation, (frame.shape[1], frame.shape[0]), dst=frame, borderMode=cv2.BORDER_TRANSPARENT)
+    ball = (int(MARGIN + game.ball.x * SCALE), int(MARGIN + game.ball.y * SCALE))
+    cv2.circle(frame, ball, max(3, int(BALL_RADIUS * SCALE)), BALL_COLOUR, -1)
+
+
+def record(path, ticks, seed, fps):
+    # Plays a headless match and writes it to path as overhead footage. Returns the poses of every frame.
+    random.seed(seed)
+    np.random.seed(seed)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        game = FootballGame(headless=True)
+    size = (int(PITCH_WIDTH * SCALE) + 2 * MARGIN, int(PITCH_HEIGHT * SCALE) + 2 * MARGIN)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    markers = marker_images(int(2 * ROBOT_RADIUS * SCALE))
+    frame = np.zeros((size[1], size[0], 3), np.uint8)
+    truth = []
+    for _ in range(ticks):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            game.step()
+        draw_frame(frame, game, markers)
+        writer.write(frame)
+        poses = {robot.robot_id: (robot.x, robot.y, robot.angle) for robot in game.robots}
+        poses["ball"] = (game.ball.x, game.ball.y)
+        truth.append(poses)
+    writer.release()
+    return truth
+
+
+def pose_errors(poses, truth):
+    # Position errors (pitch units) and heading errors (degrees) of what was seen, and what was missed
+    distances, headings, missed = [], [], 0
+    for key, true_pose in truth.items():
+        pose = poses.get(key)
+        if pose is None:
+            missed += 1
+            continue
+        distances.append(math.hypot(pose[0] - true_pose[0], pose[1] - true_pose[1]))
+        if key != "ball":
+            headings.append(abs(math.degrees((pose[2] - true_pose[2] + math.pi) % (2 * math.pi) - math.pi)))
+    return distances, headings, missed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hardware-in-the-loop mode on recorded footage")
+    parser.add_argument("--video", help="recorded footage to replay instead of synthetic footage")
+    parser.add_argument("--corners", help="pitch corners in the footage, x,y from top left clockwise (default: the frame)")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS, help="length of the synthetic footage in frames")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--fps", type=int, default=DEFAULT_FPS, help="frame rate of the synthetic footage")
+    parser.add_argument("--realtime", action="store_true", help="pace the replay at the video's frame rate, dropping late frames")
+    args = parser.parse_args()
+
+    truth = None
+    corners = None
+    path = args.video
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "match.avi")
+        truth = record(path, args.ticks, args.seed, args.fps)
+        right, bottom = MARGIN + PITCH_WIDTH * SCALE, MARGIN + PITCH_HEIGHT * SCALE
+        corners = ((MARGIN, MARGIN), (right, MARGIN), (right, bottom), (MARGIN, bottom))
+        print(f"recorded {len(truth)} frames of a headless match to {path}")
+    elif args.corners:
+        from vision_bridge import parse_corners
+        corners = parse_corners(args.corners)
+
+    bridge = VisionBridge(path, corners, realtime=args.realtime)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        game = FootballGame(headless=True, vision_bridge=bridge)
+    distances, headings, missed, seen = [], [], 0, 0
+    while bridge.running:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            game.step()
+        if bridge.latencies and bridge.frames != seen: # A new frame this tick
+            seen = bridge.frames
+            if truth is not None and not args.realtime and seen <= len(truth):
+                frame_distances, frame_headings, frame_missed = pose_errors(bridge.poses, truth[seen - 1])
+                distances += frame_distances
+                headings += frame_headings
+                missed += frame_missed
+    bridge.close()
+
+    latency = bridge.latency_stats()
+    pipeline = bridge.pipeline_stats()
+    stages = ", ".join(f"{stage} {ms:.2f} ms" for stage, ms in pipeline["stage_ms"].items())
+    print(f"{pipeline['frames']} frames at {pipeline['fps']:.0f} frames/s ({stages})")
+    if "dropped" in pipeline:
+        print(f"capture: {pipeline['captured']} captured, {pipeline['dropped']} dropped")
+    if latency:
+        print(f"frame to decision p50 {latency['p50_ms']:.2f} ms, p99 {latency['p99_ms']:.2f} ms, max {latency['max_ms']:.2f} ms")
+    if distances:
+        distances.sort()
+        print(f"pose error p50 {distances[len(distances) // 2]:.2f}, max {distances[-1]:.2f} pitch units; "
+              f"heading error mean {sum(headings) / max(1, len(headings)):.1f} deg; {missed} of {missed + len(distances)} poses missed")
+
+
+if __name__ == "__main__":
+    main()
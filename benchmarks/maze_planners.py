@@ -0,0 +1,218 @@
+# maze_planners.py
+# Compares the maze planners in scripts/maze_planner.py with the ones the planner scripts used before (BFS with
+# list.pop(0) in raj_bfs.py, the min()-scan A* in oze_astar.py, both resetting every node after each search). The
+# next-hop table only runs on mazes small enough for it.
+#
+#   python benchmarks/maze_planners.py                         # 10x10 (the real maze) up to 200x200
+#   python benchmarks/maze_planners.py --sizes 50 100 --frames 100
+#
+# Each run replays the camera loop: a robot walks its planned path one cell per frame and the planner is asked for
+# the path again on every frame; every --goal-every frames the goal jumps to a random cell. The mazes are random
+# spanning-tree mazes with some extra walls knocked out (--braid), so there is more than one way round. The old A*
+# marks cells visited when they are queued, so in such mazes its paths are sometimes longer than the shortest.
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "scripts"))
+from maze_planner import MAX_TABLE_NODES, AStarPlanner, DStarLitePlanner, NextHopTable
+
+DEFAULT_SIZES = (10, 50, 100, 200)
+DEFAULT_FRAMES = 300
+DEFAULT_GOAL_EVERY = 60 # Frames between goal moves - 1 second at 60 fps
+DEFAULT_BRAID = 0.1 # Share of the remaining walls removed to make loops
+DEFAULT_SEED = 2025
+DIRECTIONS = ((-1, 0, 0, 2), (0, 1, 1, 3), (1, 0, 2, 0), (0, -1, 3, 1)) # di, dj, wall bit, opposite wall bit
+
+
+class Node:
+    # Same fields as the old planner scripts' Node, so the legacy planners run unchanged
+    def __init__(self, maze_coordinates):
+        self.maze_coordinates = maze_coordinates
+        self.parent = None
+        self.children = []
+        self.visited = False
+
+
+class RandomMaze:
+    def __init__(self, size, braid, rng):
+        # Cells use the scripts' wall strings: top, right, bottom, left, '1' = wall
+        walls = [[[1, 1, 1, 1] for _ in range(size)] for _ in range(size)]
+        visited = [[False] * size for _ in range(size)]
+        stack = [(0, 0)]
+        visited[0][0] = True
+        while stack: # Recursive backtracker - a spanning tree, exactly one route between any two cells
+            i, j = stack[-1]
+            options = [
+                (i + di, j + dj, wall, opposite) for di, dj, wall, opposite in DIRECTIONS
+                if 0 <= i + di < size and 0 <= j + dj < size and not visited[i + di][j + dj]
+            ]
+            if not options:
+                stack.pop()
+                continue
+            ni, nj, wall, opposite = rng.choice(options)
+            walls[i][j][wall] = walls[ni][nj][opposite] = 0
+            visited[ni][nj] = True
+            stack.append((ni, nj))
+        for i in range(size):
+            for j in range(size):
+                for di, dj, wall, opposite in DIRECTIONS[1:3]: # Right and bottom, so each wall is tried once
+                    ni, nj = i + di, j + dj
+                    if ni < size and nj < size and walls[i][j][wall] and rng.random() < braid:
+                        walls[i][j][wall] = walls[ni][nj][opposite] = 0
+        self.binary = [["".join(map(str, cell)) for cell in row] for row in walls]
+        self.nodes = [[Node((i, j)) for j in range(size)] for i in range(size)]
+        for i in range(size):
+            for j in range(size):
+                for di, dj, wall, _ in DIRECTIONS:
+                    if self.binary[i][j][wall] == "0":
+                        self.nodes[i][j].children.append(self.nodes[i + di][j + dj])
+
+    def reset_nodes(self):
+        for row in self.nodes:
+            for node in row:
+                node.visited = False
+                node.parent = None
+
+
+class LegacyBFS:
+    # Plan.update_path from raj_bfs.py before the shared planner
+    def __init__(self, maze):
+        self.maze = maze
+
+    def plan(self, start, goal):
+        open_list = [start]
+        start.visited = True
+        while open_list:
+            current_node = open_list.pop(0)
+            if current_node == goal:
+                path = []
+                while current_node:
+                    path.append(current_node)
+                    current_node = current_node.parent
+                self.maze.reset_nodes()
+                return path[::-1]
+            for child in current_node.children:
+                if not child.visited:
+                    child.parent = current_node
+                    child.visited = True
+                    open_list.append(child)
+        self.maze.reset_nodes()
+        return []
+
+
+class LegacyAStar:
+    # Plan.update_path from oze_astar.py before the shared planner
+    def __init__(self, maze):
+        self.maze = maze
+
+    def manhattan_distance(self, node1, node2):
+        x1, y1 = node1.maze_coordinates
+        x2, y2 = node2.maze_coordinates
+        return abs(x1 - x2) + abs(y1 - y2)
+
+    def plan(self, start, goal):
+        open_list = [(0, start)]
+        start.visited = True
+        g_scores = {start: 0}
+        while open_list:
+            current_node = min(open_list, key=lambda x: x[0])[1]
+            open_list = [x for x in open_list if x[1] != current_node]
+            if current_node == goal:
+                path = []
+                while current_node:
+                    path.append(current_node)
+                    current_node = current_node.parent
+                self.maze.reset_nodes()
+                return path[::-1]
+            for child in current_node.children:
+                if not child.visited:
+                    child.visited = True
+                    child.parent = current_node
+                    g_scores[child] = g_scores[current_node] + 1
+                    open_list.append((g_scores[child] + self.manhattan_distance(child, goal), child))
+        self.maze.reset_nodes()
+        return []
+
+
+PLANNERS = {
+    "legacy BFS": LegacyBFS,
+    "legacy A*": LegacyAStar,
+    "heapq A*": AStarPlanner,
+    "D* Lite": DStarLitePlanner,
+    "next-hop": lambda maze: NextHopTable(maze, cache_dir=None), # Only up to MAX_TABLE_NODES cells
+}
+
+
+def camera_queries(maze, frames, goal_every, seed):
+    # The (start, goal) asked for on each frame. Built once with BFS and replayed for every planner, so they all answer
+    # the same questions even where several shortest paths exist.
+    rng = random.Random(seed)
+    cells = [node for row in maze.nodes for node in row]
+    planner = LegacyBFS(maze)
+    start, goal = rng.choice(cells), rng.choice(cells)
+    queries = []
+    for frame in range(frames):
+        if frame and frame % goal_every == 0:
+            goal = rng.choice(cells)
+        queries.append((start, goal))
+        path = planner.plan(start, goal)
+        if len(path) > 1:
+            start = path[1] # The robot reaches the next cell by the next frame
+        else:
+            start = rng.choice(cells) # Arrived - put the robot somewhere else
+    return queries
+
+
+def run(planner_class, maze, queries):
+    # Per-frame plan times in ms and the path lengths (to check the planners agree). Building the planner is not
+    # timed - for the next-hop table that is the precompute, printed separately.
+    started = time.perf_counter()
+    planner = planner_class(maze)
+    if isinstance(planner, NextHopTable):
+        print(f"{'':>9} {'':>11} table built in {time.perf_counter() - started:.2f} s, {planner.next_hop.nbytes >> 10} KiB")
+    times = []
+    lengths = []
+    for start, goal in queries:
+        started = time.perf_counter()
+        path = planner.plan(start, goal)
+        times.append(1000 * (time.perf_counter() - started))
+        lengths.append(len(path))
+    return times, lengths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the maze planners on the static maze")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    parser.add_argument("--goal-every", type=int, default=DEFAULT_GOAL_EVERY)
+    parser.add_argument("--braid", type=float, default=DEFAULT_BRAID)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    print(f"{'maze':>9} {'planner':>11} {'mean ms':>9} {'p99 ms':>9} {'max ms':>9} {'speed-up':>9} {'longer':>7}")
+    for size in args.sizes:
+        maze = RandomMaze(size, args.braid, random.Random(args.seed))
+        queries = camera_queries(maze, args.frames, args.goal_every, args.seed)
+        baseline = None
+        shortest = None
+        for name, planner_class in PLANNERS.items():
+            if name == "next-hop" and size * size > MAX_TABLE_NODES:
+                continue
+            times, lengths = run(planner_class, maze, queries)
+            mean = statistics.fmean(times)
+            ordered = sorted(times)
+            if shortest is None: # BFS - the reference for speed and path length
+                baseline, shortest = mean, lengths
+            longer = sum(length != best for length, best in zip(lengths, shortest)) # Frames with a longer path
+            print(
+                f"{f'{size}x{size}':>9} {name:>11} {mean:9.3f} {ordered[int(0.99 * (len(ordered) - 1))]:9.3f} "
+                f"{ordered[-1]:9.3f} {baseline / mean:8.1f}x {longer:7}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# robot_commands.py
+# Drives the UDP robot command path (scripts/command_sender.py UdpCommandSender -> scripts/mock_robot.py) with no
+# hardware and reports throughput, acks and round-trip times.
+#
+#   python benchmarks/robot_commands.py                       # mock robot in this process, 500 commands/s for 5 s
+#   python benchmarks/robot_commands.py --rate 60 --loss 0.1  # the sender's retries against a lossy link
+#   python benchmarks/robot_commands.py --robot 192.168.188.116:9750  # a real robot (or a mock running elsewhere)
+#
+# The loop posts setpoints like the vision loop would (--post-rate per second); the sender coalesces them down to
+# --rate. The in-process mock shares the interpreter with the sender, so round trips include some GIL waiting.
+import argparse
+import math
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "scripts"))
+from command_sender import UdpCommandSender
+from mock_robot import MockRobot
+
+DEFAULT_RATE = 500.0
+DEFAULT_POST_RATE = 1000.0
+DEFAULT_DURATION = 5.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the UDP robot command path against the mock robot")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="commands sent per second")
+    parser.add_argument("--post-rate", type=float, default=DEFAULT_POST_RATE, help="setpoints posted per second")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION)
+    parser.add_argument("--loss", type=float, default=0.0, help="packet loss at the in-process mock robot")
+    parser.add_argument("--robot", help="host:port of a robot to use instead of the in-process mock")
+    args = parser.parse_args()
+
+    robot = None
+    if args.robot:
+        host, port = args.robot.rsplit(":", 1)
+        address = (host, int(port))
+    else:
+        robot = MockRobot(port=0, loss=args.loss).start()
+        address = robot.address
+    sender = UdpCommandSender(*address, rate=args.rate)
+
+    post_worst = 0.0
+    started = time.monotonic()
+    next_post = started
+    while time.monotonic() - started < args.duration:
+        t = time.monotonic() - started
+        before = time.perf_counter()
+        sender.post((int(200 * math.sin(t)), int(1000 * math.cos(t / 2)))) # Weave about
+        post_worst = max(post_worst, time.perf_counter() - before)
+        next_post += 1 / args.post_rate
+        time.sleep(max(0, next_post - time.monotonic()))
+    time.sleep(0.2) # Last acks
+    elapsed = time.monotonic() - started
+    stats = sender.stats()
+    sender.close()
+
+    print(f"sent {stats['sent'] / elapsed:.0f}/s, acked {stats['acked'] / elapsed:.0f}/s "
+          f"({stats['acked'] / max(1, stats['sent']):.1%}), coalesced {stats['coalesced']}, retries {stats['retries']}, "
+          f"timed out {stats['timed_out']}, errors {stats['errors']}")
+    print(f"round trip p50 {stats['rtt_ms_p50']} ms, p99 {stats['rtt_ms_p99']} ms; worst post() {post_worst * 1e6:.0f} us")
+    if robot is not None:
+        robot.close()
+        print(f"mock robot: {robot.stats()}")
+
+
+if __name__ == "__main__":
+    main()
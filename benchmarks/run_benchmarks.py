@@ -0,0 +1,232 @@
+# run_benchmarks.py
+# Runs every scenario in scenarios.py against every strategy registered on FootballGame and
+# compares the results with a stored baseline.
+#
+#   python benchmarks/run_benchmarks.py                     # run and compare with benchmarks/baseline.json
+#   python benchmarks/run_benchmarks.py --update-baseline   # run and overwrite the baseline
+#
+# Exits with status 1 when any metric regresses by more than --tolerance, or when the navigation check fails.
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import scenarios
+from constants_and_util import ROBOT_RADIUS # noqa: E402 - simulation/ is on sys.path through scenarios
+from navigation import FlowFieldNavigator # noqa: E402
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCHMARKS_DIR, "results.json")
+DEFAULT_SEED = 2025
+DEFAULT_TICKS = 1500 # 150 seconds of game time at DT = 0.1
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_LATENCY_FLOOR_US = 1.0 # Latency changes smaller than this are timer noise, not regressions
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_decisions(game, latencies):
+    # Wrap each robot's strategy so every decision is timed individually
+    for robot in game.robots:
+        decide = robot.strategy.make_strategic_decision
+
+        def timed_decision(robot_arg, game_arg, game_state, decide=decide):
+            start = time.perf_counter()
+            try:
+                return decide(robot_arg, game_arg, game_state)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+        robot.strategy.make_strategic_decision = timed_decision
+
+
+def check_navigation():
+    # simulation/navigation.py must not bend a clear path: with nothing in the way a robot heads straight for its
+    # target, whatever the angle, and with a robot on the line it turns off it. Returns the failures.
+    navigator = FlowFieldNavigator()
+    robot = SimpleNamespace(x=450.0, y=300.0)
+    failures = []
+    for degrees in range(0, 360, 15):
+        angle = math.radians(degrees)
+        navigator.start_tick([robot])
+        heading = navigator.heading(robot, robot.x + 400 * math.cos(angle), robot.y + 250 * math.sin(angle), angle)
+        if heading != angle:
+            failures.append(f"clear path at {degrees} deg: heading {math.degrees(heading):.1f} deg")
+    # Follow the headings past a robot standing on the line
+    blocker = SimpleNamespace(x=robot.x + 120, y=robot.y)
+    target_x, target_y = robot.x + 400, robot.y
+    closest = math.inf
+    for _ in range(200):
+        if math.hypot(target_x - robot.x, target_y - robot.y) <= ROBOT_RADIUS:
+            break
+        navigator.start_tick([robot, blocker])
+        heading = navigator.heading(robot, target_x, target_y, math.atan2(target_y - robot.y, target_x - robot.x))
+        robot.x += ROBOT_RADIUS / 3 * math.cos(heading)
+        robot.y += ROBOT_RADIUS / 3 * math.sin(heading)
+        closest = min(closest, math.hypot(robot.x - blocker.x, robot.y - blocker.y))
+    else:
+        failures.append("robot in the way: target not reached")
+    if closest < 2 * ROBOT_RADIUS:
+        failures.append(f"robot in the way: passed {closest:.1f} from it, robots overlap below {2 * ROBOT_RADIUS}")
+    return failures
+
+
+def measure_speed(scenario_name, strategy_name, seed, ticks):
+    game = scenarios.build_game(scenario_name, strategy_name, seed)
+    latencies = []
+    time_decisions(game, latencies)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        scenarios.tick(game, scenario_name)
+    elapsed = time.perf_counter() - start
+    return ticks / elapsed, latencies, game.decision_budget.stats()
+
+
+def measure_allocations(scenario_name, strategy_name, seed, ticks):
+    # Separate pass - tracemalloc slows everything down, so it must not run during the timed pass
+    game = scenarios.build_game(scenario_name, strategy_name, seed)
+    allocated = 0
+    tracemalloc.start()
+    try:
+        for _ in range(ticks):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            scenarios.tick(game, scenario_name)
+            _, peak = tracemalloc.get_traced_memory()
+            allocated += peak - before
+    finally:
+        tracemalloc.stop()
+    return allocated / ticks
+
+
+def run_case(scenario_name, strategy_name, seed, ticks, repeat):
+    best_ticks_per_sec = 0.0
+    best_latencies = []
+    best_budget_stats = {}
+    for _ in range(repeat):
+        ticks_per_sec, latencies, budget_stats = measure_speed(scenario_name, strategy_name, seed, ticks)
+        if ticks_per_sec > best_ticks_per_sec:
+            best_ticks_per_sec, best_latencies, best_budget_stats = ticks_per_sec, latencies, budget_stats
+    return {
+        "ticks_per_sec": round(best_ticks_per_sec, 1),
+        "decisions": len(best_latencies),
+        "decision_latency_us": {
+            "mean": round(statistics.fmean(best_latencies) * 1e6, 2) if best_latencies else 0.0,
+            "p50": round(percentile(best_latencies, 0.50) * 1e6, 2),
+            "p99": round(percentile(best_latencies, 0.99) * 1e6, 2),
+        },
+        "alloc_bytes_per_tick": round(measure_allocations(scenario_name, strategy_name, seed, ticks), 1),
+        "decision_overruns": best_budget_stats.get("total_overruns", 0), # Informational - not compared with the baseline
+        "cached_decisions": best_budget_stats.get("total_cached_decisions", 0),
+    }
+
+
+def compare(results, baseline, tolerance, latency_floor_us=DEFAULT_LATENCY_FLOOR_US):
+    # Returns a list of human readable regressions - higher ticks/sec is better, everything else lower is better
+    regressions = []
+    for case, current in results["results"].items():
+        reference = baseline.get("results", {}).get(case)
+        if reference is None:
+            continue
+        checks = [
+            ("ticks_per_sec", current["ticks_per_sec"], reference["ticks_per_sec"], True, 0),
+            ("decision_latency_us.p50", current["decision_latency_us"]["p50"], reference["decision_latency_us"]["p50"], False, latency_floor_us),
+            ("alloc_bytes_per_tick", current["alloc_bytes_per_tick"], reference["alloc_bytes_per_tick"], False, 0),
+        ]
+        for metric, value, expected, higher_is_better, floor in checks:
+            if not expected or abs(value - expected) <= floor:
+                continue
+            if higher_is_better and value < expected * (1 - tolerance):
+                regressions.append(f"{case} {metric}: {value} vs baseline {expected} ({(1 - value / expected) * 100:.0f}% slower)")
+            elif not higher_is_better and value > expected * (1 + tolerance):
+                regressions.append(f"{case} {metric}: {value} vs baseline {expected} ({(value / expected - 1) * 100:.0f}% higher)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless simulation benchmarks")
+    parser.add_argument("--scenario", action="append", choices=sorted(scenarios.SCENARIOS), help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--strategy", action="append", help="Strategy to run (repeatable, default: all)")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per case, the fastest is kept")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative regression, e.g. 0.25 = 25%%")
+    parser.add_argument("--latency-floor-us", type=float, default=DEFAULT_LATENCY_FLOOR_US, help="Ignore decision latency changes smaller than this")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to the baseline file instead of comparing")
+    args = parser.parse_args(argv)
+
+    failures = check_navigation()
+    if failures:
+        print("NAVIGATION CHECK FAILED:", file=sys.stderr)
+        for failure in failures:
+            print(f"  {failure}", file=sys.stderr)
+        return 1
+
+    # Strategies and the game print debug output - keep it out of the benchmark report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        strategy_names = args.strategy or scenarios.strategy_names()
+    scenario_names = args.scenario or list(scenarios.SCENARIOS)
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "ticks": args.ticks,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    for scenario_name in scenario_names:
+        for strategy_name in strategy_names:
+            case = f"{scenario_name}/{strategy_name}"
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result = run_case(scenario_name, strategy_name, args.seed, args.ticks, args.repeat)
+            results["results"][case] = result
+            print(f"{case:40s} {result['ticks_per_sec']:10.1f} ticks/s  p50 {result['decision_latency_us']['p50']:8.1f} us  p99 {result['decision_latency_us']['p99']:8.1f} us  {result['alloc_bytes_per_tick']:10.1f} B/tick")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline} - run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.latency_floor_us)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSION (tolerance {args.tolerance:.0%}):", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        return 1
+    print(f"No regressions against baseline (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
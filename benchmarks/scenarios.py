@@ -0,0 +1,110 @@
+# scenarios.py
+# Fixed-seed headless scenarios used by run_benchmarks.py.
+# Each scenario builds a headless FootballGame and places the robots and ball for a specific situation.
+import math
+import os
+import random
+import sys
+
+import numpy as np
+
+SIMULATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simulation")
+if SIMULATION_DIR not in sys.path:
+    sys.path.insert(0, SIMULATION_DIR)
+
+from football_game import FootballGame # noqa: E402
+from constants_and_util import * # noqa: E402,F401,F403
+
+
+def team_robots(game, team):
+    return [robot for robot in game.robots if robot.team == team]
+
+
+def reset_ball(game, x, y):
+    game.ball.x = x
+    game.ball.y = y
+    game.ball.vx = 0
+    game.ball.vy = 0
+
+
+def setup_kickoff(game):
+    # Standard kickoff - robots in their starting regions, ball on the centre spot
+    game.setup_initial_positions()
+
+
+def setup_scramble(game):
+    # All eight robots packed in a ring around a loose ball in the centre circle
+    centre_x, centre_y = PITCH_WIDTH / 2, PITCH_HEIGHT / 2
+    reset_ball(game, centre_x, centre_y)
+    ring_radius = 3 * ROBOT_RADIUS
+    for i, robot in enumerate(game.robots):
+        angle = 2 * math.pi * i / len(game.robots) + random.uniform(-0.1, 0.1)
+        robot.x = centre_x + ring_radius * math.cos(angle)
+        robot.y = centre_y + ring_radius * math.sin(angle)
+        robot.angle = angle + math.pi # Facing the ball
+        robot.dribbling = False
+
+
+def setup_pass_chain(game):
+    # Team A strung out across the pitch with the ball at the back, team B marking loosely - forces repeated passes
+    attackers = team_robots(game, "A")
+    defenders = team_robots(game, "B")
+    lane_y = PITCH_HEIGHT / 2
+    for i, robot in enumerate(attackers):
+        robot.x = PITCH_WIDTH * (0.15 + 0.2 * i)
+        robot.y = lane_y + (-1) ** i * 4 * ROBOT_RADIUS
+        robot.angle = 0
+        robot.dribbling = False
+    for i, robot in enumerate(defenders):
+        robot.x = PITCH_WIDTH * (0.25 + 0.2 * i)
+        robot.y = lane_y + (-1) ** (i + 1) * 8 * ROBOT_RADIUS + random.uniform(-ROBOT_RADIUS, ROBOT_RADIUS)
+        robot.angle = math.pi
+        robot.dribbling = False
+    carrier = attackers[0]
+    reset_ball(game, carrier.x + carrier.mouth_offset * math.cos(carrier.angle), carrier.y + carrier.mouth_offset * math.sin(carrier.angle))
+    carrier.dribbling = True
+
+
+def setup_goalmouth(game):
+    # Everyone crowded in front of team B's goal with the ball a few robot widths off the line
+    goal_x = game.goal_b.x
+    goal_y = game.goal_b.y
+    reset_ball(game, goal_x - 6 * ROBOT_RADIUS, goal_y + random.uniform(-ROBOT_RADIUS, ROBOT_RADIUS))
+    for i, robot in enumerate(game.robots):
+        column, row = divmod(i, 4)
+        robot.x = goal_x - (4 + 3 * column) * ROBOT_RADIUS - random.uniform(0, ROBOT_RADIUS)
+        robot.y = goal_y + (row - 1.5) * 2.5 * ROBOT_RADIUS
+        robot.angle = 0 if robot.team == "A" else math.pi
+        robot.dribbling = False
+
+
+SCENARIOS = {
+    "kickoff": setup_kickoff,
+    "scramble": setup_scramble,
+    "pass_chain": setup_pass_chain,
+    "goalmouth": setup_goalmouth,
+}
+
+
+def build_game(scenario_name, strategy_name, seed):
+    """Build a headless game with both teams on ``strategy_name`` and set up ``scenario_name`` deterministically."""
+    random.seed(seed)
+    np.random.seed(seed)
+    game = FootballGame(headless=True, team_strategies={"A": strategy_name, "B": strategy_name})
+    SCENARIOS[scenario_name](game)
+    return game
+
+
+def tick(game, scenario_name):
+    # Advance one tick; on a goal the scenario is set up again so the situation being measured persists
+    if game.step():
+        game.game_over = False
+        game.winning_team = None
+        SCENARIOS[scenario_name](game)
+    game.game_time += DT
+
+
+def strategy_names():
+    # The strategy registry lives on FootballGame so the benchmarks pick up new strategies automatically
+    game = FootballGame(headless=True, team_strategies={"A": "SimpleGoToBall", "B": "SimpleGoToBall"})
+    return list(game.strategies)
@@ -0,0 +1,188 @@
+# spectator_fanout.py
+# Starts the API server, feeds it synthetic match snapshots over the local state port and connects a crowd of
+# /ws/spectate clients, then reports delivered frames and the server's CPU use.
+#
+#   python benchmarks/spectator_fanout.py                      # 1000 spectators for 10 seconds
+#   python benchmarks/spectator_fanout.py --spectators 200 --duration 5
+#
+# The simulation must not be running (it uses the same state port). Server CPU is read from /proc, so it is only
+# reported on Linux. The clients run in this process and share the machine with the server, so they are kept as
+# cheap as possible: a bare asyncio protocol that does the websocket handshake and counts binary frames.
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+from api.match_stream import ROBOT_IDS, SNAPSHOT, STATE_ADDRESS, STREAM_RATE
+from api.spectators import SPECTATOR_EVERY
+
+DEFAULT_SPECTATORS = 1000
+DEFAULT_DURATION = 10.0
+DEFAULT_PORT = 8031
+SIMULATION_RATE = 60 # Snapshots per second sent to the server, like the pygame loop
+CONNECT_BATCH = 50 # Spectators connected concurrently while ramping up
+
+
+def server_cpu_seconds(pid):
+    # utime + stime of the server process, or None when /proc is not available
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def fake_snapshot(sequence):
+    t = sequence / SIMULATION_RATE
+    robot_values = []
+    for i in range(len(ROBOT_IDS)):
+        robot_values.extend((450 + 300 * math.cos(t + i), 300 + 200 * math.sin(t + i), t + i))
+    return SNAPSHOT.pack(sequence, 1, 450 + 400 * math.sin(t), 300 + 250 * math.cos(t), *robot_values, 1, 0, t, 0.5)
+
+
+async def feed_snapshots(stop):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sequence = 0
+    while not stop.is_set():
+        sequence += 1
+        sock.sendto(fake_snapshot(sequence), STATE_ADDRESS)
+        await asyncio.sleep(1 / SIMULATION_RATE)
+    sock.close()
+
+
+class SpectatorClient(asyncio.Protocol):
+    def __init__(self, port, counts, deflate):
+        self.port = port
+        self.counts = counts
+        self.deflate = deflate
+        self.buffer = bytearray()
+        self.upgraded = False
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        key = base64.b64encode(os.urandom(16)).decode()
+        extensions = "Sec-WebSocket-Extensions: permessage-deflate\r\n" if self.deflate else ""
+        transport.write((
+            f"GET /ws/spectate HTTP/1.1\r\nHost: 127.0.0.1:{self.port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n{extensions}\r\n"
+        ).encode())
+
+    def data_received(self, data):
+        self.buffer += data
+        if not self.upgraded:
+            end = self.buffer.find(b"\r\n\r\n")
+            if end < 0:
+                return
+            if not self.buffer.startswith(b"HTTP/1.1 101"):
+                self.counts["failed"] += 1
+                self.transport.close()
+                return
+            del self.buffer[:end + 4]
+            self.upgraded = True
+            self.counts["connected"] += 1
+        while len(self.buffer) >= 2: # Server frames are never masked
+            length = self.buffer[1] & 0x7F
+            offset = 2
+            if length == 126:
+                if len(self.buffer) < 4:
+                    return
+                length = int.from_bytes(self.buffer[2:4], "big")
+                offset = 4
+            elif length == 127:
+                if len(self.buffer) < 10:
+                    return
+                length = int.from_bytes(self.buffer[2:10], "big")
+                offset = 10
+            if len(self.buffer) < offset + length:
+                return
+            if self.buffer[0] & 0x0F == 0x2:
+                self.counts["frames"] += 1
+            del self.buffer[:offset + length]
+
+
+async def wait_for_server(port, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("API server did not start")
+
+
+async def run(args):
+    command = [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(args.port), "--log-level", "warning"]
+    if not args.deflate:
+        command += ["--ws-per-message-deflate", "false"]
+    server = subprocess.Popen(command, cwd=REPO_ROOT)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    counts = {"connected": 0, "failed": 0, "frames": 0}
+    transports = []
+    try:
+        await wait_for_server(args.port)
+        asyncio.create_task(feed_snapshots(stop))
+        for start in range(0, args.spectators, CONNECT_BATCH):
+            batch = min(CONNECT_BATCH, args.spectators - start)
+            for _ in range(batch):
+                transport, _ = await loop.create_connection(lambda: SpectatorClient(args.port, counts, args.deflate), "127.0.0.1", args.port)
+                transports.append(transport)
+            while counts["connected"] + counts["failed"] < start + batch:
+                await asyncio.sleep(0.05)
+            if counts["failed"]:
+                raise RuntimeError(f"{counts['failed']} spectators were refused")
+
+        await asyncio.sleep(1.0) # Settle after the ramp
+        frames_before = counts["frames"]
+        cpu_before = server_cpu_seconds(server.pid)
+        started = time.monotonic()
+        await asyncio.sleep(args.duration)
+        elapsed = time.monotonic() - started
+        frames = counts["frames"] - frames_before
+        cpu_after = server_cpu_seconds(server.pid)
+    finally:
+        stop.set()
+        for transport in transports:
+            transport.close()
+        server.terminate()
+        server.wait()
+
+    expected = args.spectators * STREAM_RATE / SPECTATOR_EVERY * elapsed
+    result = {
+        "spectators": args.spectators,
+        "duration_s": round(elapsed, 2),
+        "spectator_rate_hz": STREAM_RATE / SPECTATOR_EVERY,
+        "frames_per_second": round(frames / elapsed),
+        "frames_per_spectator_per_second": round(frames / elapsed / args.spectators, 2),
+        "delivery_ratio": round(frames / expected, 3),
+        "server_cpu_percent": None if cpu_before is None else round(100 * (cpu_after - cpu_before) / elapsed, 1),
+        "server_cpu_us_per_frame": None if cpu_before is None or not frames else round(1e6 * (cpu_after - cpu_before) / frames, 1),
+        "per_message_deflate": args.deflate,
+    }
+    print(json.dumps(result, indent=2))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /ws/spectate fan-out to a crowd of spectators")
+    parser.add_argument("--spectators", type=int, default=DEFAULT_SPECTATORS)
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--deflate", action="store_true", help="Negotiate per-message deflate (uvicorn's default, what browsers ask for)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+# load_test.py
+# Starts the API server and drives it with rooms of simulated phones and TVs that speak the real protocol:
+#   TV    - /ws/tv/onloading?room=<id>, watching the lobby count
+#   phone - /ws/mobile?room=<id> for its user id, then binary joystick frames on /ws/robotcontrol?room=<id> at 60 Hz.
+#           One phone per room picks a new difficulty every DIFFICULTY_INTERVAL, and both sockets answer the server's
+#           latency pings like the UI does.
+#
+#   python loadtest/load_test.py                                  # 200 phones (100 rooms) for 20 seconds
+#   python loadtest/load_test.py --phones 400 --duration 30
+#   python loadtest/load_test.py --simulation headless            # every room also runs its game inside the API
+#
+# Rooms hold two phones (MAX_USERS in api/rooms.py), so N phones means N/2 rooms, each with its own TV. By default the
+# rooms run without a simulation (ROOM_SIMULATION=none) so the numbers are about the websocket tier.
+#
+# Reported:
+#   throughput - joystick frames sent here and received by the server (GET /metrics), lobby updates delivered
+#   latency    - lobby broadcasts (difficulty sent by one phone -> update received by each phone of the room), measured
+#                here since both ends share a clock; phone joins as seen by the TV; joystick input age as measured by
+#                the server (GET /latency, from the frames' client timestamps)
+#   drops      - sockets refused or closed by the server, joystick frames the server never counted
+#   server CPU - from /proc, so only on Linux
+# The clients share the machine with the server, so they are kept cheap (loadtest/wsclient.py).
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+from api.controls import encode_joystick_frame
+from api.rooms import MAX_USERS
+from benchmarks.spectator_fanout import server_cpu_seconds, wait_for_server
+from wsclient import WebSocketClient
+
+DEFAULT_PHONES = 200
+DEFAULT_DURATION = 20.0
+DEFAULT_PORT = 8032
+JOYSTICK_RATE = 60 # Frames per second per phone, like JoyStickController.vue
+DIFFICULTY_INTERVAL = 1.0 # Seconds between difficulty changes in each room
+DIFFICULTIES = ("easy", "medium", "hard")
+CONNECT_BATCH = 20 # Rooms connected concurrently while ramping up
+
+
+def now_ms():
+    # The phones' performance.now()
+    return time.monotonic() * 1000
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize_ms(samples):
+    if not samples:
+        return None
+    return {
+        "samples": len(samples),
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+class Stats:
+    def __init__(self):
+        self.connected = 0
+        self.refused = 0
+        self.dropped = 0 # Closed by the server while the test was running
+        self.close_codes = {}
+        self.joystick_frames = 0
+        self.control_pongs = 0 # Also counted by the server as /ws/robotcontrol messages
+        self.lobby_updates = 0
+        self.lobby_latency = [] # Seconds
+        self.join_latency = []
+        self.measuring = False
+
+    def closed(self, client):
+        if client.refused:
+            self.refused += 1
+        else:
+            self.dropped += 1
+            self.close_codes[client.close_code] = self.close_codes.get(client.close_code, 0) + 1
+
+
+class LoadClient(WebSocketClient):
+    def __init__(self, port, path, stats, opened):
+        super().__init__("127.0.0.1", port, path)
+        self.stats = stats
+        self.opened = opened # Future resolved once the socket is usable (or failed)
+
+    def on_open(self):
+        self.stats.connected += 1
+
+    def on_close(self):
+        self.stats.closed(self)
+        if not self.opened.done():
+            self.opened.set_result(False)
+
+    def answer_ping(self, message):
+        self.send_json({"type": "pong", "id": message["id"], "server": message["server"], "client": math.floor(now_ms())})
+
+
+class TvClient(LoadClient):
+    def __init__(self, port, path, stats, opened, room):
+        super().__init__(port, path, stats, opened)
+        self.room = room
+
+    def on_open(self):
+        super().on_open()
+        self.opened.set_result(True)
+
+    def on_text(self, text):
+        count = int(text)
+        joined_at = self.room.joined_at.get(count)
+        if joined_at is not None:
+            self.stats.join_latency.append(time.perf_counter() - joined_at)
+
+
+class MobileClient(LoadClient):
+    def __init__(self, port, path, stats, opened, room):
+        super().__init__(port, path, stats, opened)
+        self.room = room
+        self.user_id = None
+        self.difficulty = ""
+        self.sequence = 0
+
+    def on_text(self, text):
+        message = json.loads(text)
+        if message.get("type") == "ping":
+            self.answer_ping(message)
+            return
+        if self.user_id is None:
+            self.user_id = message["userid"] # The welcome always comes first
+            self.opened.set_result(True)
+        difficulty = message.get("difficulty", "")
+        if difficulty != self.difficulty:
+            self.difficulty = difficulty
+            sent_at = self.room.difficulty_sent_at.get(difficulty)
+            if sent_at is not None and self.stats.measuring:
+                self.stats.lobby_updates += 1
+                self.stats.lobby_latency.append(time.perf_counter() - sent_at)
+
+    def choose_difficulty(self, difficulty):
+        self.room.difficulty_sent_at[difficulty] = time.perf_counter()
+        self.send_json({"type": "difficulty", "difficulty": difficulty, "seq": self.sequence, "t": now_ms()})
+        self.sequence = (self.sequence + 1) & 0xFFFF
+
+
+class ControlClient(LoadClient):
+    def __init__(self, port, path, stats, opened, user_id):
+        super().__init__(port, path, stats, opened)
+        self.user_id = user_id
+        self.sequence = 0
+
+    def on_open(self):
+        super().on_open()
+        self.opened.set_result(True)
+
+    def on_text(self, text):
+        message = json.loads(text)
+        if message.get("type") == "ping":
+            self.answer_ping(message)
+            if self.stats.measuring:
+                self.stats.control_pongs += 1
+
+    def send_stick(self, x, y):
+        self.send_binary(encode_joystick_frame(self.user_id, self.sequence, now_ms(), x, y, 0))
+        self.sequence += 1
+
+
+class Room:
+    def __init__(self, room_id):
+        self.room_id = room_id
+        self.tv = None
+        self.mobiles = []
+        self.controls = []
+        self.joined_at = {} # Lobby count -> when the phone that made it connected
+        self.difficulty_sent_at = {}
+
+    def clients(self):
+        return [client for client in [self.tv] + self.mobiles + self.controls if client is not None]
+
+
+async def connect(loop, factory):
+    opened = loop.create_future()
+    client = factory(opened)
+    await loop.create_connection(lambda: client, "127.0.0.1", client.port)
+    return client if await opened else None
+
+
+async def fill_room(loop, port, room, phones, stats):
+    query = f"?room={room.room_id}"
+    room.tv = await connect(loop, lambda opened: TvClient(port, "/ws/tv/onloading" + query, stats, opened, room))
+    for count in range(1, phones + 1):
+        room.joined_at[count] = time.perf_counter()
+        mobile = await connect(loop, lambda opened: MobileClient(port, "/ws/mobile" + query, stats, opened, room))
+        if mobile is None:
+            continue
+        room.mobiles.append(mobile)
+        control = await connect(loop, lambda opened: ControlClient(port, "/ws/robotcontrol" + query, stats, opened, mobile.user_id))
+        if control is not None:
+            room.controls.append(control)
+
+
+async def drive_joysticks(rooms, stats, stop):
+    # One task for every phone - an absolute 60 Hz schedule, skipping ahead if the clients fall behind
+    loop = asyncio.get_running_loop()
+    period = 1 / JOYSTICK_RATE
+    next_tick = loop.time()
+    while not stop.is_set():
+        t = loop.time()
+        for room in rooms:
+            for i, control in enumerate(room.controls):
+                if control.open:
+                    control.send_stick(math.cos(t + i), math.sin(t + i))
+                    if stats.measuring:
+                        stats.joystick_frames += 1
+        next_tick += period
+        delay = next_tick - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            next_tick = loop.time()
+
+
+async def change_difficulties(rooms, stop):
+    for step in range(1 << 30):
+        for room in rooms:
+            if room.mobiles and room.mobiles[0].open:
+                room.mobiles[0].choose_difficulty(DIFFICULTIES[step % len(DIFFICULTIES)])
+        try:
+            await asyncio.wait_for(stop.wait(), DIFFICULTY_INTERVAL)
+            return
+        except asyncio.TimeoutError:
+            pass
+
+
+def fetch(port, path):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=10) as response:
+        return response.read().decode()
+
+
+def received_control_messages(metrics_text):
+    for line in metrics_text.splitlines():
+        if line.startswith('football_ws_messages_received_total{endpoint="/ws/robotcontrol"}'):
+            return int(line.rsplit(" ", 1)[1])
+    return 0
+
+
+async def run(args):
+    room_count = math.ceil(args.phones / MAX_USERS)
+    environment = dict(os.environ, DEFAULT_ROOM_SIMULATION=args.simulation, ROOM_SIMULATION=args.simulation, MAX_ROOMS=str(room_count + 1))
+    command = [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(args.port), "--log-level", "warning",
+               "--ws-per-message-deflate", "false"]
+    server = subprocess.Popen(command, cwd=REPO_ROOT, env=environment, stdout=subprocess.DEVNULL)
+    loop = asyncio.get_running_loop()
+    stats = Stats()
+    stop = asyncio.Event()
+    rooms = [Room(f"load-{i}") for i in range(room_count)]
+    try:
+        await wait_for_server(args.port)
+        ramp_started = time.monotonic()
+        for start in range(0, room_count, CONNECT_BATCH):
+            batch = rooms[start:start + CONNECT_BATCH]
+            await asyncio.gather(*(
+                fill_room(loop, args.port, room, min(MAX_USERS, args.phones - (start + i) * MAX_USERS), stats)
+                for i, room in enumerate(batch)
+            ))
+        ramp_s = time.monotonic() - ramp_started
+        tasks = [asyncio.create_task(drive_joysticks(rooms, stats, stop)), asyncio.create_task(change_difficulties(rooms, stop))]
+
+        await asyncio.sleep(2.0) # Settle: the server needs a couple of pongs per socket before it knows the clock offsets
+        received_before = received_control_messages(await asyncio.to_thread(fetch, args.port, "/metrics"))
+        cpu_before = server_cpu_seconds(server.pid)
+        stats.measuring = True
+        started = time.monotonic()
+        await asyncio.sleep(args.duration)
+        stats.measuring = False
+        elapsed = time.monotonic() - started
+        cpu_after = server_cpu_seconds(server.pid)
+        received = received_control_messages(await asyncio.to_thread(fetch, args.port, "/metrics")) - received_before - stats.control_pongs
+        latency = json.loads(await asyncio.to_thread(fetch, args.port, "/latency"))
+        stop.set()
+        await asyncio.gather(*tasks)
+    finally:
+        stop.set()
+        for room in rooms:
+            for client in room.clients():
+                client.close()
+        server.terminate()
+        server.wait()
+
+    controls = [c for c in latency["connections"] if c["endpoint"] == "robotcontrol" and c["input_age"]]
+    input_age_p99 = sorted(c["input_age"]["p99_ms"] for c in controls)
+    result = {
+        "phones": args.phones,
+        "rooms": room_count,
+        "simulation": args.simulation,
+        "duration_s": round(elapsed, 2),
+        "ramp_s": round(ramp_s, 2),
+        "sockets_connected": stats.connected,
+        "sockets_refused": stats.refused,
+        "sockets_dropped": stats.dropped,
+        "close_codes": {str(code): count for code, count in stats.close_codes.items()},
+        "joystick_frames_per_second_sent": round(stats.joystick_frames / elapsed),
+        "joystick_frames_per_second_received": round(received / elapsed),
+        "joystick_send_rate_per_phone_hz": round(stats.joystick_frames / elapsed / max(1, args.phones), 1),
+        "joystick_frames_missing": max(0, stats.joystick_frames - received), # Approximate - the two counts are taken on different clocks
+        "joystick_sequence_gaps": sum(c["gaps"] for c in latency["connections"] if c["endpoint"] == "robotcontrol"),
+        "joystick_input_age": None if not input_age_p99 else {
+            "connections": len(input_age_p99),
+            "median_connection_p99_ms": round(percentile(input_age_p99, 0.5), 2),
+            "worst_connection_p99_ms": round(input_age_p99[-1], 2),
+        },
+        "lobby_updates_per_second": round(stats.lobby_updates / elapsed),
+        "lobby_delivery": summarize_ms(stats.lobby_latency),
+        "tv_join_delivery": summarize_ms(stats.join_latency),
+        "server_cpu_percent": None if cpu_before is None else round(100 * (cpu_after - cpu_before) / elapsed, 1),
+    }
+    print(json.dumps(result, indent=2))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API with rooms of simulated phones and TVs")
+    parser.add_argument("--phones", type=int, default=DEFAULT_PHONES)
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--simulation", choices=("none", "headless"), default="none",
+                        help="Run a headless game in every room (CPU heavy) or only the lobby and controls")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# wsclient.py
+# Minimal websocket client for the load tester - a bare asyncio protocol, so hundreds of clients can share one core
+# with the server under test.
+#
+# Client frames use an all-zero masking key, which the protocol allows and which makes masking a no-op. Messages are
+# never fragmented by the API, so continuation frames are not handled.
+import asyncio
+import base64
+import json
+import os
+
+TEXT = 0x1
+BINARY = 0x2
+CLOSE = 0x8
+PING = 0x9
+PONG = 0xA
+ZERO_MASK = b"\0\0\0\0"
+
+
+def encode_frame(opcode, payload):
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, 0x80 | length))
+    elif length < 1 << 16:
+        header = bytes((0x80 | opcode, 0x80 | 126)) + length.to_bytes(2, "big")
+    else:
+        header = bytes((0x80 | opcode, 0x80 | 127)) + length.to_bytes(8, "big")
+    return header + ZERO_MASK + payload
+
+
+class WebSocketClient(asyncio.Protocol):
+    """One websocket. Subclasses override on_open/on_text/on_binary/on_close."""
+
+    def __init__(self, host, port, path):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.buffer = bytearray()
+        self.transport = None
+        self.open = False
+        self.closed = False
+        self.close_code = None
+        self.refused = False # Handshake rejected (e.g. an invalid room)
+
+    def connection_made(self, transport):
+        self.transport = transport
+        key = base64.b64encode(os.urandom(16)).decode()
+        transport.write((
+            f"GET {self.path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+
+    def data_received(self, data):
+        self.buffer += data
+        if not self.open:
+            end = self.buffer.find(b"\r\n\r\n")
+            if end < 0:
+                return
+            if not self.buffer.startswith(b"HTTP/1.1 101"):
+                self.refused = True
+                self.transport.close()
+                return
+            del self.buffer[:end + 4]
+            self.open = True
+            self.on_open()
+        while len(self.buffer) >= 2: # Server frames are never masked
+            opcode = self.buffer[0] & 0x0F
+            length = self.buffer[1] & 0x7F
+            offset = 2
+            if length == 126:
+                if len(self.buffer) < 4:
+                    return
+                length = int.from_bytes(self.buffer[2:4], "big")
+                offset = 4
+            elif length == 127:
+                if len(self.buffer) < 10:
+                    return
+                length = int.from_bytes(self.buffer[2:10], "big")
+                offset = 10
+            if len(self.buffer) < offset + length:
+                return
+            payload = bytes(self.buffer[offset:offset + length])
+            del self.buffer[:offset + length]
+            if opcode == TEXT:
+                self.on_text(payload.decode())
+            elif opcode == BINARY:
+                self.on_binary(payload)
+            elif opcode == PING:
+                self.transport.write(encode_frame(PONG, payload))
+            elif opcode == CLOSE:
+                self.close_code = int.from_bytes(payload[:2], "big") if len(payload) >= 2 else None
+                self.transport.write(encode_frame(CLOSE, payload[:2]))
+                self.transport.close()
+
+    def connection_lost(self, exc):
+        if not self.closed:
+            self.closed = True
+            self.open = False
+            self.on_close()
+
+    def send_text(self, text):
+        if self.open:
+            self.transport.write(encode_frame(TEXT, text.encode()))
+
+    def send_json(self, data):
+        self.send_text(json.dumps(data))
+
+    def send_binary(self, data):
+        if self.open:
+            self.transport.write(encode_frame(BINARY, data))
+
+    def close(self):
+        # Closed by the load tester - not counted as a drop
+        self.closed = True
+        if self.open:
+            self.transport.write(encode_frame(CLOSE, (1000).to_bytes(2, "big")))
+        if self.transport is not None:
+            self.transport.close()
+
+    def on_open(self):
+        pass
+
+    def on_text(self, text):
+        pass
+
+    def on_binary(self, data):
+        pass
+
+    def on_close(self):
+        pass
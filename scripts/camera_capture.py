@@ -0,0 +1,89 @@
+import threading
+import time
+
+import cv2
+
+
+class CameraCapture:
+    """Grabs camera frames on a background thread so processing never waits on the camera.
+
+    cv2.VideoCapture.read() in the main loop blocks for the next frame, and while the loop is busy the driver queues
+    frames, so the one read next is already old. Here a thread grabs continuously into a double buffer: it fills the
+    back buffer and swaps it with the front one under a lock. read() hands over the newest frame with its capture
+    time (time.monotonic(), taken right after the grab) - rotated, or copied, into an output buffer allocated once.
+    A frame replaced before anyone read it counts as dropped.
+
+    Video files are paced at their own frame rate, so they behave like a camera.
+    """
+
+    def __init__(self, source, rotation=cv2.ROTATE_180):
+        self.source = source
+        self.rotation = rotation
+        self.cap = cv2.VideoCapture(source)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1) # Ignored by some backends - the thread keeps the queue short anyway
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if isinstance(source, str) else 0
+        self.frame_interval = 1 / fps if fps > 0 else 0
+        self.back = None # Written by the capture thread only
+        self.front = None # Newest complete frame, swapped in under the lock
+        self.front_time = None
+        self.front_id = 0
+        self.output = None # Handed to the caller, reused by every read()
+        self.read_id = 0 # Id of the frame read() returned last
+        self.captured = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.running = True
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._capture, daemon=True)
+        self.thread.start()
+
+    def _capture(self):
+        next_grab = time.monotonic()
+        while self.running:
+            if self.frame_interval:
+                next_grab += self.frame_interval
+                time.sleep(max(0, next_grab - time.monotonic()))
+            if not self.cap.grab():
+                break
+            captured_at = time.monotonic()
+            ret, self.back = self.cap.retrieve(self.back)
+            if not ret:
+                break
+            with self.condition:
+                if self.front_id > self.read_id:
+                    self.dropped += 1
+                self.front, self.back = self.back, self.front
+                self.front_time = captured_at
+                self.front_id += 1
+                self.captured += 1
+                self.condition.notify_all()
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def read(self, timeout=1.0):
+        # Waits for a frame newer than the last one read. Returns (ret, frame, captured_at); the frame is overwritten
+        # by the next read(), so it can be drawn on but must be copied to be kept. ret is also False when the timeout
+        # passes with capture still going - only running going False means the camera or the file has ended.
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.front_id > self.read_id or not self.running, timeout):
+                return False, None, None
+            if self.front_id == self.read_id: # Capture stopped (camera unplugged or end of file)
+                return False, None, None
+            if self.output is None:
+                self.output = self.front.copy() if self.rotation is None else cv2.rotate(self.front, self.rotation)
+            elif self.rotation is None:
+                self.output[...] = self.front
+            else:
+                cv2.rotate(self.front, self.rotation, dst=self.output)
+            self.read_id = self.front_id
+            self.delivered += 1
+            return True, self.output, self.front_time
+
+    def stats(self):
+        return {"captured": self.captured, "delivered": self.delivered, "dropped": self.dropped}
+
+    def release(self):
+        self.running = False
+        self.thread.join()
+        self.cap.release()
@@ -0,0 +1,244 @@
+import select
+import socket
+import threading
+import time
+from collections import deque
+
+from robot_protocol import ROBOT_PORT, SEQUENCE_MODULO, SETPOINTS, decode_ack, encode_command
+
+COMMAND_RATE = 2.0 # Commands per second - the old loop slept 0.5 s after each one
+CONNECT_TIMEOUT = 1.0
+SEND_TIMEOUT = 1.0
+MIN_BACKOFF = 0.1 # First reconnect delay, doubled after every failure ...
+MAX_BACKOFF = 5.0 # ... up to this
+ACK_TIMEOUT = 0.1 # UDP: seconds to wait for an ack before sending the command again ...
+MAX_RETRIES = 3 # ... at most this many times
+RTT_SAMPLES = 1000
+
+
+class CommandSender:
+    """Sends movement commands to the ESP32 from a background thread, so the vision loop never waits on the robot.
+
+    The loop calls post() with the command it wants now; that only stores it and returns. The thread keeps one TCP
+    connection open, reconnecting with exponential backoff when it drops, and sends at most `rate` commands per
+    second. Only the newest command is ever sent: one posted while another is still waiting replaces it (counted as
+    coalesced), so the robot never works through a backlog of stale commands.
+    """
+
+    def __init__(self, host, port, rate=COMMAND_RATE):
+        self.host = host
+        self.port = port
+        self.interval = 1 / rate
+        self.pending = None
+        self.sock = None
+        self.running = True
+        self.sent = 0
+        self.coalesced = 0
+        self.reconnects = 0
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def post(self, command):
+        with self.condition:
+            if self.pending is not None:
+                self.coalesced += 1
+            self.pending = command
+            self.condition.notify()
+
+    def _connect(self):
+        backoff = MIN_BACKOFF
+        while self.running:
+            try:
+                self.sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self.sock.settimeout(SEND_TIMEOUT)
+                return True
+            except OSError as e:
+                print(f"ESP32 {self.host}:{self.port} unreachable ({e}), retrying in {backoff:.1f} s")
+                with self.condition: # Wakes early on close()
+                    self.condition.wait_for(lambda: not self.running, backoff)
+                backoff = min(MAX_BACKOFF, backoff * 2)
+        return False
+
+    def _run(self):
+        next_send = time.monotonic()
+        while self.running:
+            if self.sock is None and not self._connect():
+                break
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending is not None or not self.running)
+                if not self.running:
+                    break
+            time.sleep(max(0, next_send - time.monotonic())) # Rate limit - newer posts keep replacing pending
+            with self.condition:
+                command, self.pending = self.pending, None
+            try:
+                self.sock.sendall((command + '\n').encode())
+                self.sent += 1
+            except OSError as e:
+                print(f"ESP32 connection lost ({e}), reconnecting")
+                self.sock.close()
+                self.sock = None
+                self.reconnects += 1
+                with self.condition: # Resend it on the new connection unless something newer came in
+                    if self.pending is None:
+                        self.pending = command
+            next_send = time.monotonic() + self.interval
+
+    def stats(self):
+        return {"sent": self.sent, "coalesced": self.coalesced, "reconnects": self.reconnects, "connected": self.sock is not None}
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
+        if self.sock is not None:
+            self.sock.close()
+
+
+class UdpCommandSender:
+    """CommandSender's counterpart for robots speaking robot_protocol: binary setpoints over UDP, acknowledged.
+
+    post() takes a word from SETPOINTS or a (linear mm/s, turn mrad/s) pair and never blocks; the newest one wins.
+    The thread sends at most `rate` commands per second, each with a new sequence number and the send time, and
+    reads the acks in between, timing the round trips. If the newest command is not acked within
+    ACK_TIMEOUT and nothing newer has been posted, it is sent again (as a new packet) up to MAX_RETRIES times. UDP has
+    no connection to lose, so there is nothing to reconnect - an unreachable robot shows up as timed out commands.
+    """
+
+    def __init__(self, host, port=ROBOT_PORT, robot_id=0, rate=COMMAND_RATE):
+        self.address = (host, port)
+        self.robot_id = robot_id
+        self.interval = 1 / rate
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.wakeup, self.waker = socket.socketpair() # post() writes a byte to wake the thread's select()
+        self.waker.setblocking(False)
+        self.pending = None
+        self.lock = threading.Lock()
+        self.running = True
+        self.sequence = 0
+        self.in_flight = {} # sequence -> sent at, for commands not acked yet
+        self.newest = None # (sequence, setpoint, sent at, retries) of the newest command while it is unacked
+        self.sent = 0
+        self.acked = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.timed_out = 0 # Not acked within ACK_TIMEOUT
+        self.errors = 0 # Send/receive errors, e.g. ICMP port unreachable
+        self.round_trips = deque(maxlen=RTT_SAMPLES) # ms
+        self.epoch = time.monotonic()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def post(self, command):
+        setpoint = SETPOINTS[command] if isinstance(command, str) else command
+        with self.lock:
+            if self.pending is not None:
+                self.coalesced += 1
+            self.pending = setpoint
+        try:
+            self.waker.send(b"\0")
+        except BlockingIOError: # Already plenty of wake-ups queued
+            pass
+
+    def _now_ms(self):
+        return int((time.monotonic() - self.epoch) * 1000)
+
+    def _send(self, setpoint, retries):
+        self.sequence = (self.sequence + 1) % SEQUENCE_MODULO
+        packet = encode_command(self.robot_id, self.sequence, self._now_ms(), *setpoint)
+        try:
+            self.sock.sendto(packet, self.address)
+            self.sent += 1
+        except OSError:
+            self.errors += 1
+        now = time.monotonic()
+        self.in_flight[self.sequence] = now
+        self.newest = (self.sequence, setpoint, now, retries)
+
+    def _receive(self):
+        while True:
+            try:
+                packet = self.sock.recv(64)
+            except BlockingIOError:
+                return
+            except OSError:
+                self.errors += 1
+                return
+            ack = decode_ack(packet)
+            if ack is None or ack[0] != self.robot_id:
+                continue
+            robot_id, sequence, timestamp = ack
+            sent_at = self.in_flight.pop(sequence, None)
+            if sent_at is not None:
+                self.acked += 1
+                self.round_trips.append(1000 * (time.monotonic() - sent_at)) # Finer than the echoed ms timestamp
+                if self.newest is not None and self.newest[0] == sequence:
+                    self.newest = None
+
+    def _expire(self, now):
+        for sequence, sent_at in list(self.in_flight.items()): # Oldest first
+            if now - sent_at < ACK_TIMEOUT:
+                break
+            del self.in_flight[sequence]
+            self.timed_out += 1
+
+    def _run(self):
+        next_send = time.monotonic()
+        while self.running:
+            with self.lock:
+                waiting = self.pending is not None
+            deadline = next_send if waiting else None
+            if self.newest is not None: # Unacked - retry when its ack is overdue
+                retry_at = max(next_send, self.newest[2] + ACK_TIMEOUT)
+                deadline = retry_at if deadline is None else min(deadline, retry_at)
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            readable, _, _ = select.select([self.sock, self.wakeup], [], [], timeout)
+            if self.wakeup in readable:
+                self.wakeup.recv(4096)
+            if self.sock in readable:
+                self._receive()
+            now = time.monotonic()
+            self._expire(now)
+            if now < next_send:
+                continue
+            with self.lock:
+                setpoint, self.pending = self.pending, None
+            if setpoint is not None:
+                self._send(setpoint, 0)
+            elif self.newest is not None and now >= self.newest[2] + ACK_TIMEOUT:
+                sequence, setpoint, sent_at, retries = self.newest
+                self.newest = None
+                if retries == MAX_RETRIES:
+                    continue
+                self.retries += 1
+                self._send(setpoint, retries + 1)
+            else:
+                continue
+            next_send = now + self.interval
+
+    def stats(self):
+        round_trips = sorted(self.round_trips)
+        return {
+            "sent": self.sent,
+            "acked": self.acked,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "timed_out": self.timed_out,
+            "errors": self.errors,
+            "rtt_ms_p50": round(round_trips[len(round_trips) // 2], 3) if round_trips else None,
+            "rtt_ms_p99": round(round_trips[int(0.99 * (len(round_trips) - 1))], 3) if round_trips else None,
+        }
+
+    def close(self):
+        self.running = False
+        try:
+            self.waker.send(b"\0")
+        except BlockingIOError:
+            pass
+        self.thread.join()
+        for sock in (self.sock, self.wakeup, self.waker):
+            sock.close()
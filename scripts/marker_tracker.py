@@ -0,0 +1,109 @@
+import time
+
+import cv2
+import numpy as np
+
+ROI_MARGIN = 2.0 # Search window half-size in marker sizes (on top of the predicted motion)
+MIN_ROI = 48 # Smallest search window half-size in pixels
+DOWNSCALE = 0.5 # Scale of the first fallback search
+MAX_SEARCH_INTERVAL = 16 # Frames between whole-frame searches for a marker that stays lost (after backing off 1, 2, 4, ...)
+
+
+class MarkerTracker:
+    """Finds the given ArUco markers, searching only around where each one is expected.
+
+    Each tracked marker keeps its last centre, size and velocity. The next frame is searched in a window around the
+    predicted centre (last centre + velocity). A marker not found in its window is lost; lost markers are looked for in
+    a downscaled copy of the whole frame and, if still missing, at full resolution. While a marker stays lost (e.g. the
+    goal is off the table, or one robot of eight is covered) it is only looked for again after a backoff that doubles
+    up to MAX_SEARCH_INTERVAL frames, so one missing marker does not cost a whole-frame detection on every frame.
+
+    detect() returns corners and ids in the shape cv2.aruco's detectMarkers uses; last_cost has the search mode, the
+    pixels searched and the time taken for the frame.
+    """
+
+    def __init__(self, detector, marker_ids):
+        self.detector = detector
+        self.marker_ids = tuple(marker_ids)
+        self.tracks = {} # id -> {"center", "size", "velocity"}
+        self.small = None # Preallocated downscaled frame
+        self.frame_index = 0
+        self.search_interval = {} # id -> frames to wait before its next whole-frame search, while lost
+        self.search_at = {} # id -> frame index of its next whole-frame search
+        self.last_cost = {"mode": None, "pixels": 0, "ms": 0.0}
+        self.searches = {"roi": 0, "downscaled": 0, "full": 0}
+
+    def detect(self, frame):
+        started = time.perf_counter()
+        height, width = frame.shape[:2]
+        found = {}
+        pixels = 0
+        mode = "roi"
+        for marker_id, track in self.tracks.items():
+            center = track["center"] + track["velocity"]
+            half = max(MIN_ROI, ROI_MARGIN * track["size"] + np.abs(track["velocity"]).max())
+            x0, y0 = max(0, int(center[0] - half)), max(0, int(center[1] - half))
+            x1, y1 = min(width, int(center[0] + half)), min(height, int(center[1] + half))
+            if x1 - x0 < 8 or y1 - y0 < 8: # Predicted off the frame
+                continue
+            pixels += (x1 - x0) * (y1 - y0)
+            corners, ids, _ = self.detector.detectMarkers(frame[y0:y1, x0:x1])
+            for corner, detected_id in zip(corners, np.ravel(ids) if ids is not None else ()):
+                if detected_id == marker_id:
+                    found[marker_id] = np.reshape(corner, (4, 2)) + (x0, y0)
+        if pixels:
+            self.searches["roi"] += 1
+
+        self.frame_index += 1
+        for marker_id in found:
+            self.search_interval.pop(marker_id, None)
+            self.search_at.pop(marker_id, None)
+        missing = [marker_id for marker_id in self.marker_ids
+                   if marker_id not in found and self.search_at.get(marker_id, 0) <= self.frame_index]
+        if missing:
+            if self.small is None or self.small.shape[:2] != (int(height * DOWNSCALE), int(width * DOWNSCALE)):
+                self.small = cv2.resize(frame, None, fx=DOWNSCALE, fy=DOWNSCALE, interpolation=cv2.INTER_AREA)
+            else:
+                cv2.resize(frame, (self.small.shape[1], self.small.shape[0]), dst=self.small, interpolation=cv2.INTER_AREA)
+            mode = "downscaled"
+            self.searches["downscaled"] += 1
+            pixels += self.small.shape[0] * self.small.shape[1]
+            self._take(found, missing, self.small, 1 / DOWNSCALE)
+            missing = [marker_id for marker_id in missing if marker_id not in found]
+            if missing:
+                mode = "full"
+                self.searches["full"] += 1
+                pixels += height * width
+                self._take(found, missing, frame, 1)
+            for marker_id in missing:
+                if marker_id in found:
+                    continue
+                interval = min(MAX_SEARCH_INTERVAL, 2 * self.search_interval.get(marker_id, 0.5))
+                self.search_interval[marker_id] = interval
+                self.search_at[marker_id] = self.frame_index + interval
+
+        for marker_id in self.marker_ids:
+            if marker_id in found:
+                self._update(marker_id, found[marker_id])
+            else:
+                self.tracks.pop(marker_id, None)
+        self.last_cost = {"mode": mode, "pixels": pixels, "ms": 1000 * (time.perf_counter() - started)}
+        if not found:
+            return (), None
+        return (
+            tuple(np.asarray(corner, np.float32).reshape(1, 4, 2) for corner in found.values()),
+            np.array(list(found), np.int32).reshape(-1, 1),
+        )
+
+    def _take(self, found, missing, image, scale):
+        corners, ids, _ = self.detector.detectMarkers(image)
+        for corner, detected_id in zip(corners, np.ravel(ids) if ids is not None else ()):
+            if detected_id in missing:
+                found[int(detected_id)] = np.reshape(corner, (4, 2)) * scale
+
+    def _update(self, marker_id, corner):
+        center = corner.mean(axis=0)
+        size = np.linalg.norm(corner[0] - corner[2]) # Diagonal - generous for any rotation
+        track = self.tracks.get(marker_id)
+        velocity = center - track["center"] if track is not None else np.zeros(2)
+        self.tracks[marker_id] = {"center": center, "size": size, "velocity": velocity}
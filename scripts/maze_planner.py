@@ -0,0 +1,298 @@
+import hashlib
+import heapq
+import os
+import tempfile
+from collections import deque
+
+import numpy as np
+
+INFINITY = float("inf")
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".planner_cache")
+MAX_TABLE_NODES = 4096 # A 64x64 maze - the table is nodes^2 entries (32 MB here)
+
+
+class GridIndex:
+    """Flat view of a maze's nodes for the planners: node i is maze.nodes[i // cols][i % cols].
+
+    Per-search state lives in flat lists owned by the planner, never on the nodes, and is tagged with a generation
+    number: a slot whose stamp is not the current generation reads as unvisited. A new search bumps the generation
+    instead of walking every node to reset it.
+    """
+
+    def __init__(self, maze):
+        self.nodes = [node for row in maze.nodes for node in row]
+        self.rows = len(maze.nodes)
+        self.cols = len(maze.nodes[0])
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.coordinates = [node.maze_coordinates for node in self.nodes]
+        self.successors = [[self.index[child] for child in node.children] for node in self.nodes]
+        self.predecessors = [[] for _ in self.nodes]
+        for i, successors in enumerate(self.successors):
+            for j in successors:
+                self.predecessors[j].append(i)
+
+    def fingerprint(self):
+        # Hash of the layout (cells and their open sides) - the key for anything precomputed from it
+        return hashlib.sha256(repr((self.rows, self.cols, self.coordinates, self.successors)).encode()).hexdigest()
+
+    def manhattan(self, a, b):
+        (x1, y1), (x2, y2) = self.coordinates[a], self.coordinates[b]
+        return abs(x1 - x2) + abs(y1 - y2)
+
+
+class AStarPlanner:
+    """heapq A* on unit-cost moves with the Manhattan heuristic. Every call searches from scratch."""
+
+    def __init__(self, maze):
+        self.grid = GridIndex(maze)
+        size = len(self.grid.nodes)
+        self.g = [0] * size
+        self.parent = [0] * size
+        self.stamp = [0] * size
+        self.generation = 0
+        self.expanded = 0 # Nodes expanded by the last search
+
+    def plan(self, start, goal):
+        # Shortest path from start to goal as a list of nodes, [] if the goal cannot be reached
+        grid = self.grid
+        start, goal = grid.index[start], grid.index[goal]
+        self.generation += 1
+        generation, g, parent, stamp = self.generation, self.g, self.parent, self.stamp
+        goal_x, goal_y = grid.coordinates[goal]
+        g[start], parent[start], stamp[start] = 0, -1, generation
+        open_list = [(grid.manhattan(start, goal), 0, start)]
+        self.expanded = 0
+        while open_list:
+            _, cost, current = heapq.heappop(open_list)
+            if cost > g[current]: # Stale entry - a shorter way here was found after it was pushed
+                continue
+            self.expanded += 1
+            if current == goal:
+                path = []
+                while current != -1:
+                    path.append(grid.nodes[current])
+                    current = parent[current]
+                return path[::-1]
+            cost += 1
+            for child in grid.successors[current]:
+                if stamp[child] != generation or cost < g[child]:
+                    g[child], parent[child], stamp[child] = cost, current, generation
+                    x, y = grid.coordinates[child]
+                    heapq.heappush(open_list, (cost + abs(x - goal_x) + abs(y - goal_y), cost, child))
+        return []
+
+
+class DStarLitePlanner:
+    """Incremental planner (D* Lite, Koenig & Likhachev 2002) for a robot replanning every frame.
+
+    The search runs backwards from the goal, so the cost-to-goal it has already settled stays valid when the robot -
+    the start - moves: a new start only shifts the queue keys by km and the search resumes from where it stopped,
+    which usually expands nothing or a handful of cells. A new goal re-roots the search; that starts a fresh one, at
+    the cost of a single generation bump rather than a reset of every node.
+    """
+
+    def __init__(self, maze):
+        self.grid = GridIndex(maze)
+        size = len(self.grid.nodes)
+        self.g = [INFINITY] * size
+        self.rhs = [INFINITY] * size
+        self.stamp = [0] * size
+        self.generation = 0
+        self.queued = {} # node -> key of its live queue entry; other entries for it are stale
+        self.queue = [] # (key, node)
+        self.km = 0
+        self.start = None
+        self.goal = None
+        self.last_start = None
+        self.expanded = 0 # Nodes expanded by the last call to plan()
+
+    def _touch(self, node):
+        if self.stamp[node] != self.generation:
+            self.stamp[node] = self.generation
+            self.g[node] = self.rhs[node] = INFINITY
+
+    def _key(self, node):
+        best = min(self.g[node], self.rhs[node])
+        return (best + self.grid.manhattan(self.start, node) + self.km, best)
+
+    def _update(self, node):
+        self._touch(node)
+        if node != self.goal:
+            g = self.g
+            best = INFINITY
+            for child in self.grid.successors[node]:
+                if self.stamp[child] == self.generation and g[child] + 1 < best:
+                    best = g[child] + 1
+            self.rhs[node] = best
+        if self.g[node] != self.rhs[node]:
+            key = self._key(node)
+            self.queued[node] = key
+            heapq.heappush(self.queue, (key, node))
+        else:
+            self.queued.pop(node, None)
+
+    def _reset(self, goal):
+        self.generation += 1
+        self.goal = goal
+        self.km = 0
+        self.queued = {}
+        self.queue = []
+        self._touch(goal)
+        self.rhs[goal] = 0
+        key = self._key(goal)
+        self.queued[goal] = key
+        self.queue.append((key, goal))
+
+    def _compute(self):
+        grid = self.grid
+        queue, queued, g, rhs, stamp = self.queue, self.queued, self.g, self.rhs, self.stamp
+        coordinates, predecessors = grid.coordinates, grid.predecessors
+        generation, start, km = self.generation, self.start, self.km
+        start_x, start_y = coordinates[start]
+        self._touch(start)
+        while queue:
+            key, node = queue[0]
+            if queued.get(node) != key: # Stale entry
+                heapq.heappop(queue)
+                continue
+            start_cost = g[start] if g[start] < rhs[start] else rhs[start]
+            if key >= (start_cost + km, start_cost) and rhs[start] == g[start]:
+                break
+            cost = g[node] if g[node] < rhs[node] else rhs[node]
+            x, y = coordinates[node]
+            new_key = (cost + abs(x - start_x) + abs(y - start_y) + km, cost)
+            if key < new_key: # Key is out of date since the start moved
+                queued[node] = new_key
+                heapq.heapreplace(queue, (new_key, node))
+                continue
+            heapq.heappop(queue)
+            del queued[node]
+            self.expanded += 1
+            if g[node] > rhs[node]:
+                # Cost-to-goal went down: a predecessor can only improve by going through this node, so no need to
+                # look at its other successors (the hot path - a fresh search only ever takes this branch)
+                cost = g[node] = rhs[node]
+                cost += 1
+                for predecessor in predecessors[node]:
+                    if stamp[predecessor] != generation:
+                        stamp[predecessor] = generation
+                        g[predecessor] = INFINITY
+                    elif cost >= rhs[predecessor]:
+                        continue
+                    rhs[predecessor] = cost
+                    if g[predecessor] != cost:
+                        x, y = coordinates[predecessor]
+                        key = (cost + abs(x - start_x) + abs(y - start_y) + km, cost)
+                        queued[predecessor] = key
+                        heapq.heappush(queue, (key, predecessor))
+                    else:
+                        queued.pop(predecessor, None)
+            else:
+                g[node] = INFINITY
+                self._update(node)
+                for predecessor in predecessors[node]:
+                    self._update(predecessor)
+
+    def plan(self, start, goal):
+        # Shortest path from start to goal as a list of nodes, [] if the goal cannot be reached
+        grid = self.grid
+        start, goal = grid.index[start], grid.index[goal]
+        self.expanded = 0
+        self.start = start
+        if goal != self.goal:
+            self._reset(goal)
+        elif start != self.last_start:
+            self.km += grid.manhattan(self.last_start, start)
+        self.last_start = start
+        self._compute()
+        if self.g[start] == INFINITY:
+            return []
+        path = [grid.nodes[start]]
+        node = start
+        while node != goal and len(path) <= len(grid.nodes): # Walk downhill on the cost-to-goal
+            best, node = min(
+                (self.g[child] if self.stamp[child] == self.generation else INFINITY, child)
+                for child in grid.successors[node]
+            )
+            if best == INFINITY:
+                return []
+            path.append(grid.nodes[node])
+        return path
+
+
+class NextHopTable:
+    """All-pairs next-hop table for a maze that never changes: next_hop[goal, node] is the neighbour to move to from
+    node to get one step closer to goal (-1 if goal cannot be reached, goal itself on the goal).
+
+    Built once with a BFS backwards from every cell, after which a path is a walk through the table in O(path length)
+    with no search at all. The table is cached on disk in cache_dir (None to skip the cache) under the layout's
+    fingerprint, so later runs on the same maze load it instead of rebuilding it; a cache file that cannot be read (e.g.
+    cut short) is rebuilt and replaced. Only for small mazes - the table has nodes^2 entries.
+    """
+
+    def __init__(self, maze, cache_dir=CACHE_DIR):
+        self.grid = GridIndex(maze)
+        size = len(self.grid.nodes)
+        if size > MAX_TABLE_NODES:
+            raise ValueError(f"{size} cells is too many for a next-hop table (limit {MAX_TABLE_NODES})")
+        self.path_file = None
+        if cache_dir is not None:
+            self.path_file = os.path.join(cache_dir, f"next_hop_{self.grid.fingerprint()[:16]}.npy")
+            self.next_hop = self.load(size)
+            if self.next_hop is not None:
+                self.loaded = True
+                return
+        self.next_hop = self.build()
+        self.loaded = False
+        if self.path_file is not None:
+            self.save(cache_dir)
+
+    def load(self, size):
+        # The cached table, or None when there is none or it is unusable
+        try:
+            next_hop = np.load(self.path_file)
+        except (OSError, ValueError, EOFError): # Missing, truncated or corrupt - rebuilt and overwritten
+            return None
+        return next_hop if next_hop.shape == (size, size) else None
+
+    def save(self, cache_dir):
+        # Written to a temporary file and renamed over the cache, so a reader never sees half a table
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.save(file, self.next_hop)
+            os.replace(temporary, self.path_file)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def build(self):
+        grid = self.grid
+        size = len(grid.nodes)
+        next_hop = np.full((size, size), -1, np.int16 if size < 1 << 15 else np.int32)
+        for goal in range(size):
+            row = [-1] * size
+            row[goal] = goal
+            queue = deque([goal])
+            while queue: # BFS over incoming moves: whoever reaches node first steps to node next
+                node = queue.popleft()
+                for predecessor in grid.predecessors[node]:
+                    if row[predecessor] == -1:
+                        row[predecessor] = node
+                        queue.append(predecessor)
+            next_hop[goal] = row
+        return next_hop
+
+    def plan(self, start, goal):
+        # Shortest path from start to goal as a list of nodes, [] if the goal cannot be reached
+        grid = self.grid
+        node, goal = grid.index[start], grid.index[goal]
+        row = self.next_hop[goal]
+        if row[node] == -1:
+            return []
+        path = [grid.nodes[node]]
+        while node != goal:
+            node = int(row[node])
+            path.append(grid.nodes[node])
+        return path
@@ -0,0 +1,153 @@
+# maze_robot.py
+# Drives the maze robot from the overhead camera. raj_bfs.py and oze_astar.py start it with their own planner:
+#   python scripts/maze_robot.py --planner table   # BFS next-hop table, built once for the fixed maze (raj_bfs.py)
+#   python scripts/maze_robot.py --planner astar   # heapq A* every frame (oze_astar.py)
+#   python scripts/maze_robot.py --planner dstar   # incremental D* Lite
+import argparse
+import os
+import cv2
+import numpy as np
+from camera_capture import CameraCapture
+from command_sender import CommandSender, UdpCommandSender
+from maze_planner import AStarPlanner, DStarLitePlanner, NextHopTable
+from vision_pipeline import VisionPipeline
+
+PLANNERS = {"table": NextHopTable, "astar": AStarPlanner, "dstar": DStarLitePlanner}
+
+class Node:
+    def __init__(self, maze_coordinates):
+        self.maze_coordinates = maze_coordinates
+        self.children = []
+
+class Maze:
+    decimal = [
+        [9, 8, 8, 12, 11, 12, 9, 8, 8, 14],
+        [5, 1, 0, 4, 9, 4, 5, 3, 2, 12],
+        [5, 5, 3, 4, 1, 4, 1, 14, 9, 4],
+        [5, 1, 12, 1, 0, 0, 4, 15, 1, 6],
+        [5, 3, 0, 2, 2, 4, 3, 10, 0, 12],
+        [1, 12, 3, 8, 12, 1, 8, 8, 2, 4],
+        [5, 5, 9, 4, 5, 3, 0, 0, 8, 6],
+        [1, 6, 1, 6, 3, 12, 3, 2, 4, 15],
+        [5, 9, 4, 9, 8, 0, 8, 12, 3, 4],
+        [3, 2, 2, 2, 2, 6, 3, 2, 10, 6]
+    ]
+    binary = [[bin(num)[2:].zfill(4) for num in row] for row in decimal]
+    
+    def print_maze_to_console(self):
+        for row in self.binary:
+            print(' '.join(row))
+            
+    # initializes the maze's nodes and sets their children
+    def __init__(self): 
+        self.nodes = [[Node((i, j)) for j in range(len(self.binary[i]))] for i in range(len(self.binary))]
+        for i in range(len(self.binary)):
+            for j in range(len(self.binary[i])):
+                cell = self.binary[i][j]
+                node = self.nodes[i][j]
+                if cell[0] == '0': #Top 
+                    node.children.append(self.nodes[i - 1][j])
+                if cell[1] == '0': #Right
+                    node.children.append(self.nodes[i][j + 1])
+                if cell[2] == '0': #Bottom
+                    node.children.append(self.nodes[i + 1][j])
+                if cell[3] == '0': #Left
+                    node.children.append(self.nodes[i][j - 1])
+
+class Plan:
+    # planner is a key of PLANNERS - "table" looks paths up in a next-hop table built once for the (fixed) maze
+    def __init__(self, maze, planner="dstar"):
+        self.maze = maze
+        self.start = maze.nodes[0][4]
+        self.goal = maze.nodes[9][5]
+        self.planner = PLANNERS[planner](maze)
+        self.path = self.update_path()
+        
+    # finds the path from the start node to the goal node
+    def update_path(self):
+        self.path = self.planner.plan(self.start, self.goal)
+        return self.path
+
+class Bot:
+    # sender defaults to the ESP32's text commands over TCP; pass a UdpCommandSender for robots speaking robot_protocol
+    def __init__(self, sender=None):
+        self.position = None
+        self.angle = None
+        self.last_command = None
+        
+        esp_ip = '192.168.188.116'  # IP of the ESP32
+        port = 80
+        self.sender = sender or CommandSender(esp_ip, port) # Connects, reconnects and rate-limits on its own thread
+
+    def send_to_esp32(self, message):
+        self.sender.post(message) # Never blocks - the newest command wins
+
+    def send_movement_commands(self, plan):
+            if len(plan.path) < 3:
+                print("Game Over")
+                return
+            if self.position is None or self.angle is None:
+                return
+            else:
+                next_destination = plan.path[1].pixel_coordinates
+                target_angle = np.arctan2(next_destination[1] - self.position[1], next_destination[0] - self.position[0]) * 180/np.pi
+                angle_difference = target_angle - self.angle
+                if angle_difference < -180:
+                    angle_difference += 360
+                elif angle_difference > 180:
+                    angle_difference -= 360
+                if abs(angle_difference) < 10:
+                    move_command = "forward"
+                elif angle_difference < 0:
+                    move_command = "left"
+                else:
+                    move_command = "right"
+                self.send_to_esp32(move_command)
+                if move_command != self.last_command: # Posted every frame - only report changes
+                    print(f"bot angle: {self.angle}, target_angle: {target_angle}, Sent {move_command}")
+                    self.last_command = move_command
+
+    def update_bot_status(self, position, angle):
+        self.position = position
+        self.angle = angle
+    
+def main(planner="table"):
+    parser = argparse.ArgumentParser(description="Drive the maze robot from the overhead camera.")
+    parser.add_argument("--planner", choices=sorted(PLANNERS), default=planner)
+    args = parser.parse_args()
+
+    camera = CameraCapture(2) # Grabs on its own thread and rotates the newest frame upright
+    
+    maze = Maze()
+    plan = Plan(maze, args.planner) # "table": the layout never changes - loaded from scripts/.planner_cache after the first run
+    robot_udp = os.environ.get("ROBOT_UDP") # host:port of a robot speaking robot_protocol, e.g. mock_robot.py
+    if robot_udp:
+        host, port = robot_udp.rsplit(":", 1)
+        bot = Bot(UdpCommandSender(host, int(port)))
+    else:
+        bot = Bot()
+    pipeline = VisionPipeline(maze, plan, bot, rotation=None) # Detector and grid geometry are built once, not per frame
+    
+    while True:
+        ret, frame, captured_at = camera.read()
+        if not ret:
+            if camera.running: # Timed out - a slow camera open or a USB stall, not the end of the stream
+                continue
+            break
+
+        frame = pipeline.process(frame, captured_at)
+        cv2.imshow("Video Feed", frame)
+        if cv2.waitKey(1) == ord('q'):
+            break
+            
+    print(pipeline.timing_summary())
+    print(pipeline.tracker.searches)
+    print(camera.stats())
+    print(bot.sender.stats())
+    bot.sender.close()
+    camera.release()
+    cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
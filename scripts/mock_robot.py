@@ -0,0 +1,133 @@
+import argparse
+import math
+import random
+import socket
+import threading
+import time
+
+from robot_protocol import ROBOT_PORT, decode_command, encode_ack, is_newer
+
+WHEEL_BASE = 0.12 # m between the wheels
+MAX_WHEEL_SPEED = 0.4 # m/s
+MAX_ACCELERATION = 1.0 # m/s^2 per wheel
+COMMAND_TIMEOUT = 0.5 # Seconds without a command before the robot stops
+STEP = 0.01 # Simulation step, s
+
+
+class MockRobot:
+    """Stand-in for the robot's firmware: speaks robot_protocol on UDP and simulates a differential-drive base.
+
+    Every valid command is acked; only commands newer than the last applied one change the setpoints. The setpoints
+    become left/right wheel speeds, limited to MAX_WHEEL_SPEED and MAX_ACCELERATION, and the pose (x, y in m,
+    heading in rad) is integrated every STEP. With no command for COMMAND_TIMEOUT the wheels are brought to a stop.
+    `loss` drops that share of incoming packets, to see how the sender copes.
+    """
+
+    def __init__(self, host="127.0.0.1", port=ROBOT_PORT, robot_id=0, loss=0.0):
+        self.robot_id = robot_id
+        self.loss = loss
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(STEP)
+        self.address = self.sock.getsockname()
+        self.x = self.y = self.heading = 0.0
+        self.left = self.right = 0.0 # Wheel speeds, m/s
+        self.setpoint = (0, 0) # Linear mm/s, turn mrad/s
+        self.last_sequence = None
+        self.last_command = None
+        self.received = 0
+        self.applied = 0
+        self.stale = 0
+        self.corrupt = 0
+        self.dropped = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _handle(self, packet, sender):
+        self.received += 1
+        if self.loss and random.random() < self.loss:
+            self.dropped += 1
+            return
+        command = decode_command(packet)
+        if command is None:
+            self.corrupt += 1
+            return
+        robot_id, sequence, timestamp, linear, turn = command
+        if robot_id != self.robot_id:
+            return
+        self.sock.sendto(encode_ack(robot_id, sequence, timestamp), sender)
+        if self.last_sequence is not None and not is_newer(sequence, self.last_sequence):
+            self.stale += 1
+            return
+        self.last_sequence = sequence
+        self.last_command = time.monotonic()
+        self.setpoint = (linear, turn)
+        self.applied += 1
+
+    def _step(self, dt):
+        linear, turn = self.setpoint
+        if self.last_command is None or time.monotonic() - self.last_command > COMMAND_TIMEOUT:
+            linear = turn = 0
+        linear, turn = linear / 1000, turn / 1000
+        targets = (linear - turn * WHEEL_BASE / 2, linear + turn * WHEEL_BASE / 2)
+        step = MAX_ACCELERATION * dt
+        self.left, self.right = (
+            current + max(-step, min(step, max(-MAX_WHEEL_SPEED, min(MAX_WHEEL_SPEED, target)) - current))
+            for current, target in zip((self.left, self.right), targets)
+        )
+        speed = (self.left + self.right) / 2
+        self.heading = (self.heading + (self.right - self.left) / WHEEL_BASE * dt) % (2 * math.pi)
+        self.x += speed * math.cos(self.heading) * dt
+        self.y += speed * math.sin(self.heading) * dt
+
+    def _run(self):
+        last = time.monotonic()
+        while self.running:
+            try:
+                packet, sender = self.sock.recvfrom(64)
+                self._handle(packet, sender)
+            except socket.timeout:
+                pass
+            except OSError: # e.g. ICMP port unreachable from a sender that went away
+                pass
+            now = time.monotonic()
+            if now - last >= STEP:
+                self._step(now - last)
+                last = now
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "applied": self.applied,
+            "stale": self.stale,
+            "corrupt": self.corrupt,
+            "dropped": self.dropped,
+            "pose": (round(self.x, 3), round(self.y, 3), round(math.degrees(self.heading), 1)),
+        }
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        self.sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock differential-drive robot speaking robot_protocol over UDP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=ROBOT_PORT)
+    parser.add_argument("--robot-id", type=int, default=0)
+    parser.add_argument("--loss", type=float, default=0.0, help="share of incoming packets to drop")
+    args = parser.parse_args()
+
+    robot = MockRobot(args.host, args.port, args.robot_id, args.loss).start()
+    print(f"mock robot {args.robot_id} on udp://{robot.address[0]}:{robot.address[1]}")
+    try:
+        while True:
+            time.sleep(1)
+            print(robot.stats())
+    except KeyboardInterrupt:
+        robot.close()
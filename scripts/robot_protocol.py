@@ -0,0 +1,67 @@
+import binascii
+import struct
+
+# Binary robot command protocol over UDP. Little-endian, CRC-16/CCITT (binascii.crc_hqx) over everything before it.
+#
+#   command (14 bytes): magic 0xC3, robot id u8, sequence u16, timestamp u32 ms,
+#                       linear i16 mm/s, turn i16 mrad/s, crc u16
+#   ack     (10 bytes): magic 0xA5, robot id u8, sequence u16, timestamp u32 ms (echoed from the command), crc u16
+#
+# The sequence wraps at 2^16 and the timestamp (the sender's clock, milliseconds) at 2^32. A robot applies a command
+# only if its sequence is newer than the last one applied, acks every valid command (stale ones too, so the sender
+# stops retrying them) and stops if no command arrives for a while. The echoed timestamp gives the sender the round
+# trip without the robot needing a synchronised clock.
+COMMAND = struct.Struct("<BBHIhhH")
+ACK = struct.Struct("<BBHIH")
+COMMAND_MAGIC = 0xC3
+ACK_MAGIC = 0xA5
+ROBOT_PORT = 9750
+SEQUENCE_MODULO = 1 << 16
+TIMESTAMP_MODULO = 1 << 32
+LIMIT = (1 << 15) - 1 # Setpoints are clamped to int16
+# Setpoints (linear mm/s, turn mrad/s, counter-clockwise positive) for the planner's word commands
+SETPOINTS = {
+    "forward": (150, 0),
+    "left": (0, 1500),
+    "right": (0, -1500),
+    "stop": (0, 0),
+}
+
+
+def encode_command(robot_id, sequence, timestamp, linear, turn):
+    linear = max(-LIMIT, min(LIMIT, int(linear)))
+    turn = max(-LIMIT, min(LIMIT, int(turn)))
+    sequence %= SEQUENCE_MODULO
+    timestamp %= TIMESTAMP_MODULO
+    body = COMMAND.pack(COMMAND_MAGIC, robot_id, sequence, timestamp, linear, turn, 0)[:-2]
+    return body + struct.pack("<H", binascii.crc_hqx(body, 0xFFFF))
+
+
+def decode_command(packet):
+    # (robot id, sequence, timestamp, linear, turn), or None for anything malformed
+    if len(packet) != COMMAND.size or packet[0] != COMMAND_MAGIC:
+        return None
+    magic, robot_id, sequence, timestamp, linear, turn, crc = COMMAND.unpack(packet)
+    if binascii.crc_hqx(packet[:-2], 0xFFFF) != crc:
+        return None
+    return robot_id, sequence, timestamp, linear, turn
+
+
+def encode_ack(robot_id, sequence, timestamp):
+    body = ACK.pack(ACK_MAGIC, robot_id, sequence, timestamp, 0)[:-2]
+    return body + struct.pack("<H", binascii.crc_hqx(body, 0xFFFF))
+
+
+def decode_ack(packet):
+    # (robot id, sequence, timestamp), or None for anything malformed
+    if len(packet) != ACK.size or packet[0] != ACK_MAGIC:
+        return None
+    magic, robot_id, sequence, timestamp, crc = ACK.unpack(packet)
+    if binascii.crc_hqx(packet[:-2], 0xFFFF) != crc:
+        return None
+    return robot_id, sequence, timestamp
+
+
+def is_newer(sequence, last):
+    # True if sequence comes after last, allowing for wrap-around
+    return 0 < (sequence - last) % SEQUENCE_MODULO < SEQUENCE_MODULO // 2
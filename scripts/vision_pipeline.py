@@ -0,0 +1,153 @@
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from marker_tracker import MarkerTracker
+
+TIMING_SAMPLES = 120 # Frames the per-stage timings are averaged over
+STAGES = ("prepare", "detect", "plan", "overlay", "command")
+ROBOT_MARKER = 0 # ArUco id on the robot - its cell is the plan's start
+GOAL_MARKER = 1 # ArUco id on the goal
+
+
+class VisionPipeline:
+    """Overhead camera pipeline of the maze robot (maze_robot.py).
+
+    The ArUco detector is built once. The grid geometry (cell size, origin, node pixel centres, pre-rendered walls) is
+    built for the first frame and only rebuilt if the frame size or the maze changes. Each frame then runs as explicit
+    stages:
+        prepare - rotate the camera image into a preallocated buffer
+        detect  - track the markers (MarkerTracker), move the plan's start/goal and update the bot's pose
+        plan    - update the path
+        overlay - draw the markers and path, composite the cached walls
+        command - send the next movement command to the bot
+    and every stage is timed, so the slow one is visible on the frame and in timing_summary(). With a capture time,
+    frame_age is the time from capture to the command.
+    """
+
+    def __init__(self, maze, plan, bot, rotation=cv2.ROTATE_180, dictionary=cv2.aruco.DICT_4X4_50):
+        self.maze = maze
+        self.plan = plan
+        self.bot = bot
+        self.rotation = rotation
+        self.detector = cv2.aruco.ArucoDetector(cv2.aruco.getPredefinedDictionary(dictionary), cv2.aruco.DetectorParameters())
+        self.tracker = MarkerTracker(self.detector, (ROBOT_MARKER, GOAL_MARKER))
+        self.frame = None # Rotated camera image, reused every frame
+        self.source_shape = None
+        self.shape = None
+        self.cell_size = None
+        self.start_coordinates = None
+        self.layout = None # Maze walls the cached geometry was built for
+        self.wall_layer = None # Pre-rendered walls (colour) ...
+        self.wall_mask = None # ... and where they are
+        self.corners = ()
+        self.ids = None
+        self.timings = {stage: deque(maxlen=TIMING_SAMPLES) for stage in STAGES + ("frame_age",)}
+
+    def build_geometry(self, shape):
+        # Grid layout for this frame size - the maze is centred and takes 10/11 of the frame height. The walls are
+        # rendered once into a colour layer and a mask, so overlay() composites them with a single copy.
+        rows, cols = len(self.maze.binary), len(self.maze.binary[0])
+        self.shape = shape
+        self.layout = [list(row) for row in self.maze.binary]
+        self.cell_size = int(shape[0] / 11)
+        self.start_coordinates = (int(shape[1] / 2 - cols * self.cell_size / 2), int(shape[0] / 2 - rows * self.cell_size / 2))
+        self.wall_layer = np.zeros(shape, np.uint8)
+        self.wall_mask = np.zeros(shape[:2], np.uint8)
+        size = self.cell_size
+        for i in range(rows):
+            for j in range(cols):
+                cell = self.maze.binary[i][j]
+                x = self.start_coordinates[0] + j * size
+                y = self.start_coordinates[1] + i * size
+                self.maze.nodes[i][j].pixel_coordinates = (int(x + size / 2), int(y + size / 2))
+                walls = []
+                if cell[0] == '1': # Top wall
+                    walls.append(((x, y), (x + size, y)))
+                if cell[1] == '1': # Right wall
+                    walls.append(((x + size, y), (x + size, y + size)))
+                if cell[2] == '1': # Bottom wall
+                    walls.append(((x, y + size), (x + size, y + size)))
+                if cell[3] == '1': # Left wall
+                    walls.append(((x, y), (x, y + size)))
+                for start, end in walls:
+                    cv2.line(self.wall_layer, start, end, (0, 255, 255), 2)
+                    cv2.line(self.wall_mask, start, end, 255, 2)
+
+    def prepare(self, camera_frame):
+        if self.rotation is None: # Already upright (CameraCapture rotates) - drawn on in place
+            self.frame = camera_frame
+        elif self.frame is None or self.source_shape != camera_frame.shape: # First frame - allocate the buffer
+            self.source_shape = camera_frame.shape
+            self.frame = cv2.rotate(camera_frame, self.rotation)
+        else:
+            cv2.rotate(camera_frame, self.rotation, dst=self.frame)
+        if self.shape != self.frame.shape or self.layout != self.maze.binary: # Only when the frame size or maze changes
+            self.build_geometry(self.frame.shape)
+        return self.frame
+
+    def cell_at(self, point):
+        rows, cols = len(self.maze.nodes), len(self.maze.nodes[0])
+        u = int((point[0] - self.start_coordinates[0]) // self.cell_size)
+        v = int((point[1] - self.start_coordinates[1]) // self.cell_size)
+        return self.maze.nodes[min(max(v, 0), rows - 1)][min(max(u, 0), cols - 1)]
+
+    def detect(self, frame):
+        # Detects the aruco markers and sets the start and goal nodes
+        self.corners, self.ids = self.tracker.detect(frame)
+        if self.ids is None:
+            return
+        for marker_id, corner in zip(np.ravel(self.ids), self.corners): # ids is (n, 1) or (n,) depending on the OpenCV version
+            top_left, top_right, bottom_right, bottom_left = np.reshape(corner, (4, 2))
+            center = (int((top_left[0] + bottom_right[0]) / 2), int((top_left[1] + bottom_right[1]) / 2))
+            angle = np.arctan2(top_right[1] - top_left[1], top_right[0] - top_left[0]) * 180 / np.pi
+            if marker_id == ROBOT_MARKER:
+                self.bot.update_bot_status(center, angle)
+                self.plan.start = self.cell_at(center)
+            if marker_id == GOAL_MARKER:
+                self.plan.goal = self.cell_at(center)
+
+    def overlay(self, frame):
+        if self.ids is not None:
+            cv2.aruco.drawDetectedMarkers(frame, self.corners, self.ids, (0, 255, 0))
+        cv2.copyTo(self.wall_layer, self.wall_mask, frame)
+        path = self.plan.path or []
+        for i in range(len(path) - 1):
+            cv2.line(frame, path[i].pixel_coordinates, path[i + 1].pixel_coordinates, (0, 255, 0), 2)
+        cv2.putText(frame, self.timing_text(), (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+    def process(self, camera_frame, captured_at=None):
+        # Runs every stage on one camera frame and returns the annotated frame (a buffer reused by the next call).
+        # captured_at (time.monotonic() of the capture) adds the frame's age at the command to the timings.
+        started = time.perf_counter()
+        frame = self.prepare(camera_frame)
+        started = self._lap("prepare", started)
+        self.detect(frame)
+        started = self._lap("detect", started)
+        self.plan.update_path()
+        started = self._lap("plan", started)
+        self.overlay(frame)
+        started = self._lap("overlay", started)
+        self.bot.send_movement_commands(self.plan)
+        self._lap("command", started)
+        if captured_at is not None:
+            self.timings["frame_age"].append(time.monotonic() - captured_at)
+        return frame
+
+    def _lap(self, stage, started):
+        now = time.perf_counter()
+        self.timings[stage].append(now - started)
+        return now
+
+    def timing_summary(self):
+        # Mean and worst time per stage in ms over the last TIMING_SAMPLES frames
+        return {
+            stage: {"mean_ms": 1000 * sum(samples) / len(samples), "max_ms": 1000 * max(samples)}
+            for stage, samples in self.timings.items() if samples
+        }
+
+    def timing_text(self):
+        text = " | ".join(f"{stage} {1000 * sum(samples) / len(samples):.1f} ms" for stage, samples in self.timings.items() if samples)
+        return f"{text} | {self.tracker.last_cost['mode']} search {self.tracker.last_cost['pixels'] // 1000}k px"
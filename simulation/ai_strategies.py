@@ -1,16 +1,33 @@
 from abc import ABC, abstractmethod
+import logging
 import math
 import random
+import time
 from scipy.optimize import linear_sum_assignment
 import numpy as np
 from sklearn.tree import DecisionTreeClassifier, export_text
 from constants_and_util import * # Import constants and functions
 
+log = logging.getLogger(__name__)
+
+DEFERRED = object() # Returned by a strategy that ran out of decision time - the robot repeats its last action this tick
+
 class Strategy(ABC):
     @abstractmethod
     def make_strategic_decision(self, robot, game, game_state):
         pass
 
+    def time_left(self, robot):
+        # Seconds left before the robot's decision deadline (None when decisions are not time limited)
+        if robot.decision_deadline is None:
+            return None
+        return robot.decision_deadline - time.perf_counter()
+
+    def out_of_time(self, robot):
+        # Expensive strategies check this to split their work across ticks
+        time_left = self.time_left(robot)
+        return time_left is not None and time_left <= 0
+
 class LayeredCapabilitiesStrategy(Strategy): # Renamed and Refactored Strategy
     def make_strategic_decision(self, robot, game, game_state):
         if robot.role == "striker":
@@ -71,7 +88,7 @@ class LayeredCapabilitiesStrategy(Strategy): # Renamed and Refactored Strategy
         angle_to_ball = angle_between_points(robot.x, robot.y, game_state["ball_x"], game_state["ball_y"])
         dist_to_ball = distance(robot.x, robot.y, game_state["ball_x"], game_state["ball_y"])
         if dist_to_ball > ROBOT_RADIUS + BALL_RADIUS:
-            return {"action": "move", "parameters": {"angle": angle_to_ball}, "state_description": "GetBall - Moving towards ball"}
+            return {"action": "move", "parameters": {"angle": angle_to_ball, "target": "ball"}, "state_description": "GetBall - Moving towards ball"}
         else:
             return {"action": "idle", "state_description": "GetBall - Arrived at ball"}
 
@@ -79,13 +96,13 @@ class LayeredCapabilitiesStrategy(Strategy): # Renamed and Refactored Strategy
         opponent_goal_x = game_state["opponent_goal_x"]
         opponent_goal_y = game_state["opponent_goal_y"]
         angle_to_goal = angle_between_points(robot.x, robot.y, opponent_goal_x, opponent_goal_y)
-        return {"action": "move", "parameters": {"angle": angle_to_goal}, "state_description": "Advance - Moving towards goal"}
+        return {"action": "move", "parameters": {"angle": angle_to_goal, "target": "opponent_goal"}, "state_description": "Advance - Moving towards goal"}
 
     def dribble_state(self, robot, game, game_state):
         opponent_goal_x = game_state["opponent_goal_x"]
         opponent_goal_y = game_state["opponent_goal_y"]
         angle_to_goal = angle_between_points(robot.x, robot.y, opponent_goal_x, opponent_goal_y)
-        return {"action": "move", "parameters": {"angle": angle_to_goal}, "state_description": "Dribble - Moving with ball towards goal"}
+        return {"action": "move", "parameters": {"angle": angle_to_goal, "target": "opponent_goal"}, "state_description": "Dribble - Moving with ball towards goal"}
 
     def kick_state(self, robot, game, game_state):
         return {"action": "shoot", "parameters": {}, "state_description": "Kick - Shooting the ball"} # Power parameter could be added
@@ -103,13 +120,13 @@ class LayeredCapabilitiesStrategy(Strategy): # Renamed and Refactored Strategy
 
     def follow_ball_state(self, robot, game, game_state):
         angle_to_ball = angle_between_points(robot.x, robot.y, game_state["ball_x"], game_state["ball_y"])
-        return {"action": "move", "parameters": {"angle": angle_to_ball}, "state_description": "FollowBall - Moving towards ball"}
+        return {"action": "move", "parameters": {"angle": angle_to_ball, "target": "ball"}, "state_description": "FollowBall - Moving towards ball"}
 
     def return_state(self, robot, game, game_state):
         own_goal_x = game_state["own_goal_x"]
         own_goal_y = game_state["own_goal_y"]
         angle_to_goal = angle_between_points(robot.x, robot.y, own_goal_x, own_goal_y) # Return towards own goal area
-        return {"action": "move", "parameters": {"angle": angle_to_goal}, "state_description": "Return - Returning towards own goal"}
+        return {"action": "move", "parameters": {"angle": angle_to_goal, "target": "own_goal"}, "state_description": "Return - Returning towards own goal"}
 
     def support_position_state(self, robot, game, game_state):
         striker = None
@@ -210,14 +227,18 @@ class DynamicRoleStrategy(Strategy):
     def __init__(self, dqn_agent=None): # Pass DQN agent during initialization
         self.last_role_assignment = {}
         self.dqn_agent = dqn_agent # Store DQN agent
+        self.pending_cost_matrix = None # Partially built cost matrix - role reassignment is spread over ticks when time runs out
+        self.pending_cost_rows = 0
 
     def make_strategic_decision(self, robot, game, game_state):
         team_robots = [r for r in game.robots if r.team == robot.team]
         roles = ["striker", "supporter", "defender", "goalkeeper"]
 
         # Re-assign roles periodically (e.g., every 2 seconds - adjust as needed)
-        if game.game_time % 2.0 == 0: # Check game time in seconds
-            self.assign_roles_hungarian(team_robots, roles, game, game_state)
+        if game.game_time % 2.0 == 0 or self.pending_cost_matrix is not None: # Check game time in seconds, or finish a reassignment started on an earlier tick
+            self.assign_roles_hungarian(team_robots, roles, game, game_state, deciding_robot=robot)
+            if self.pending_cost_matrix is not None and robot.last_action_result is not None: # Ran out of time mid-matrix - repeat the last action, finish next tick
+                return DEFERRED
 
         # Execute role-specific behavior (using LayeredCapabilitiesStrategy's logic for now)
         if robot.role == "striker":
@@ -231,19 +252,32 @@ class DynamicRoleStrategy(Strategy):
         else:
             return LayeredCapabilitiesStrategy().default_decision(robot, game, game_state)
 
-    def assign_roles_hungarian(self, robots, roles, game, game_state):
+    def assign_roles_hungarian(self, robots, roles, game, game_state, deciding_robot=None):
         num_robots = len(robots)
         num_roles = len(roles)
 
         if num_robots != num_roles: # Basic check, adjust if you want more/fewer robots than roles
-            print("Error: Number of robots must match number of roles for DynamicRoleStrategy (currently assuming 4 robots, 4 roles).")
+            log.warning("number of robots must match number of roles for DynamicRoleStrategy", extra={"robots": num_robots, "roles": num_roles})
             return
 
-        cost_matrix = np.zeros((num_robots, num_roles))
-
-        for i, robot in enumerate(robots):
+        if self.pending_cost_matrix is None:
+            self.pending_cost_matrix = np.zeros((num_robots, num_roles))
+            self.pending_cost_rows = 0
+
+        # Fill the cost matrix one robot (row) at a time - with a DQN agent each row is several predict() calls, so stop when
+        # the decision deadline passes and carry on next tick (at least one row per call so the assignment always completes)
+        rows_this_tick = 0
+        while self.pending_cost_rows < num_robots:
+            if rows_this_tick > 0 and deciding_robot is not None and self.out_of_time(deciding_robot):
+                return # Current roles stay in place until the matrix is complete
+            i = self.pending_cost_rows
             for j, role in enumerate(roles):
-                cost_matrix[i, j] = self.calculate_role_cost(robot, role, game, game_state)
+                self.pending_cost_matrix[i, j] = self.calculate_role_cost(robots[i], role, game, game_state)
+            self.pending_cost_rows += 1
+            rows_this_tick += 1
+
+        cost_matrix = self.pending_cost_matrix
+        self.pending_cost_matrix = None
 
         robot_indices, role_indices = linear_sum_assignment(cost_matrix) # Hungarian Algorithm
 
@@ -258,7 +292,7 @@ class DynamicRoleStrategy(Strategy):
         for robot in robots:
             last_role = self.last_role_assignment.get(robot.robot_id)
             if last_role and last_role != robot.role:
-                print(f"Robot {robot.robot_id} role changed from {last_role} to {robot.role}")
+                log.debug("role changed", extra={"robot": robot.robot_id, "from_role": last_role, "to_role": robot.role})
         self.last_role_assignment = new_role_assignment # Update last assignment
 
 
@@ -327,7 +361,7 @@ class DynamicRoleStrategy(Strategy):
 class SimpleGoToBallStrategy(Strategy):
     def make_strategic_decision(self, robot, game, game_state):
         angle_to_ball = angle_between_points(robot.x, robot.y, game_state["ball_x"], game_state["ball_y"])
-        return {"action": "move", "parameters": {"angle": angle_to_ball}, "state_description": "SimpleGoToBall - Always moving towards ball"}
+        return {"action": "move", "parameters": {"angle": angle_to_ball, "target": "ball"}, "state_description": "SimpleGoToBall - Always moving towards ball"}
 
 #####################################################################################
 #####################################################################################
@@ -339,6 +373,7 @@ class FormationPassingStrategy(Strategy):
         self.formation = AVAILABLE_FORMATIONS_RELATIVE.get(formation_name, FORMATION_KITE_ATTACK_RELATIVE) # Get relative formation, default to kite
         self.formation_roles = list(self.formation.keys())
         self.last_formation_assignment = {}
+        self.assigned_at = {} # Team -> decision tick its formation roles were last assigned
 
         # --- Decision Tree for Forward Role ---
         self.forward_role_dtree = DecisionTreeClassifier(max_depth=3) # Example max_depth - tune this
@@ -382,13 +417,20 @@ class FormationPassingStrategy(Strategy):
 
     def make_strategic_decision(self, robot, game, game_state):
         team_robots = [r for r in game.robots if r.team == robot.team] # Get team robots list here
-        self.assign_formation_roles(robot, game, game_state, team_robots) # Pass team_robots list to assign_formation_roles
+        tick = game.decision_budget.ticks
+        if self.assigned_at.get(robot.team) != tick: # Once per team per tick - teammates deciding after this robot reuse it
+            if self.last_formation_assignment and self.out_of_time(robot): # Out of decision time - keep last tick's formation roles
+                if robot.last_action_result is not None:
+                    return DEFERRED
+            else:
+                self.assign_formation_roles(robot, game, game_state, team_robots) # Pass team_robots list to assign_formation_roles
+                self.assigned_at[robot.team] = tick
 
         # --- Defensive Transition Logic ---
         if self.is_in_defensive_half(robot, game_state): # Check if in defensive half
             closest_robot_to_ball = game.get_closest_robot_to_ball(robot) # Helper function in FootballGame needed
             if closest_robot_to_ball == robot: # If closest to ball in defensive half, prioritize defense
-                return {"action": "move", "parameters": {"angle": angle_between_points(robot.x, robot.y, game_state["ball_x"], game_state["ball_y"])}, "state_description": "FormationPass-Defender: Defensive Get Ball (Priority)"} # Get ball defensively
+                return {"action": "move", "parameters": {"angle": angle_between_points(robot.x, robot.y, game_state["ball_x"], game_state["ball_y"]), "target": "ball"}, "state_description": "FormationPass-Defender: Defensive Get Ball (Priority)"} # Get ball defensively
             else: # If not closest, move to defend formation/position (can be expanded later)
                 return {"action": "move", "parameters": {"angle": angle_between_points(robot.x, robot.y, game_state["own_goal_x"], game_state["ball_y"])}, "state_description": "FormationPass-Defender: Defensive Positioning"} # Move towards own goal, intercept ball path
         # --- End Defensive Transition Logic ---
@@ -406,12 +448,14 @@ class FormationPassingStrategy(Strategy):
                 if robot.formation_role == "top": # "Top" role (forward) - prioritize getting the ball in attacking half
                     closest_robot_to_ball = game.get_closest_robot_to_ball(robot)
                     if closest_robot_to_ball == robot: # If closest, get the ball aggressively
-                        return {"action": "move", "parameters": {"angle": angle_between_points(robot.x, robot.y, game_state["ball_x"], game_state["ball_y"])}, "state_description": "FormationPass-Forward: Attacking Get Ball (Priority - Aggressive)"}
+                        return {"action": "move", "parameters": {"angle": angle_between_points(robot.x, robot.y, game_state["ball_x"], game_state["ball_y"]), "target": "ball"}, "state_description": "FormationPass-Forward: Attacking Get Ball (Priority - Aggressive)"}
                     else: # If not closest, still move towards ball in attacking area (less priority)
-                        return {"action": "move", "parameters": {"angle": angle_between_points(robot.x, robot.y, game_state["ball_x"], game_state["ball_y"])}, "state_description": "FormationPass-Forward: Attacking Move to Ball (Support)"} # Move towards ball to support
+                        return {"action": "move", "parameters": {"angle": angle_between_points(robot.x, robot.y, game_state["ball_x"], game_state["ball_y"]), "target": "ball"}, "state_description": "FormationPass-Forward: Attacking Move to Ball (Support)"} # Move towards ball to support
         # --- End Counter-Attack and Attacking Ball Acquisition Logic ---
 
 
+        if self.out_of_time(robot) and robot.last_action_result is not None: # The decision trees are the slow part - leave them to the next tick
+            return DEFERRED
         if robot.formation_role == "top": # Updated role names to match kite formation
             return self.forward_role_decision(robot, game, game_state, team_robots) # Call forward role decision tree
         elif robot.formation_role == "left_mid" or robot.formation_role == "right_mid":
@@ -464,7 +508,7 @@ class FormationPassingStrategy(Strategy):
         formation_roles = self.formation_roles
 
         if len(team_robots) != len(formation_roles):
-            print("Error: Number of robots in team does not match formation roles.")
+            log.warning("number of robots in team does not match formation roles", extra={"robots": len(team_robots), "roles": len(formation_roles)})
             return
 
         # Designate reference robot (e.g., robot closest to opponent goal)
@@ -41,6 +41,17 @@ STRIKER_CHANCE = 0.4
 SUPPORTER_CHANCE = 0.3
 DEFENDER_CHANCE = 0.3
 GOALKEEPER_CHANCE = 0.1 # New Goalkeeper Role
+# Decision time budgets (seconds of wall-clock time per tick, None = unlimited)
+DECISION_BUDGET_ROBOT = 0.004 # Per robot decision - over this counts as an overrun
+DECISION_BUDGET_TEAM = 0.008 # Per team per tick - once used up, remaining robots repeat their last action
+# Phone controllers (see input_bridge.py)
+HUMAN_ROBOTS = {1: "A1", 2: "A2"} # Controller user id -> robot it drives
+JOYSTICK_DEADZONE = 0.15
+BUTTON_A = 1 # Shoot
+BUTTON_B = 2 # Pass to nearest teammate
+# Flow-field navigation (see navigation.py)
+FLOW_FIELD_NAVIGATION = False # Moves towards the ball and goals go around other robots - roughly halves headless ticks/sec in a scrum
+NAVIGATION_CELL = 2 * ROBOT_RADIUS # Grid cell size in pixels
 
 FORMATION_DIAMOND_ATTACK_RELATIVE = {
     "forward": {"distance": 0, "angle": 0},  # Reference point - Striker at 0 distance, 0 angle
@@ -0,0 +1,63 @@
+# decision_budget.py
+# Wall-clock time budgets for strategic decisions so a slow strategy cannot hold up the whole frame.
+import time
+from constants_and_util import DECISION_BUDGET_ROBOT, DECISION_BUDGET_TEAM
+
+
+class DecisionBudget:
+    def __init__(self, robot_budget=DECISION_BUDGET_ROBOT, team_budget=DECISION_BUDGET_TEAM, robot_budgets=None, team_budgets=None):
+        self.robot_budget = robot_budget # Default per robot budget (seconds, None = unlimited)
+        self.team_budget = team_budget # Default per team budget per tick (seconds, None = unlimited)
+        self.robot_budgets = robot_budgets or {} # Per robot overrides, e.g. {"B1": 0.002}
+        self.team_budgets = team_budgets or {} # Per team overrides, e.g. {"A": 0.004}
+        self.team_spent = {} # Decision time used by each team this tick
+        self.ticks = 0 # start_tick() calls, so strategies can tell the ticks apart
+        self.overruns = {} # robot_id -> number of decisions that went over the robot budget
+        self.cached_decisions = {} # robot_id -> number of ticks the last action was reused instead of deciding
+
+    def get_robot_budget(self, robot):
+        return self.robot_budgets.get(robot.robot_id, self.robot_budget)
+
+    def get_team_budget(self, team):
+        return self.team_budgets.get(team, self.team_budget)
+
+    def start_tick(self):
+        self.ticks += 1
+        self.team_spent = {}
+
+    def team_time_left(self, team):
+        budget = self.get_team_budget(team)
+        if budget is None:
+            return None
+        return budget - self.team_spent.get(team, 0.0)
+
+    def team_exhausted(self, team):
+        time_left = self.team_time_left(team)
+        return time_left is not None and time_left <= 0
+
+    def deadline_for(self, robot):
+        # perf_counter() time by which the robot's decision should be finished (None = no deadline)
+        limits = [limit for limit in (self.get_robot_budget(robot), self.team_time_left(robot.team)) if limit is not None]
+        if not limits:
+            return None
+        return time.perf_counter() + min(limits)
+
+    def charge(self, robot, elapsed):
+        # Record the time a decision took - returns True if it overran the robot budget
+        self.team_spent[robot.team] = self.team_spent.get(robot.team, 0.0) + elapsed
+        robot_budget = self.get_robot_budget(robot)
+        if robot_budget is not None and elapsed > robot_budget:
+            self.overruns[robot.robot_id] = self.overruns.get(robot.robot_id, 0) + 1
+            return True
+        return False
+
+    def record_cached_decision(self, robot):
+        self.cached_decisions[robot.robot_id] = self.cached_decisions.get(robot.robot_id, 0) + 1
+
+    def stats(self):
+        return {
+            "overruns": dict(self.overruns),
+            "cached_decisions": dict(self.cached_decisions),
+            "total_overruns": sum(self.overruns.values()),
+            "total_cached_decisions": sum(self.cached_decisions.values()),
+        }
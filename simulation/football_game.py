@@ -4,8 +4,12 @@ import math
 import random
 import time
 from abc import ABC, abstractmethod
-from ai_strategies import Strategy, LayeredCapabilitiesStrategy, DynamicRoleStrategy, SimpleGoToBallStrategy, FormationPassingStrategy
+from ai_strategies import Strategy, LayeredCapabilitiesStrategy, DynamicRoleStrategy, SimpleGoToBallStrategy, FormationPassingStrategy, DEFERRED
 from constants_and_util import * # Import constants and functions
+from decision_budget import DecisionBudget
+from input_bridge import InputBridgeReceiver
+from navigation import FlowFieldNavigator
+from state_publisher import MatchStatePublisher
 
 # --- **NEW:** Import MoviePy ---
 try:
@@ -34,6 +38,9 @@ class Robot:
         self.strategy = strategy_class() # Instantiate strategy here
         self.current_action = "idle"
         self.current_state_description = "Initial State" # For UI display
+        self.last_action_result = None # Reused when the decision budget runs out or the strategy defers
+        self.decision_deadline = None # perf_counter() deadline for the current decision, read by Strategy.time_left()
+        self.last_buttons = 0 # Controller buttons held on the previous tick - actions fire on press, not while held
 
     @property
     def state_description(self):
@@ -163,7 +170,22 @@ class Robot:
 
     def make_strategic_decision(self):
         game_state = self.get_game_state()
-        action_result = self.strategy.make_strategic_decision(self, self.game, game_state) # Call external strategy
+        budget = self.game.decision_budget
+        if budget.team_exhausted(self.team):
+            # Team has used up its decision time this tick - repeat the last action instead of calling the strategy
+            budget.record_cached_decision(self)
+            action_result = self.last_action_result
+        else:
+            self.decision_deadline = budget.deadline_for(self)
+            decision_start = time.perf_counter()
+            action_result = self.strategy.make_strategic_decision(self, self.game, game_state) # Call external strategy
+            budget.charge(self, time.perf_counter() - decision_start)
+            self.decision_deadline = None
+            if action_result is DEFERRED: # Strategy ran out of time and will finish its work on a later tick
+                budget.record_cached_decision(self)
+                action_result = self.last_action_result
+            else:
+                self.last_action_result = action_result
 
         if isinstance(action_result, dict) and action_result and "action" in action_result:
             action_type = action_result["action"]
@@ -171,7 +193,11 @@ class Robot:
             self.state_description = action_result.get("state_description", "Executing Action") # Update state description
 
             if action_type == "move":
-                self.move(math.cos(parameters["angle"]), math.sin(parameters["angle"]))
+                angle = parameters["angle"]
+                target = parameters.get("target") # "ball", "opponent_goal" or "own_goal" - the angle points straight at it
+                if target and self.game.navigator:
+                    angle = self.game.navigator.heading(self, game_state[f"{target}_x"], game_state[f"{target}_y"], angle)
+                self.move(math.cos(angle), math.sin(angle))
                 self.current_action = "moving"
             elif action_type == "shoot":
                 self.shoot(self.game.ball)
@@ -183,6 +209,8 @@ class Robot:
                 opponent_goal_x = game_state["opponent_goal_x"]
                 opponent_goal_y = game_state["opponent_goal_y"]
                 angle_to_goal = angle_between_points(self.x, self.y, opponent_goal_x, opponent_goal_y)
+                if self.game.navigator:
+                    angle_to_goal = self.game.navigator.heading(self, opponent_goal_x, opponent_goal_y, angle_to_goal)
                 self.move(math.cos(angle_to_goal), math.sin(angle_to_goal))
                 self.current_action = "dribbling_strategic"
             elif action_type == "idle":
@@ -197,12 +225,44 @@ class Robot:
             angle_to_ball = angle_between_points(self.x, self.y, self.game.ball.x, self.game.ball.y)
             dist_to_ball = distance(self.x, self.y, self.game.ball.x, self.game.ball.y)
             if dist_to_ball > ROBOT_RADIUS + BALL_RADIUS:
+                if self.game.navigator:
+                    angle_to_ball = self.game.navigator.heading(self, self.game.ball.x, self.game.ball.y, angle_to_ball)
                 self.move(math.cos(angle_to_ball), math.sin(angle_to_ball))
                 self.current_action = "heading_to_ball_default"
             else:
                 self.current_action = "idle_default"
             self.state_description = "Default - Heading to ball" # Default action description
 
+        return action_result
+
+
+    def apply_controller_input(self, controller_input):
+        # Phone control: stick moves the robot, A shoots, B passes to the nearest teammate
+        stick_x = controller_input["x"]
+        stick_y = -controller_input["y"] # Joystick up is positive, pitch y grows downwards
+        pressed = controller_input["buttons"] & ~self.last_buttons
+        self.last_buttons = controller_input["buttons"]
+        action_result = {"action": "idle", "state_description": "Human - Idle"}
+
+        if pressed & BUTTON_A:
+            self.shoot(self.game.ball)
+            action_result = {"action": "shoot", "state_description": "Human - Shooting"}
+        elif pressed & BUTTON_B:
+            teammates = [robot for robot in self.game.robots if robot.team == self.team and robot != self]
+            if teammates:
+                teammate = min(teammates, key=lambda robot: distance(self.x, self.y, robot.x, robot.y))
+                angle_to_teammate = angle_between_points(self.x, self.y, teammate.x, teammate.y)
+                self.pass_ball(self.game.ball, angle_to_teammate)
+                action_result = {"action": "pass_ball", "parameters": {"angle": angle_to_teammate}, "state_description": "Human - Passing"}
+
+        if math.sqrt(stick_x**2 + stick_y**2) > JOYSTICK_DEADZONE:
+            self.move(stick_x, stick_y)
+            if action_result["action"] == "idle":
+                action_result = {"action": "move", "parameters": {"angle": math.atan2(stick_y, stick_x)}, "state_description": "Human - Moving"}
+
+        self.state_description = action_result["state_description"]
+        return action_result
+
 
 class Ball:
     # ... (Ball class remains the same)
@@ -276,58 +336,20 @@ class GoalNet:
 
 
 class FootballGame:
-    def __init__(self):
-        pygame.init()
-        pygame.mixer.init() # --- **NEW:** Initialize Pygame mixer for audio ---
-        self.screen = pygame.display.set_mode((PITCH_WIDTH + UI_WIDTH, PITCH_HEIGHT))
-        pygame.display.set_caption("Robot Football")
-        self.clock = pygame.time.Clock()
+    def __init__(self, headless=False, team_strategies=None, decision_budget=None, input_bridge=None, state_publisher=None, navigation=FLOW_FIELD_NAVIGATION, vision_bridge=None):
+        self.headless = headless # Headless games only run game logic (no window, audio or video) - used by benchmarks and the server
+        if not self.headless:
+            self._init_display()
+        else:
+            self.intro_sound = None
+            self.cheering_sound = None
+            self.goal_sound = None
 
         # Game States
         self.GAME_STATE_INTRO = 0
         self.GAME_STATE_PLAYING = 1
         self.GAME_STATE_OVER = 2
-        self.current_game_state = self.GAME_STATE_INTRO # Start with intro
-        self.intro_music_playing = False # Flag to track if intro music is playing
-
-        # --- **NEW:** Load Audio Files ---
-        try:
-            self.intro_sound = pygame.mixer.Sound("intro_music.mp3") # Replace "intro_music.mp3" with your intro music file
-            self.cheering_sound = pygame.mixer.Sound("cheering_audio.mp3") # Replace "cheering_audio.mp3" with your cheering audio file
-            self.goal_sound = pygame.mixer.Sound("goal_scored_audio.mp3") # Replace "goal_scored_audio.mp3" with your goal sound file
-        except pygame.error as e:
-            print(f"Error loading audio files: {e}")
-            self.intro_sound = None
-            self.cheering_sound = None
-            self.goal_sound = None
-
-        # --- **NEW:** Create channels for intro and cheering music ---
-        self.intro_channel = pygame.mixer.Channel(0) # Use channel 0 for intro music
-        self.cheering_channel = pygame.mixer.Channel(1) # Use channel 1 for cheering music
-        self.effects_channel = pygame.mixer.Channel(2) # Channel for goal sound effect
-
-
-        # --- **NEW:** MoviePy Video Setup ---
-        self.intro_clip = None  # Initialize to None
-        self.intro_frame = None
-        self.intro_frame_rect = None
-        self.moviepy_available = moviepy_available # Use the module-level availability flag
-
-        if self.moviepy_available:
-            try:
-                self.intro_clip = mp.VideoFileClip("intro_video.mp4") # Load your video file (replace "intro_video.mp4")
-                self.intro_frame = pygame.image.frombuffer(self.intro_clip.get_frame(0).tobytes(), self.intro_clip.size, 'RGB').convert()
-                self.intro_frame_rect = self.intro_frame.get_rect(center=self.screen.get_rect().center)
-            except Exception as e: # Catch broad exception for video loading issues
-                print(f"Error loading intro_video.mp4 with MoviePy: {e}. Video intro disabled.")
-                self.intro_clip = None # Disable video intro if loading fails
-        else:
-            print("MoviePy not available, video intro disabled.")
-
-        # --- **NEW:** Skip Intro Button Rect and Properties ---
-        self.skip_intro_button_rect = pygame.Rect(PITCH_WIDTH - 220 * SCALE_FACTOR, PITCH_HEIGHT - 60 * SCALE_FACTOR, 200 * SCALE_FACTOR, 40 * SCALE_FACTOR) # Bottom-right
-        self.skip_intro_button_color = (200, 200, 200, 50) # Grey with 50 alpha (translucent)
-
+        self.current_game_state = self.GAME_STATE_INTRO if not self.headless else self.GAME_STATE_PLAYING # Start with intro (headless games skip straight to playing)
 
         # Initialize game time, possession, etc. (rest of __init__ remains the same)
         self.game_time = 0.0
@@ -340,13 +362,19 @@ class FootballGame:
         self.formations = {}
         self._define_formations()
         self.current_formation = "attack"
+        self.decision_budget = decision_budget or DecisionBudget() # Per robot / per team time limits for strategic decisions
+        self.input_bridge = input_bridge # Phone controller input forwarded by the API server (None = AI only)
+        self.human_robots = dict(HUMAN_ROBOTS)
+        self.state_publisher = state_publisher # Streams the match to the TV through the API server (None = off)
+        self.navigator = FlowFieldNavigator() if navigation else None # Shared flow fields towards the ball and goals
+        self.vision_bridge = vision_bridge # Robot and ball positions from the overhead camera (None = simulated only)
         self.strategies = {
             "LayeredCapabilities": LayeredCapabilitiesStrategy,
             "DynamicRole": DynamicRoleStrategy,
             "SimpleGoToBall": SimpleGoToBallStrategy,
             "FormationPass": FormationPassingStrategy,
         }
-        self.team_strategies = {
+        self.team_strategies = team_strategies or {
             "A": "DynamicRole",
             "B": "FormationPass"
         }
@@ -376,18 +404,69 @@ class FootballGame:
         self.PITCH_HEIGHT = PITCH_HEIGHT
         self.game_over = False
         self.winning_team = None
+        self.score = {"A": 0, "B": 0} # Goals per team, kept across restarts
         self.paused = False
         self.manual_intervention = False
-        self.font = pygame.font.Font(None, int(24 * SCALE_FACTOR))
-        self.font_action_small = pygame.font.Font(None, int(12 * SCALE_FACTOR))
-        self.font_action = pygame.font.Font(None, int(20 * SCALE_FACTOR))
-        self.font_region_label = pygame.font.Font(None, int(14 * SCALE_FACTOR))
-        self.font_robot_label = pygame.font.Font(None, int(14 * SCALE_FACTOR))
-        self.font_reposition_ball = pygame.font.Font(None, int(24 * SCALE_FACTOR))
-        self.font_ui = pygame.font.Font(None, int(22 * SCALE_FACTOR))
-        self.font_button = pygame.font.Font(None, int(28 * SCALE_FACTOR)) # Font for button text
+        self.team_a_actions = ["None"] * 4 # Now 4 robots per team
+        self.team_b_actions = ["None"] * 4 # Now 4 robots per team
+        if not self.headless:
+            self.font = pygame.font.Font(None, int(24 * SCALE_FACTOR))
+            self.font_action_small = pygame.font.Font(None, int(12 * SCALE_FACTOR))
+            self.font_action = pygame.font.Font(None, int(20 * SCALE_FACTOR))
+            self.font_region_label = pygame.font.Font(None, int(14 * SCALE_FACTOR))
+            self.font_robot_label = pygame.font.Font(None, int(14 * SCALE_FACTOR))
+            self.font_reposition_ball = pygame.font.Font(None, int(24 * SCALE_FACTOR))
+            self.font_ui = pygame.font.Font(None, int(22 * SCALE_FACTOR))
+            self.font_button = pygame.font.Font(None, int(28 * SCALE_FACTOR)) # Font for button text
         self.setup_initial_positions()
 
+    def _init_display(self):
+        pygame.init()
+        pygame.mixer.init() # --- **NEW:** Initialize Pygame mixer for audio ---
+        self.screen = pygame.display.set_mode((PITCH_WIDTH + UI_WIDTH, PITCH_HEIGHT))
+        pygame.display.set_caption("Robot Football")
+        self.clock = pygame.time.Clock()
+
+        self.intro_music_playing = False # Flag to track if intro music is playing
+
+        # --- **NEW:** Load Audio Files ---
+        try:
+            self.intro_sound = pygame.mixer.Sound("intro_music.mp3") # Replace "intro_music.mp3" with your intro music file
+            self.cheering_sound = pygame.mixer.Sound("cheering_audio.mp3") # Replace "cheering_audio.mp3" with your cheering audio file
+            self.goal_sound = pygame.mixer.Sound("goal_scored_audio.mp3") # Replace "goal_scored_audio.mp3" with your goal sound file
+        except pygame.error as e:
+            print(f"Error loading audio files: {e}")
+            self.intro_sound = None
+            self.cheering_sound = None
+            self.goal_sound = None
+
+        # --- **NEW:** Create channels for intro and cheering music ---
+        self.intro_channel = pygame.mixer.Channel(0) # Use channel 0 for intro music
+        self.cheering_channel = pygame.mixer.Channel(1) # Use channel 1 for cheering music
+        self.effects_channel = pygame.mixer.Channel(2) # Channel for goal sound effect
+
+
+        # --- **NEW:** MoviePy Video Setup ---
+        self.intro_clip = None  # Initialize to None
+        self.intro_frame = None
+        self.intro_frame_rect = None
+        self.moviepy_available = moviepy_available # Use the module-level availability flag
+
+        if self.moviepy_available:
+            try:
+                self.intro_clip = mp.VideoFileClip("intro_video.mp4") # Load your video file (replace "intro_video.mp4")
+                self.intro_frame = pygame.image.frombuffer(self.intro_clip.get_frame(0).tobytes(), self.intro_clip.size, 'RGB').convert()
+                self.intro_frame_rect = self.intro_frame.get_rect(center=self.screen.get_rect().center)
+            except Exception as e: # Catch broad exception for video loading issues
+                print(f"Error loading intro_video.mp4 with MoviePy: {e}. Video intro disabled.")
+                self.intro_clip = None # Disable video intro if loading fails
+        else:
+            print("MoviePy not available, video intro disabled.")
+
+        # --- **NEW:** Skip Intro Button Rect and Properties ---
+        self.skip_intro_button_rect = pygame.Rect(PITCH_WIDTH - 220 * SCALE_FACTOR, PITCH_HEIGHT - 60 * SCALE_FACTOR, 200 * SCALE_FACTOR, 40 * SCALE_FACTOR) # Bottom-right
+        self.skip_intro_button_color = (200, 200, 200, 50) # Grey with 50 alpha (translucent)
+
     def _define_pitch_regions(self):
         # ... (_define_pitch_regions method remains the same)
         num_regions_x = 5 # Changed to 5
@@ -535,6 +614,7 @@ class FootballGame:
                     self.cheering_channel.stop()
             self.game_over = True
             self.winning_team = "B"
+            self.score["B"] += 1
             return True
         if self.goal_b.check_collision(self.ball): # Team B Goal (Right side)
             if self.goal_sound: # --- **NEW:** Play goal sound if loaded ---
@@ -543,6 +623,7 @@ class FootballGame:
                     self.cheering_channel.stop()
             self.game_over = True
             self.winning_team = "A"
+            self.score["A"] += 1
             return True
         return False
 
@@ -607,11 +688,87 @@ class FootballGame:
                 closest_robot = robot
         return closest_robot
 
+    def step(self):
+        # One tick of game logic (possession, strategic decisions, ball physics, collisions, goals) - no drawing
+        # Returns True if a goal was scored this tick
+        self.decision_budget.start_tick()
+        if self.vision_bridge:
+            self.vision_bridge.poll(self)
+        if self.navigator:
+            self.navigator.start_tick(self.robots)
+        human_inputs = {}
+        if self.input_bridge:
+            for user_id, controller_input in self.input_bridge.poll().items():
+                if user_id in self.human_robots:
+                    human_inputs[self.human_robots[user_id]] = controller_input
+
+        # --- Possession Tracking ---
+        closest_robot = self.get_closest_robot_to_ball(None) # Get closest robot each frame
+        if closest_robot:
+            if closest_robot.team == "A":
+                self.team_a_possession += DT
+                self.last_team_in_possession = "A"
+            elif closest_robot.team == "B":
+                self.team_b_possession += DT
+                self.last_team_in_possession = "B"
+
+        action_result = None
+        ticks = self.decision_budget.ticks
+        order = sorted(range(len(self.robots)), key=lambda i: (i - ticks) % 4) # Each team's first decider rotates every tick, so a used-up team budget does not always starve the same robots
+        for i in order:
+            robot = self.robots[i]
+            robot_action = "idle"
+            robot_state_desc = "No State" # Initialize state description
+
+            if robot.robot_id in human_inputs: # Driven by a phone - the strategy is skipped
+                action_result = robot.apply_controller_input(human_inputs[robot.robot_id])
+                robot_state_desc = robot.state_description
+            elif robot.dribbling:
+                robot_action = "dribbling"
+                robot_state_desc = "Dribbling" # Basic dribbling state
+            else:
+                action_result = robot.make_strategic_decision() # Get action result dictionary
+                robot_state_desc = robot.state_description # Get description from robot state
+
+            if isinstance(action_result, dict) and action_result and "action" in action_result:
+                if action_result["action"] == "move":
+                    robot_action = "moving"
+                elif action_result["action"] == "shoot":
+                    robot_action = "shooting"
+                elif action_result["action"] == "pass_ball":
+                    robot_action = "passing"
+                elif action_result["action"] == "dribble":
+                    robot_action = "dribbling_strategic"
+                elif action_result["action"] == "idle":
+                    robot_action = "idle_strategic"
+                else:
+                    robot_action = "role positioning" # Default for other role-based actions
+
+
+            if robot.team == "A":
+                self.team_a_actions[i % 4] = f"{robot.role}: {robot_action} ({robot_state_desc})" # Now 4 robots per team, include state description
+            else:
+                self.team_b_actions[i % 4] = f"{robot.role}: {robot_action} ({robot_state_desc})" # Now 4 robots per team, include state description
+        if self.vision_bridge:
+            self.vision_bridge.decided()
+
+        dribbling_robot = None
+        for robot in self.robots:
+            if robot.dribble(self.ball):
+                dribbling_robot = robot
+                break
+
+        if not dribbling_robot:
+            self.ball.move()
+
+        self.handle_collisions()
+
+        return self.check_goal()
+
     def run(self):
         running = True
-        dribbling_robot = None
-        team_a_actions = ["None"] * 4 # Now 4 robots per team
-        team_b_actions = ["None"] * 4 # Now 4 robots per team
+        team_a_actions = self.team_a_actions
+        team_b_actions = self.team_b_actions
         intro_frame_index = 0 # Track frame index for video playback
 
         # Main loop
@@ -689,59 +846,7 @@ class FootballGame:
                 if self.game_over or self.paused:
                     continue
 
-                # --- Possession Tracking ---
-                closest_robot = self.get_closest_robot_to_ball(None) # Get closest robot each frame
-                if closest_robot:
-                    if closest_robot.team == "A":
-                        self.team_a_possession += DT
-                        self.last_team_in_possession = "A"
-                    elif closest_robot.team == "B":
-                        self.team_b_possession += DT
-                        self.last_team_in_possession = "B"
-
-                for i, robot in enumerate(self.robots):
-                    robot_action = "idle"
-                    robot_state_desc = "No State" # Initialize state description
-
-                    if robot.dribbling:
-                        robot_action = "dribbling"
-                        robot_state_desc = "Dribbling" # Basic dribbling state
-                    else:
-                        action_result = robot.make_strategic_decision() # Get action result dictionary
-                        robot_state_desc = robot.state_description # Get description from robot state
-
-                    if isinstance(action_result, dict) and action_result and "action" in action_result:
-                        if action_result["action"] == "move":
-                            robot_action = "moving"
-                        elif action_result["action"] == "shoot":
-                            robot_action = "shooting"
-                        elif action_result["action"] == "pass_ball":
-                            robot_action = "passing"
-                        elif action_result["action"] == "dribble":
-                            robot_action = "dribbling_strategic"
-                        elif action_result["action"] == "idle":
-                            robot_action = "idle_strategic"
-                        else:
-                            robot_action = "role positioning" # Default for other role-based actions
-
-
-                    if robot.team == "A":
-                        team_a_actions[i % 4] = f"{robot.role}: {robot_action} ({robot_state_desc})" # Now 4 robots per team, include state description
-                    else:
-                        team_b_actions[i % 4] = f"{robot.role}: {robot_action} ({robot_state_desc})" # Now 4 robots per team, include state description
-
-                dribbling_robot = None
-                for robot in self.robots:
-                    if robot.dribble(self.ball):
-                        dribbling_robot = robot
-                        break
-
-                if not dribbling_robot:
-                    self.ball.move()
-
-                self.handle_collisions()
-
-                if self.check_goal():
+                if self.step():
                     print(f"Team {self.winning_team} wins!")
                     time.sleep(3)
                     self.current_game_state = self.GAME_STATE_OVER # Change to game over state
@@ -802,6 +907,29 @@ class FootballGame:
                 timer_rect = timer_text.get_rect(bottomright=(PITCH_WIDTH + UI_WIDTH - 10, 485)) # Position in top-right of UI
                 self.screen.blit(timer_text, timer_rect)
 
+                # --- Controller input latency (API server -> applied this tick) ---
+                if self.input_bridge and self.input_bridge.latency_stats():
+                    latency = self.input_bridge.latency_stats()
+                    latency_text = self.font_action_small.render(f"Input latency p50 {latency['p50_ms']:.1f} ms / p99 {latency['p99_ms']:.1f} ms", True, BLACK)
+                    latency_rect = latency_text.get_rect(bottomright=(PITCH_WIDTH + UI_WIDTH - 10, 515))
+                    self.screen.blit(latency_text, latency_rect)
+                    buffers = self.input_bridge.jitter_stats().values()
+                    if buffers: # Jitter buffer: current delay, frames used late, frames dropped (stale, duplicate, overflow)
+                        delay = max(buffer["delay_ms"] for buffer in buffers)
+                        late = sum(buffer["late"] for buffer in buffers)
+                        dropped = sum(buffer["stale"] + buffer["duplicates"] + buffer["overflow"] for buffer in buffers)
+                        buffer_text = self.font_action_small.render(f"Input buffer {delay:.0f} ms / late {late} / dropped {dropped}", True, BLACK)
+                        buffer_rect = buffer_text.get_rect(bottomright=(PITCH_WIDTH + UI_WIDTH - 10, 533))
+                        self.screen.blit(buffer_text, buffer_rect)
+
+                # --- Hardware in the loop (camera frame -> strategies decided) ---
+                if self.vision_bridge and self.vision_bridge.latency_stats():
+                    latency = self.vision_bridge.latency_stats()
+                    pipeline = self.vision_bridge.pipeline_stats()
+                    vision_text = self.font_action_small.render(f"Vision {pipeline['fps']:.0f} fps, frame to decision p50 {latency['p50_ms']:.1f} ms / p99 {latency['p99_ms']:.1f} ms", True, BLACK)
+                    vision_rect = vision_text.get_rect(bottomright=(PITCH_WIDTH + UI_WIDTH - 10, 551))
+                    self.screen.blit(vision_text, vision_rect)
+
                 # --- Possession Bar Graph ---
                 total_possession_time = self.team_a_possession + self.team_b_possession
                 if total_possession_time > 0:
@@ -853,10 +981,27 @@ class FootballGame:
 
 
             pygame.display.flip()
+            if self.state_publisher:
+                self.state_publisher.publish(self)
             self.game_time += DT # Increment game time
             self.clock.tick(60)
 
 
 if __name__ == "__main__":
-    game = FootballGame()
+    import logging
+    import os
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    log = logging.getLogger("football_game")
+    try:
+        input_bridge = InputBridgeReceiver()
+    except OSError as e:
+        log.warning("could not open controller input bridge, phone control disabled: %s", e)
+        input_bridge = None
+    vision_bridge = None
+    if os.environ.get("VISION_SOURCE"): # Hardware in the loop: camera index or video file, e.g. VISION_SOURCE=0
+        from vision_bridge import VisionBridge, parse_corners
+        source = os.environ["VISION_SOURCE"]
+        corners = os.environ.get("VISION_PITCH_CORNERS") # Pitch corners in the image, x,y from top left clockwise
+        vision_bridge = VisionBridge(int(source) if source.isdigit() else source, parse_corners(corners) if corners else None)
+    game = FootballGame(input_bridge=input_bridge, state_publisher=MatchStatePublisher(), vision_bridge=vision_bridge)
     game.run()
\ No newline at end of file
@@ -0,0 +1,78 @@
+# input_bridge.py
+# Receives phone controller input forwarded by the API server (api/controls.py InputBridgeSender) over local UDP.
+#
+# Datagram (little endian, 22 bytes) - the joystick frame from JoyStickController.vue plus two bridge fields:
+#   uint8 type, uint8 user id, uint16 sequence, uint32 client timestamp (ms), int16 x, int16 y, uint8 buttons,
+#   uint8 active (0 = phone disconnected, hand the robot back to the AI), float64 API receive time (time.time())
+# Legacy JSON input has no sequence or timestamp and arrives with both set to 0 - it skips the jitter buffer.
+import socket
+import struct
+import time
+from collections import deque
+from jitter_buffer import BufferedInputs
+
+BRIDGE_HOST = "127.0.0.1"
+BRIDGE_PORT = 8023
+BRIDGE_FRAME = struct.Struct("<BBHIhhBBd")
+AXIS_SCALE = 32767
+LATENCY_SAMPLES = 600 # Rolling window for latency statistics (10 seconds at 60 Hz)
+
+
+class InputBridgeReceiver:
+    def __init__(self, host=BRIDGE_HOST, port=BRIDGE_PORT):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False) # Polled once per tick - never blocks the game loop
+        self.buffered = BufferedInputs() # Jitter buffer per phone - one smoothed input per user per tick
+        self.inputs = {} # user id -> input for this tick
+        self.applied = {} # user id -> sequence of the last frame applied, so held inputs are not sampled twice
+        self.latencies = deque(maxlen=LATENCY_SAMPLES) # API receive -> applied in the simulation, seconds
+        self.frames_received = 0
+
+    def poll(self):
+        # Drain every pending datagram into the jitter buffers and return this tick's input of every active user
+        while True:
+            try:
+                data = self.sock.recv(BRIDGE_FRAME.size)
+            except BlockingIOError:
+                break
+            except OSError:
+                break
+            if len(data) != BRIDGE_FRAME.size:
+                continue
+            _, user_id, seq, timestamp, x, y, buttons, active, sent_at = BRIDGE_FRAME.unpack(data)
+            self.frames_received += 1
+            if not active:
+                self.buffered.remove(user_id)
+                self.applied.pop(user_id, None)
+                continue
+            untimed = timestamp == 0
+            controller_input = {"userid": user_id, "seq": None if untimed else seq, "timestamp": None if untimed else timestamp,
+                                "x": x / AXIS_SCALE, "y": y / AXIS_SCALE, "buttons": buttons}
+            self.buffered.push(controller_input, sent_at)
+
+        now = time.time()
+        self.inputs = self.buffered.poll(now)
+        for user_id, controller_input in self.inputs.items():
+            if controller_input["seq"] is None or self.applied.get(user_id) != controller_input["seq"]:
+                self.applied[user_id] = controller_input["seq"]
+                self.latencies.append(now - controller_input["sent_at"])
+        return self.inputs
+
+    def jitter_stats(self):
+        return self.buffered.stats()
+
+    def latency_stats(self):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return {
+            "p50_ms": ordered[len(ordered) // 2] * 1000,
+            "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+            "max_ms": ordered[-1] * 1000,
+            "samples": len(ordered),
+        }
+
+    def close(self):
+        self.sock.close()
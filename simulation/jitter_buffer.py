@@ -0,0 +1,199 @@
+# jitter_buffer.py
+# Per-controller jitter buffer between the phone's joystick stream and the simulation tick.
+#
+# Wi-Fi delivers joystick frames in bursts. Applying each burst on arrival makes robots jerk, so every frame is instead
+# scheduled for a playout time and the tick samples the stream at that time:
+#   playout = client timestamp + clock offset + delay
+# - The clock offset is the smallest (arrival - client timestamp) seen recently, i.e. the transit of the least delayed
+#   frame. Everything slower than that is jitter.
+# - The jitter is estimated like RFC 3550 (a running mean of how much consecutive transits differ). The delay is one
+#   frame interval (interpolation needs the frame after the playout time) plus JITTER_FACTOR times the jitter, clamped
+#   to MIN_DELAY_MS..MAX_DELAY_MS. It moves by at most DELAY_SLEW_MS per tick, so playback never jumps or runs
+#   backwards.
+#
+# Frames are kept in sequence order. Duplicates, and frames older than one already played, are dropped. A frame that
+# arrives after its playout time but before anything newer was played is still used and counted as late. Each tick
+# releases exactly one input: the stick is interpolated between the frames either side of the playout time, and the
+# buttons include every press of the frames consumed that tick, so a tap shorter than a tick still shoots.
+#
+# Frames without a sequence or timestamp (the legacy JSON protocol) skip the buffer - newest wins, as before.
+from collections import deque
+
+SEQUENCE_MODULO = 1 << 16
+TIMESTAMP_MODULO = 1 << 32 # Client timestamps are uint32 milliseconds
+JITTER_FACTOR = 3.0 # Delay in multiples of the jitter estimate - covers almost all of a roughly normal spread
+MIN_DELAY_MS = 5.0
+MAX_DELAY_MS = 120.0 # Past this the lag hurts more than the jerk
+DELAY_SLEW_MS = 1.0 # Largest change of the delay per tick
+OFFSET_WINDOW = 120 # Frames (2 seconds at 60 Hz) the clock offset is taken over, so clock drift is followed
+BUFFER_LIMIT = 64 # Frames held per controller - the oldest is dropped beyond this
+FRAME_INTERVAL_MS = 1000 / 60 # Starting guess for the phone's send interval, measured from then on
+STREAM_IDLE = 0.25 # Seconds without frames after which the phone counts as idle rather than underrunning
+INTERVAL_GAP_FACTOR = 4 # Gaps longer than this many intervals are pauses in the stream, not its send interval...
+INTERVAL_ADAPT_GAPS = 4 # ...unless this many come in a row - then the phone really sends that slowly
+
+
+def _unwrap(value, reference, modulo):
+    # Extend a wrapping counter to the value nearest the reference
+    step = (value - reference) % modulo
+    if step >= modulo // 2:
+        step -= modulo
+    return reference + step
+
+
+class JitterBuffer:
+    """Playout buffer for one controller: push() frames as they arrive, release() once per tick."""
+
+    def __init__(self, min_delay_ms=MIN_DELAY_MS, max_delay_ms=MAX_DELAY_MS):
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.frames = [] # (sequence, client ms, input, arrival s), unwrapped sequence order
+        self.last_sequence = None
+        self.last_timestamp = None
+        self.transits = deque(maxlen=OFFSET_WINDOW) # Arrival - client timestamp, ms
+        self.last_transit = None
+        self.jitter_ms = 0.0
+        self.interval_ms = FRAME_INTERVAL_MS
+        self.long_gaps = 0 # Consecutive gaps over INTERVAL_GAP_FACTOR intervals (but short of STREAM_IDLE)
+        self.delay_ms = FRAME_INTERVAL_MS
+        self.last_arrival = None
+        self.current = None # Frame played last tick (the left side of the interpolation)
+        self.passthrough = None # Newest legacy input
+        self.received = 0
+        self.released = 0
+        self.duplicates = 0
+        self.stale = 0 # Arrived after a newer frame had been played - dropped
+        self.late = 0 # Arrived after its playout time but still used
+        self.overflow = 0
+        self.underruns = 0 # Ticks of a live stream with nothing newer to move towards - the last input is held
+
+    def push(self, controller_input, arrival):
+        # arrival is when the API received the frame (time.time(), same clock as release())
+        self.received += 1
+        seq = controller_input.get("seq")
+        timestamp = controller_input.get("timestamp")
+        if seq is None or timestamp is None:
+            self.passthrough = dict(controller_input, sent_at=arrival)
+            return
+        self.passthrough = None
+        if self.last_sequence is None:
+            self.last_sequence, self.last_timestamp = seq, timestamp
+        seq = _unwrap(seq, self.last_sequence, SEQUENCE_MODULO)
+        timestamp = _unwrap(timestamp, self.last_timestamp, TIMESTAMP_MODULO)
+        if seq == self.last_sequence + 1:
+            gap = max(0, timestamp - self.last_timestamp)
+            if gap <= min(INTERVAL_GAP_FACTOR * self.interval_ms, STREAM_IDLE * 1000): # An idle stick would inflate the delay
+                self.interval_ms += (gap - self.interval_ms) / 16
+                self.long_gaps = 0
+            elif gap <= STREAM_IDLE * 1000:
+                self.long_gaps += 1
+                if self.long_gaps >= INTERVAL_ADAPT_GAPS: # A steady slower rate, not a pause - take it as the interval
+                    self.interval_ms = gap
+                    self.long_gaps = 0
+        if seq > self.last_sequence:
+            self.last_sequence, self.last_timestamp = seq, timestamp
+        self.last_arrival = arrival
+
+        if self.current is not None and seq <= self.current[0]:
+            if seq == self.current[0]:
+                self.duplicates += 1
+            else:
+                self.stale += 1
+            return
+        index = len(self.frames)
+        while index > 0 and self.frames[index - 1][0] >= seq: # Frames almost always arrive in order
+            if self.frames[index - 1][0] == seq:
+                self.duplicates += 1
+                return
+            index -= 1
+        self.frames.insert(index, (seq, timestamp, controller_input, arrival))
+        if len(self.frames) > BUFFER_LIMIT:
+            self.frames.pop(0)
+            self.overflow += 1
+
+        transit = arrival * 1000 - timestamp
+        if self.last_transit is not None:
+            self.jitter_ms += (abs(transit - self.last_transit) - self.jitter_ms) / 16
+        self.last_transit = transit
+        self.transits.append(transit)
+        if arrival * 1000 > timestamp + min(self.transits) + self.delay_ms:
+            self.late += 1
+
+    def release(self, now):
+        # One input for this tick, or None before the controller has sent anything
+        if self.passthrough is not None:
+            return self.passthrough
+        if not self.frames and self.current is None:
+            return None
+        target = min(self.max_delay_ms, max(self.min_delay_ms, self.interval_ms + JITTER_FACTOR * self.jitter_ms))
+        self.delay_ms += max(-DELAY_SLEW_MS, min(DELAY_SLEW_MS, target - self.delay_ms))
+        playout = now * 1000 - min(self.transits) - self.delay_ms # On the client's clock
+
+        taps = 0
+        while self.frames and self.frames[0][1] <= playout:
+            self.current = self.frames.pop(0)
+            taps |= self.current[2]["buttons"]
+        if self.current is None: # Still buffering the first frames
+            return None
+        self.released += 1
+        seq, timestamp, previous, arrival = self.current
+        x, y = previous["x"], previous["y"]
+        if self.frames:
+            next_timestamp, upcoming = self.frames[0][1], self.frames[0][2]
+            if next_timestamp > timestamp:
+                fraction = min(1.0, max(0.0, (playout - timestamp) / (next_timestamp - timestamp)))
+                x += (upcoming["x"] - x) * fraction
+                y += (upcoming["y"] - y) * fraction
+        elif now - self.last_arrival < STREAM_IDLE:
+            self.underruns += 1
+        smoothed = dict(previous)
+        smoothed["x"] = x
+        smoothed["y"] = y
+        smoothed["buttons"] = previous["buttons"] | taps
+        smoothed["sent_at"] = arrival
+        return smoothed
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "released": self.released,
+            "depth": len(self.frames),
+            "delay_ms": round(self.delay_ms, 1),
+            "jitter_ms": round(self.jitter_ms, 1),
+            "interval_ms": round(self.interval_ms, 1),
+            "late": self.late,
+            "stale": self.stale,
+            "duplicates": self.duplicates,
+            "overflow": self.overflow,
+            "underruns": self.underruns,
+        }
+
+
+class BufferedInputs:
+    """A jitter buffer per user. poll() is called once per tick and returns one input per active user."""
+
+    def __init__(self, min_delay_ms=MIN_DELAY_MS, max_delay_ms=MAX_DELAY_MS):
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.buffers = {}
+
+    def push(self, controller_input, arrival):
+        buffer = self.buffers.get(controller_input["userid"])
+        if buffer is None:
+            buffer = self.buffers[controller_input["userid"]] = JitterBuffer(self.min_delay_ms, self.max_delay_ms)
+        buffer.push(controller_input, arrival)
+
+    def remove(self, user_id):
+        # Phone disconnected - its robot goes back to the AI and a reconnect starts a fresh stream
+        self.buffers.pop(user_id, None)
+
+    def poll(self, now):
+        inputs = {}
+        for user_id, buffer in self.buffers.items():
+            controller_input = buffer.release(now)
+            if controller_input is not None:
+                inputs[user_id] = controller_input
+        return inputs
+
+    def stats(self):
+        return {user_id: buffer.stats() for user_id, buffer in self.buffers.items()}
@@ -0,0 +1,219 @@
+# navigation.py
+# Shared flow-field navigation on a coarse pitch grid, so robots heading for the ball or a goal go around other robots
+# instead of pushing through them and leaving handle_collisions to pull them apart.
+#
+# Every robot blocks the cells whose centre is within two robot radii of the centre of the robot's cell, i.e. roughly
+# where another robot's centre could not be. start_tick() keeps a count per cell of the robots blocking it and only
+# touches the footprints of robots that moved to another cell. A flow field for a target is the 8-connected
+# breadth-first distance, in cells, from the target's cell through the free cells. Blocked cells get a distance (so a
+# robot standing in a footprint gets a way out) but are never searched through.
+#
+# Fields are keyed by the target's cell, so everyone heading for the ball - or for the same goal, from either team -
+# shares one field, and one is only needed when someone is in the way: heading() first walks the straight line to the
+# target and, if no other robot blocks it, returns the strategy's angle as is. Otherwise it looks at the robot's eight
+# neighbour cells and steps to the one nearest the target that no *other* robot blocks (the robot's own footprint does
+# not count against it); if the neighbour straight towards the target is among the nearest, the straight-line angle
+# is kept. The next VALIDATE_HOPS steps are checked against this tick's blocked cells on every lookup, and a field is
+# rebuilt only when they are blocked, when the robot is outside the area it was searched over, or once it is
+# FIELD_MAX_AGE ticks old (cells that came free since may open a shorter way). Close to the target, or when it cannot
+# be reached (e.g. walled in by a scrum), the straight-line angle is used too.
+#
+# Known limitation: fields are not rebuilt every tick, and a lookup is not O(1). A full field over the 25x17 grid is a
+# ~0.25 ms BFS in Python, about twice a whole headless tick, so a field per target per tick (ball and both goals) would
+# cut headless ticks/sec several times over. heading() instead walks the straight line (up to ~60 half-cell samples) and a few
+# field hops per lookup. Even so the ball changes cell almost every tick in a scrum, the rebuilds cost about 40% of
+# ticks/sec there, and navigation is off by default (FLOW_FIELD_NAVIGATION); with it off none of this code runs.
+import math
+
+from constants_and_util import NAVIGATION_CELL, PITCH_HEIGHT, PITCH_WIDTH, ROBOT_RADIUS
+
+BLOCKING_RADIUS = 2 * ROBOT_RADIUS
+DIRECT_DISTANCE = 1.5 * NAVIGATION_CELL # Closer than this the robot heads straight for the target
+MAX_FIELDS = 16 # Cached fields - the ball wanders through many cells while the robots stand still
+FIELD_MAX_AGE = 20 # Ticks a field is used for before it is rebuilt anyway
+VALIDATE_HOPS = 3 # Steps of the way ahead checked against this tick's blocked cells on every lookup
+
+
+class FlowFieldNavigator:
+    def __init__(self, cell_size=NAVIGATION_CELL, width=PITCH_WIDTH, height=PITCH_HEIGHT):
+        self.cell_size = cell_size
+        self.cols = math.ceil(width / cell_size)
+        self.rows = math.ceil(height / cell_size)
+        size = self.cols * self.rows
+        self.centres = [((i % self.cols + 0.5) * cell_size, (i // self.cols + 0.5) * cell_size) for i in range(size)]
+        self.neighbours = []
+        for i in range(size):
+            col, row = i % self.cols, i // self.cols
+            cells = []
+            for dcol, drow in ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)):
+                if 0 <= col + dcol < self.cols and 0 <= row + drow < self.rows:
+                    cells.append((row + drow) * self.cols + col + dcol)
+            self.neighbours.append(cells)
+        self.footprints = [] # Cells a robot in each cell blocks
+        for centre_x, centre_y in self.centres:
+            self.footprints.append([
+                i for i in self.cell_range(centre_x, centre_y, BLOCKING_RADIUS)
+                if (self.centres[i][0] - centre_x) ** 2 + (self.centres[i][1] - centre_y) ** 2 <= BLOCKING_RADIUS ** 2
+            ])
+        self.unreached = [-1] * size
+        self.queue = [0] * size # BFS queue, reused by every build
+        self.blocked = [0] * size # Robots blocking each cell
+        self.occupied = [0] * size # Robots in each cell
+        self.occupied_cells = 0 # Cells with a robot in them
+        self.robot_cells = [] # Cell of each robot at the last start_tick
+        self.tick = 0
+        self.fields = {} # target cell -> distance to it per cell (-1 = unreachable)
+        self.built_at = {} # target cell -> tick its field was built
+        self.spare = [] # Lists of dropped fields, refilled by _build
+        self.built = 0 # Fields computed, for benchmarks and tests
+        self.lookups = 0
+
+    def cell(self, x, y):
+        col = min(self.cols - 1, max(0, int(x // self.cell_size)))
+        row = min(self.rows - 1, max(0, int(y // self.cell_size)))
+        return row * self.cols + col
+
+    def cell_range(self, x, y, radius):
+        col_from, col_to = max(0, int((x - radius) // self.cell_size)), min(self.cols - 1, int((x + radius) // self.cell_size))
+        row_from, row_to = max(0, int((y - radius) // self.cell_size)), min(self.rows - 1, int((y + radius) // self.cell_size))
+        return [row * self.cols + col for row in range(row_from, row_to + 1) for col in range(col_from, col_to + 1)]
+
+    def start_tick(self, robots):
+        self.tick += 1
+        robot_cells = self.robot_cells
+        if len(robot_cells) != len(robots): # First tick, or robots were added
+            for cell in robot_cells:
+                self._place(cell, -1)
+            robot_cells[:] = [-1] * len(robots)
+        for index, robot in enumerate(robots):
+            cell = self.cell(robot.x, robot.y)
+            previous = robot_cells[index]
+            if cell != previous:
+                if previous >= 0:
+                    self._place(previous, -1)
+                self._place(cell, 1)
+                robot_cells[index] = cell
+
+    def _place(self, cell, count):
+        # Adds (count=1) or removes (count=-1) a robot in cell
+        blocked = self.blocked
+        for i in self.footprints[cell]:
+            blocked[i] += count
+        self.occupied[cell] += count
+        if self.occupied[cell] == (1 if count > 0 else 0):
+            self.occupied_cells += count
+
+    def field(self, target_cell):
+        distances = self.fields.get(target_cell)
+        if distances is None:
+            if len(self.fields) >= MAX_FIELDS:
+                self.spare.extend(self.fields.values())
+                self.fields.clear()
+                self.built_at.clear()
+            distances = self.fields[target_cell] = self.spare.pop() if self.spare else []
+            self._build(target_cell, distances)
+        elif self.tick - self.built_at[target_cell] >= FIELD_MAX_AGE:
+            self._build(target_cell, distances)
+        return distances
+
+    def _build(self, target_cell, distances):
+        self.built += 1
+        self.built_at[target_cell] = self.tick
+        distances[:] = self.unreached
+        distances[target_cell] = 0
+        blocked, occupied, neighbours, queue = self.blocked, self.occupied, self.neighbours, self.queue
+        queue[0] = target_cell
+        head, tail = 0, 1
+        # Only as far as the robots: stops once every robot's cell and its neighbours have a distance. A robot that
+        # later moves beyond that finds its cell unreached and has the field rebuilt.
+        unreached_robots = self.occupied_cells - (1 if occupied[target_cell] else 0)
+        limit = len(queue) if unreached_robots else 0
+        while head < tail:
+            cell = queue[head]
+            head += 1
+            following = distances[cell] + 1
+            if following > limit + 1:
+                break
+            for neighbour in neighbours[cell]:
+                if distances[neighbour] < 0:
+                    distances[neighbour] = following
+                    if occupied[neighbour]:
+                        unreached_robots -= 1
+                        if not unreached_robots:
+                            limit = following
+                    if not blocked[neighbour]:
+                        queue[tail] = neighbour
+                        tail += 1
+
+    def _clear(self, distances, own_footprint, cell):
+        # Whether the way ahead from cell is still free: VALIDATE_HOPS steps down the field through unblocked cells
+        blocked, neighbours = self.blocked, self.neighbours
+        for _ in range(VALIDATE_HOPS):
+            nearer = distances[cell] - 1
+            if nearer < 0: # At the target
+                return True
+            for neighbour in neighbours[cell]:
+                if distances[neighbour] == nearer and (not blocked[neighbour] or (blocked[neighbour] == 1 and neighbour in own_footprint)):
+                    cell = neighbour
+                    break
+            else:
+                return False
+        return True
+
+    def _next_cell(self, distances, own_cell, own_footprint):
+        # Nearest-to-target neighbour no other robot blocks, or -1
+        blocked = self.blocked
+        best, best_distance = -1, -1
+        for neighbour in self.neighbours[own_cell]:
+            distance = distances[neighbour]
+            if distance < 0 or (best >= 0 and distance >= best_distance):
+                continue
+            if blocked[neighbour] and not (blocked[neighbour] == 1 and neighbour in own_footprint):
+                continue
+            best, best_distance = neighbour, distance
+        return best, best_distance
+
+    def _line_clear(self, x, y, target_x, target_y, own_footprint, target_cell):
+        # Whether the straight line to the target crosses no cell another robot blocks, sampled every half cell. The
+        # last BLOCKING_RADIUS is not checked: a robot on the target (e.g. on the ball) cannot be gone around.
+        blocked, size = self.blocked, self.cell_size
+        length = math.hypot(target_x - x, target_y - y)
+        step_x, step_y = (target_x - x) / length * size / 2, (target_y - y) / length * size / 2
+        for _ in range(int((length - BLOCKING_RADIUS) / (size / 2))):
+            x += step_x
+            y += step_y
+            cell = self.cell(x, y) # Clamped - a robot pushed off the pitch must not wrap to the far side of the grid
+            if cell == target_cell:
+                return True
+            if blocked[cell] and not (blocked[cell] == 1 and cell in own_footprint):
+                return False
+        return True
+
+    def heading(self, robot, target_x, target_y, direct_angle):
+        # Angle to move at to reach (target_x, target_y) around the other robots
+        self.lookups += 1
+        if (target_x - robot.x) ** 2 + (target_y - robot.y) ** 2 < DIRECT_DISTANCE ** 2:
+            return direct_angle
+        target_cell = self.cell(target_x, target_y)
+        own_cell = self.cell(robot.x, robot.y)
+        if own_cell == target_cell:
+            return direct_angle
+        own_footprint = self.footprints[own_cell]
+        if self._line_clear(robot.x, robot.y, target_x, target_y, own_footprint, target_cell):
+            return direct_angle # Nothing in the way - no field needed
+        distances = self.field(target_cell)
+        next_cell, next_distance = self._next_cell(distances, own_cell, own_footprint)
+        if self.built_at[target_cell] != self.tick and (distances[own_cell] < 0 or (next_cell >= 0 and not self._clear(distances, own_footprint, next_cell))):
+            self._build(target_cell, distances) # The robot left the searched area, or someone moved into its way
+            next_cell, next_distance = self._next_cell(distances, own_cell, own_footprint)
+        if next_cell < 0 or next_distance == 0:
+            return direct_angle
+        # The neighbour straight towards the target: if it is as near as the best one, nothing is in the way
+        straight_col = own_cell % self.cols + round(math.cos(direct_angle))
+        straight_row = own_cell // self.cols + round(math.sin(direct_angle))
+        if 0 <= straight_col < self.cols and 0 <= straight_row < self.rows:
+            straight = straight_row * self.cols + straight_col
+            if distances[straight] == next_distance and (not self.blocked[straight] or (self.blocked[straight] == 1 and straight in own_footprint)):
+                return direct_angle
+        next_x, next_y = self.centres[next_cell]
+        return math.atan2(next_y - robot.y, next_x - robot.x)
@@ -0,0 +1,55 @@
+# state_publisher.py
+# Sends a snapshot of the match to the API server every frame over local UDP; the server streams it to the TV
+# (/ws/tv/game, see api/match_stream.py).
+#
+# Datagram (little endian) - must match SNAPSHOT in api/match_stream.py:
+#   uint32 sequence, uint8 game state, float32 ball x, ball y,
+#   8 x (float32 x, y, angle) in robot order A1..A4, B1..B4,
+#   uint8 score A, score B, float32 elapsed seconds, float32 team A possession (0..1)
+import socket
+import struct
+import time
+
+STATE_HOST = "127.0.0.1"
+STATE_PORT = 8024
+NUM_ROBOTS = 8
+SNAPSHOT = struct.Struct("<IBff" + "fff" * NUM_ROBOTS + "BBff")
+
+
+def match_snapshot(game, sequence):
+    # The SNAPSHOT fields as a tuple - also used directly by the simulation running inside the API (api/simulation.py)
+    robot_values = []
+    for robot in game.robots:
+        robot_values.extend((robot.x, robot.y, robot.angle))
+    total_possession = game.team_a_possession + game.team_b_possession
+    possession_a = game.team_a_possession / total_possession if total_possession > 0 else 0.5
+    return (
+        sequence & 0xFFFFFFFF,
+        game.current_game_state,
+        game.ball.x,
+        game.ball.y,
+        *robot_values,
+        game.score["A"],
+        game.score["B"],
+        time.time() - game.game_start_time,
+        possession_a,
+    )
+
+
+class MatchStatePublisher:
+    def __init__(self, host=STATE_HOST, port=STATE_PORT):
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sequence = 0
+
+    def publish(self, game):
+        self.sequence += 1
+        datagram = SNAPSHOT.pack(*match_snapshot(game, self.sequence))
+        try:
+            self.sock.sendto(datagram, self.address)
+        except OSError: # Nothing listening or buffer full - the next frame replaces this one
+            pass
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,212 @@
+# vision_bridge.py
+# Hardware in the loop: the overhead camera (or a recording of it) says where the robots and the ball are, and the
+# strategies run against those positions instead of the simulation's own.
+#
+# FootballGame.step() calls poll(game) at the start of every tick. Live (realtime=True) it takes the newest frame from
+# a CameraCapture thread (scripts/camera_capture.py), so frames that arrive while a tick runs are dropped rather than
+# queued; with realtime=False - recorded footage, for tests and benchmarks - it reads the next frame, so every frame is
+# one tick. The frame is searched for the robots' ArUco markers (scripts/marker_tracker.py, ids in ROBOT_MARKERS) and
+# for the orange ball (a colour threshold on a downscaled copy). Their pixel positions are mapped onto the pitch with
+# the perspective transform from the pitch's four corners in the image (default: the frame's corners). Robots and the
+# ball in view are moved there, with velocities from their last sighting; anything out of view carries on simulated.
+#
+# Once the strategies have decided, step() calls decided(), which records how old the frame is: the frame-to-decision
+# latency. Live that runs from the grab; for recordings it runs from the decoded frame. latency_stats() has its
+# percentiles and pipeline_stats() the frames processed per second and the time per stage.
+import math
+import os
+import sys
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from constants_and_util import DT, PITCH_HEIGHT, PITCH_WIDTH
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from camera_capture import CameraCapture
+from marker_tracker import MarkerTracker
+
+ROBOT_MARKERS = {"A1": 0, "A2": 1, "A3": 2, "A4": 3, "B1": 4, "B2": 5, "B3": 6, "B4": 7} # ArUco id on top of each robot
+MARKER_DICTIONARY = cv2.aruco.DICT_4X4_50
+BALL_HSV_LOW = (5, 150, 150) # Orange
+BALL_HSV_HIGH = (20, 255, 255)
+BALL_SCALE = 0.5 # The ball is looked for in a copy of the frame scaled by this
+BALL_MIN_PIXELS = 4 # Smallest blob (in the scaled copy) taken for the ball
+LATENCY_SAMPLES = 600 # Rolling window for latency and stage statistics
+STAGES = ("read", "markers", "ball", "apply")
+
+
+def parse_corners(text):
+    # "x,y,x,y,x,y,x,y" (top left, top right, bottom right, bottom left of the pitch in the image) -> 4 (x, y) pairs
+    values = [float(value) for value in text.split(",")]
+    if len(values) != 8:
+        raise ValueError(f"expected 8 numbers for the pitch corners, got {len(values)}")
+    return tuple(zip(values[0::2], values[1::2]))
+
+
+class VisionBridge:
+    def __init__(self, source, pitch_corners=None, realtime=True, rotation=None):
+        self.realtime = realtime
+        self.rotation = rotation
+        if realtime:
+            self.capture = CameraCapture(source, rotation)
+        else:
+            self.capture = cv2.VideoCapture(source)
+            if not self.capture.isOpened():
+                raise OSError(f"could not open video source {source!r}")
+        detector = cv2.aruco.ArucoDetector(cv2.aruco.getPredefinedDictionary(MARKER_DICTIONARY), cv2.aruco.DetectorParameters())
+        self.tracker = MarkerTracker(detector, ROBOT_MARKERS.values())
+        self.robot_ids = {marker_id: robot_id for robot_id, marker_id in ROBOT_MARKERS.items()}
+        self.pitch_corners = pitch_corners
+        self.shape = None
+        self.transform = None # Image pixels -> pitch coordinates
+        self.frame = None # Buffers reused every frame
+        self.small = None
+        self.hsv = None
+        self.mask = None
+        self.running = True # False once the camera stops or the recording ends
+        self.ticks = 0
+        self.last_seen = {} # robot id or "ball" -> (x, y, tick) of its last sighting, for velocities
+        self.poses = {} # Positions from the latest frame: robot id -> (x, y, angle), "ball" -> (x, y)
+        self.captured_at = None # Of the frame this tick's positions came from, until decided()
+        self.frames = 0
+        self.first_frame_at = None
+        self.last_frame_at = None
+        self.latencies = deque(maxlen=LATENCY_SAMPLES) # Frame captured -> strategies decided, seconds
+        self.timings = {stage: deque(maxlen=LATENCY_SAMPLES) for stage in STAGES}
+
+    def read(self):
+        # Returns (frame, captured_at) or (None, None) when there is no new frame
+        if self.realtime:
+            ret, frame, captured_at = self.capture.read(timeout=0)
+            if not ret:
+                self.running = self.capture.running
+                return None, None
+            return frame, captured_at
+        ret, self.frame = self.capture.read(self.frame)
+        if not ret:
+            self.running = False
+            return None, None
+        captured_at = time.monotonic()
+        if self.rotation is not None:
+            return cv2.rotate(self.frame, self.rotation), captured_at
+        return self.frame, captured_at
+
+    def build_transform(self, shape):
+        height, width = shape[:2]
+        corners = self.pitch_corners or ((0, 0), (width, 0), (width, height), (0, height))
+        pitch = ((0, 0), (PITCH_WIDTH, 0), (PITCH_WIDTH, PITCH_HEIGHT), (0, PITCH_HEIGHT))
+        self.transform = cv2.getPerspectiveTransform(np.float32(corners), np.float32(pitch))
+        self.shape = shape
+
+    def find_ball(self, frame):
+        # Centre in image pixels of the orange blob, or None
+        height, width = int(frame.shape[0] * BALL_SCALE), int(frame.shape[1] * BALL_SCALE)
+        if self.small is None or self.small.shape[:2] != (height, width):
+            self.small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            self.hsv = cv2.cvtColor(self.small, cv2.COLOR_BGR2HSV)
+            self.mask = cv2.inRange(self.hsv, BALL_HSV_LOW, BALL_HSV_HIGH)
+        else:
+            cv2.resize(frame, (width, height), dst=self.small, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self.small, cv2.COLOR_BGR2HSV, dst=self.hsv)
+            cv2.inRange(self.hsv, BALL_HSV_LOW, BALL_HSV_HIGH, dst=self.mask)
+        moments = cv2.moments(self.mask, binaryImage=True)
+        if moments["m00"] < BALL_MIN_PIXELS:
+            return None
+        return moments["m10"] / moments["m00"] / BALL_SCALE, moments["m01"] / moments["m00"] / BALL_SCALE
+
+    def poll(self, game):
+        # Moves the robots and the ball in view to where the newest frame shows them. Returns False without a new frame.
+        self.ticks += 1
+        started = time.perf_counter()
+        frame, captured_at = self.read()
+        if frame is None:
+            return False
+        if self.shape != frame.shape:
+            self.build_transform(frame.shape)
+        started = self._lap("read", started)
+        corners, ids = self.tracker.detect(frame)
+        started = self._lap("markers", started)
+        ball = self.find_ball(frame)
+        started = self._lap("ball", started)
+
+        # Every point onto the pitch in one call: 4 corners per marker, then the ball
+        points = [np.reshape(corner, (4, 2)) for corner in corners]
+        if ball is not None:
+            points.append(np.float32([ball]))
+        self.poses = {}
+        if points:
+            pitch_points = cv2.perspectiveTransform(np.concatenate(points).reshape(-1, 1, 2).astype(np.float32), self.transform).reshape(-1, 2)
+            marker_ids = np.ravel(ids) if ids is not None else ()
+            for i, marker_id in enumerate(marker_ids):
+                top_left, top_right = pitch_points[4 * i], pitch_points[4 * i + 1]
+                centre = pitch_points[4 * i:4 * i + 4].mean(axis=0)
+                angle = math.atan2(top_right[1] - top_left[1], top_right[0] - top_left[0])
+                self.poses[self.robot_ids[int(marker_id)]] = (float(centre[0]), float(centre[1]), angle)
+            if ball is not None:
+                self.poses["ball"] = (float(pitch_points[-1][0]), float(pitch_points[-1][1]))
+
+        for robot in game.robots:
+            pose = self.poses.get(robot.robot_id)
+            if pose is not None:
+                robot.vx, robot.vy = self._velocity(robot.robot_id, pose[0], pose[1], 1) # Per tick, as Robot.move sets it
+                robot.x, robot.y, robot.angle = pose
+        if ball is not None:
+            game.ball.vx, game.ball.vy = self._velocity("ball", *self.poses["ball"], 1 / DT) # Per second, as Ball.move uses it
+            game.ball.x, game.ball.y = self.poses["ball"]
+        self._lap("apply", started)
+
+        self.captured_at = captured_at
+        self.frames += 1
+        self.last_frame_at = time.monotonic()
+        if self.first_frame_at is None:
+            self.first_frame_at = self.last_frame_at
+        return True
+
+    def _velocity(self, key, x, y, scale):
+        last = self.last_seen.get(key)
+        self.last_seen[key] = (x, y, self.ticks)
+        if last is None:
+            return 0, 0
+        ticks = self.ticks - last[2]
+        return (x - last[0]) / ticks * scale, (y - last[1]) / ticks * scale
+
+    def _lap(self, stage, started):
+        now = time.perf_counter()
+        self.timings[stage].append(now - started)
+        return now
+
+    def decided(self):
+        # Called once the strategies have run on this tick's positions
+        if self.captured_at is not None:
+            self.latencies.append(time.monotonic() - self.captured_at)
+            self.captured_at = None
+
+    def latency_stats(self):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return {
+            "p50_ms": ordered[len(ordered) // 2] * 1000,
+            "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+            "max_ms": ordered[-1] * 1000,
+            "samples": len(ordered),
+        }
+
+    def pipeline_stats(self):
+        elapsed = (self.last_frame_at - self.first_frame_at) if self.frames > 1 else 0
+        stats = {
+            "frames": self.frames,
+            "fps": (self.frames - 1) / elapsed if elapsed > 0 else 0.0,
+            "stage_ms": {stage: 1000 * sum(samples) / len(samples) for stage, samples in self.timings.items() if samples},
+            "robots_in_view": sum(1 for key in self.poses if key != "ball"),
+            "ball_in_view": "ball" in self.poses,
+        }
+        if self.realtime:
+            stats.update(self.capture.stats()) # captured / delivered / dropped by the capture thread
+        return stats
+
+    def close(self):
+        self.capture.release() # CameraCapture and cv2.VideoCapture both
@@ -0,0 +1,8 @@
+# The simulation and the robot scripts import their neighbours as top-level modules, like when they are run directly
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "simulation"), os.path.join(ROOT, "scripts")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
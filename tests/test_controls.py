@@ -0,0 +1,92 @@
+import math
+
+import pytest
+
+from api.controls import (
+    JOYSTICK_FRAME,
+    LatestInputs,
+    decode_joystick_frame,
+    decode_text_frame,
+    encode_joystick_frame,
+    is_newer,
+    mask_to_buttons,
+    parse_axis,
+    parse_text_message,
+)
+
+
+def test_binary_frame_round_trip():
+    frame = encode_joystick_frame(3, 70000, 2**32 + 5, 0.5, -1.5, 0b0101)
+    decoded = decode_joystick_frame(frame)
+    assert decoded["userid"] == 3
+    assert decoded["seq"] == 70000 % 65536
+    assert decoded["timestamp"] == 5
+    assert decoded["x"] == pytest.approx(0.5, abs=1e-4)
+    assert decoded["y"] == -1.0 # Clamped to the stick's range
+    assert mask_to_buttons(decoded["buttons"]) == ["A", "X"]
+
+
+@pytest.mark.parametrize("frame", [b"", bytes(JOYSTICK_FRAME.size - 1), bytes([9]) + bytes(JOYSTICK_FRAME.size - 1)])
+def test_binary_frame_rejects_bad_size_and_type(frame):
+    with pytest.raises(ValueError):
+        decode_joystick_frame(frame)
+
+
+@pytest.mark.parametrize("text", ["[1, 2]", "3", '"joystick"', "null"])
+def test_text_frame_must_be_an_object(text):
+    with pytest.raises(ValueError):
+        decode_text_frame(text)
+
+
+def test_parse_axis_clamps():
+    assert parse_axis("x: 0.25") == 0.25
+    assert parse_axis("x: 7") == 1.0
+    assert parse_axis(" y: -3.5") == -1.0
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "NaN"])
+def test_parse_axis_rejects_non_finite(value):
+    with pytest.raises(ValueError):
+        parse_axis(f"x: {value}")
+
+
+def test_text_joystick_merges_into_previous_input():
+    inputs = LatestInputs()
+    buttons = parse_text_message({"type": "buttons", "userid": 1, "buttons": ["B", "Z"]}, inputs)
+    inputs.update(buttons)
+    moved = parse_text_message({"type": "joystick", "userid": 1, "joystick": "x: 0.1, y: -0.4"}, inputs)
+    assert (moved["x"], moved["y"]) == (0.1, -0.4)
+    assert mask_to_buttons(moved["buttons"]) == ["B"]
+    idle = parse_text_message({"type": "joystick", "userid": 1, "joystick": "Idle"}, inputs)
+    assert (idle["x"], idle["y"]) == (0.0, 0.0)
+
+
+@pytest.mark.parametrize("message", [
+    {"type": "joystick", "userid": 1, "joystick": "x: nan, y: 0"},
+    {"type": "joystick", "userid": 1, "joystick": 5},
+    {"type": "joystick", "userid": "1", "joystick": "Idle"},
+    {"type": "joystick", "userid": True, "joystick": "Idle"},
+    {"type": "joystick", "userid": 256, "joystick": "Idle"},
+    {"type": "buttons", "userid": 1, "buttons": "A"},
+    {"type": "dance", "userid": 1},
+])
+def test_text_message_rejects_malformed(message):
+    with pytest.raises(ValueError):
+        parse_text_message(message, LatestInputs())
+
+
+def test_sequence_wraps():
+    assert is_newer(0, 65535)
+    assert not is_newer(65535, 0)
+    assert not is_newer(10, 10)
+    assert is_newer(None, 10)
+
+
+def test_latest_inputs_drops_out_of_order_frames():
+    inputs = LatestInputs()
+    assert inputs.update(decode_joystick_frame(encode_joystick_frame(1, 10, 0, 0.1, 0, 0)))
+    assert not inputs.update(decode_joystick_frame(encode_joystick_frame(1, 9, 0, 0.9, 0, 0)))
+    assert inputs.update(decode_joystick_frame(encode_joystick_frame(1, 11, 0, 0.2, 0, 0)))
+    assert inputs.out_of_order == {1: 1}
+    assert inputs.superseded == {1: 1}
+    assert math.isclose(inputs.snapshot()[1]["x"], 0.2, abs_tol=1e-4)
@@ -0,0 +1,57 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from decision_budget import DecisionBudget
+
+
+def robot(robot_id, team):
+    return SimpleNamespace(robot_id=robot_id, team=team)
+
+
+def test_overrides_and_unlimited_budgets():
+    budget = DecisionBudget(robot_budget=0.002, team_budget=None, robot_budgets={"A1": 0.005}, team_budgets={"B": 0.01})
+    assert budget.get_robot_budget(robot("A1", "A")) == 0.005
+    assert budget.get_robot_budget(robot("A2", "A")) == 0.002
+    assert budget.team_time_left("A") is None
+    assert not budget.team_exhausted("A")
+    assert budget.team_time_left("B") == 0.01
+    assert DecisionBudget(robot_budget=None, team_budget=None).deadline_for(robot("A1", "A")) is None
+
+
+def test_charge_counts_overruns_and_team_time():
+    budget = DecisionBudget(robot_budget=0.001, team_budget=0.003)
+    a1, a2 = robot("A1", "A"), robot("A2", "A")
+    assert not budget.charge(a1, 0.0005)
+    assert budget.charge(a2, 0.002)
+    assert budget.team_time_left("A") == pytest.approx(0.0005)
+    assert budget.charge(a1, 0.0015)
+    assert budget.team_exhausted("A")
+    assert budget.stats()["overruns"] == {"A2": 1, "A1": 1}
+
+
+def test_deadline_is_the_tighter_of_robot_and_team_budget():
+    budget = DecisionBudget(robot_budget=0.010, team_budget=0.004)
+    a1 = robot("A1", "A")
+    budget.charge(a1, 0.003)
+    before = time.perf_counter()
+    deadline = budget.deadline_for(a1)
+    assert before + 0.001 - 1e-6 <= deadline <= time.perf_counter() + 0.001 + 1e-6
+
+
+def test_start_tick_resets_team_time():
+    budget = DecisionBudget(robot_budget=None, team_budget=0.001)
+    budget.charge(robot("B1", "B"), 0.002)
+    assert budget.team_exhausted("B")
+    budget.start_tick()
+    assert not budget.team_exhausted("B")
+    assert budget.ticks == 1
+
+
+def test_cached_decisions_are_counted():
+    budget = DecisionBudget()
+    budget.record_cached_decision(robot("A1", "A"))
+    budget.record_cached_decision(robot("A1", "A"))
+    assert budget.stats()["cached_decisions"] == {"A1": 2}
+    assert budget.stats()["total_cached_decisions"] == 2
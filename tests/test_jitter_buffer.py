@@ -0,0 +1,98 @@
+import pytest
+
+from jitter_buffer import FRAME_INTERVAL_MS, INTERVAL_ADAPT_GAPS, BufferedInputs, JitterBuffer
+
+
+def frame(seq, timestamp, x=0.0, buttons=0, user_id=1):
+    return {"userid": user_id, "seq": seq, "timestamp": timestamp, "x": x, "y": 0.0, "buttons": buttons}
+
+
+def feed(buffer, count, interval_ms=20, start_seq=0, start_ms=0, transit_ms=50):
+    # count frames sent every interval_ms with a constant transit - x counts the frames
+    for i in range(count):
+        timestamp = start_ms + i * interval_ms
+        buffer.push(frame((start_seq + i) % 65536, timestamp % 2**32, x=i / 100), (timestamp + transit_ms) / 1000)
+
+
+def test_legacy_frames_pass_straight_through():
+    buffer = JitterBuffer()
+    legacy = {"userid": 1, "seq": None, "timestamp": None, "x": 0.3, "y": 0.0, "buttons": 0}
+    buffer.push(legacy, 10.0)
+    released = buffer.release(10.0)
+    assert released["x"] == 0.3 and released["sent_at"] == 10.0
+
+
+def test_nothing_is_released_before_the_first_frame_is_due():
+    buffer = JitterBuffer()
+    assert buffer.release(0.0) is None
+    buffer.push(frame(0, 0), 0.05)
+    assert buffer.release(0.05) is None # Held for the playout delay
+    assert buffer.release(0.5) is not None
+
+
+def test_playout_interpolates_between_frames():
+    buffer = JitterBuffer()
+    feed(buffer, 10)
+    playout_ms = 50 + 60 + buffer.delay_ms # Halfway through the transit-adjusted timeline, at client time 60 + delay
+    released = buffer.release(playout_ms / 1000)
+    # The delay slews towards its target by at most a millisecond per tick, so the point played is near client time 60
+    assert 0.02 <= released["x"] <= 0.04
+    assert buffer.stats()["released"] == 1
+
+
+def test_duplicates_and_stale_frames_are_dropped():
+    buffer = JitterBuffer()
+    feed(buffer, 5)
+    buffer.push(frame(4, 80), 0.2)
+    assert buffer.duplicates == 1
+    buffer.release(10.0) # Plays everything
+    buffer.push(frame(2, 40), 10.0)
+    buffer.push(frame(4, 80), 10.0)
+    assert buffer.stale == 1
+    assert buffer.duplicates == 2
+
+
+def test_sequence_and_timestamp_wrap():
+    buffer = JitterBuffer()
+    feed(buffer, 10, start_seq=65530, start_ms=2**32 - 100)
+    assert [f[0] for f in buffer.frames] == list(range(65530, 65540))
+    assert buffer.stale == 0 and buffer.duplicates == 0
+    unwrapped = JitterBuffer()
+    feed(unwrapped, 10)
+    assert buffer.interval_ms == pytest.approx(unwrapped.interval_ms) # No gap of a whole counter period
+    assert buffer.jitter_ms == pytest.approx(unwrapped.jitter_ms, abs=1e-3)
+
+
+def test_taps_inside_one_tick_are_kept():
+    buffer = JitterBuffer()
+    feed(buffer, 3)
+    buffer.push(frame(3, 60, buttons=0b1), 0.11)
+    buffer.push(frame(4, 80), 0.13)
+    released = buffer.release(10.0)
+    assert released["buttons"] == 0b1
+
+
+def test_a_pause_does_not_change_the_interval():
+    buffer = JitterBuffer()
+    feed(buffer, 20, interval_ms=16)
+    interval = buffer.interval_ms
+    buffer.push(frame(20, 16 * 19 + 100), 1.0) # One long gap, then the normal rate again
+    feed(buffer, 5, interval_ms=16, start_seq=21, start_ms=16 * 19 + 116)
+    assert buffer.interval_ms == pytest.approx(interval, abs=1.0)
+
+
+def test_a_steady_slower_rate_becomes_the_interval():
+    buffer = JitterBuffer()
+    feed(buffer, INTERVAL_ADAPT_GAPS + 1, interval_ms=100)
+    assert buffer.interval_ms == 100
+    assert FRAME_INTERVAL_MS < 100
+
+
+def test_buffered_inputs_keep_one_buffer_per_user():
+    inputs = BufferedInputs()
+    inputs.push(frame(0, 0, x=0.1, user_id=1), 0.05)
+    inputs.push(frame(0, 0, x=0.2, user_id=2), 0.05)
+    polled = inputs.poll(1.0)
+    assert {user_id: values["x"] for user_id, values in polled.items()} == {1: 0.1, 2: 0.2}
+    inputs.remove(1)
+    assert list(inputs.poll(1.0)) == [2]
@@ -0,0 +1,72 @@
+import math
+
+import pytest
+
+from api.match_stream import (
+    FIELD_COUNT,
+    FIELDS,
+    POSITION_SCALE,
+    ROBOT_IDS,
+    decode_frame,
+    encode_delta,
+    encode_keyframe,
+    encode_state,
+    quantize_snapshot,
+)
+
+
+def snapshot(ball_x=450.0, score_a=0):
+    robots = []
+    for i in range(len(ROBOT_IDS)):
+        robots.extend((100.0 + i, 200.0, math.pi / 2))
+    return (7, 1, ball_x, 300.0, *robots, score_a, 0, 12.34, 0.5)
+
+
+def test_quantize_snapshot():
+    values = quantize_snapshot(snapshot())
+    assert len(values) == FIELD_COUNT
+    fields = dict(zip(FIELDS, values))
+    assert fields["ball_x"] == 450 * POSITION_SCALE
+    assert fields["A1_angle"] == 65536 // 4
+    assert fields["timer"] == 123
+    assert fields["possession_a"] == 50
+    assert fields["game_state"] == 1
+
+
+def test_quantize_clamps_to_uint16():
+    values = quantize_snapshot(snapshot(ball_x=-5.0))
+    assert values[0] == 0
+    assert quantize_snapshot(snapshot(ball_x=1e9))[0] == 0xFFFF
+
+
+def test_keyframe_round_trip():
+    values = quantize_snapshot(snapshot())
+    keyframes = {}
+    assert decode_frame(encode_keyframe(2**32 + 3, 9, values), keyframes) == (3, 9, values)
+    assert keyframes == {9: values}
+
+
+def test_delta_carries_only_changed_fields():
+    base = quantize_snapshot(snapshot())
+    values = quantize_snapshot(snapshot(ball_x=451.0, score_a=1))
+    keyframes = {}
+    decode_frame(encode_keyframe(0, 1, base), keyframes)
+    delta = encode_delta(5, 1, base, values)
+    assert len(delta) == len(encode_delta(5, 1, base, base)) + 2 * 2
+    assert decode_frame(delta, keyframes) == (5, None, values)
+
+
+def test_delta_against_unknown_keyframe_is_rejected():
+    values = quantize_snapshot(snapshot())
+    with pytest.raises(ValueError):
+        decode_frame(encode_delta(5, 2, values, values), {1: values})
+
+
+def test_state_round_trip():
+    values = quantize_snapshot(snapshot())
+    assert decode_frame(encode_state(11, values), {}) == (11, None, values)
+
+
+def test_unknown_frame_type_is_rejected():
+    with pytest.raises(ValueError):
+        decode_frame(bytes([99]) + bytes(8), {})
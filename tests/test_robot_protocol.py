@@ -0,0 +1,41 @@
+import pytest
+
+from robot_protocol import ACK, COMMAND, LIMIT, decode_ack, decode_command, encode_ack, encode_command, is_newer
+
+
+def test_command_round_trip():
+    packet = encode_command(2, 65537, 2**32 + 9, 150, -1500)
+    assert len(packet) == COMMAND.size
+    assert decode_command(packet) == (2, 1, 9, 150, -1500)
+
+
+def test_command_setpoints_are_clamped():
+    assert decode_command(encode_command(0, 0, 0, 10**6, -10**6))[3:] == (LIMIT, -LIMIT)
+
+
+def test_ack_round_trip():
+    packet = encode_ack(4, 123, 456)
+    assert len(packet) == ACK.size
+    assert decode_ack(packet) == (4, 123, 456)
+
+
+@pytest.mark.parametrize("index", range(COMMAND.size))
+def test_command_with_a_flipped_bit_is_rejected(index):
+    packet = bytearray(encode_command(1, 42, 1000, 100, 200))
+    packet[index] ^= 0x10
+    assert decode_command(bytes(packet)) is None
+
+
+def test_malformed_packets_are_rejected():
+    command = encode_command(1, 1, 1, 1, 1)
+    ack = encode_ack(1, 1, 1)
+    assert decode_command(command[:-1]) is None
+    assert decode_command(ack) is None # Wrong size and magic
+    assert decode_ack(command) is None
+    assert decode_ack(bytes([0xA5]) + ack[1:-2] + b"\0\0") is None # Right magic, bad CRC
+
+
+def test_sequence_wraps():
+    assert is_newer(1, 65535)
+    assert not is_newer(65535, 1)
+    assert not is_newer(7, 7)
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from api.rooms import InProcessBroker, RoomManager, SQLiteBroker
+
+
+@pytest.fixture(params=["inprocess", "sqlite"])
+def broker(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBroker(str(tmp_path / "rooms.sqlite3"))
+    return InProcessBroker()
+
+
+def test_claim_keeps_a_live_owner(broker):
+    async def scenario():
+        await broker.heartbeat("w1", "http://w1")
+        await broker.heartbeat("w2", "http://w2")
+        assert await broker.claim("room", "w1", "http://w1") == ("w1", "http://w1")
+        assert await broker.claim("room", "w2", "http://w2") == ("w1", "http://w1")
+        assert await broker.locate("room") == ("w1", "http://w1")
+
+    asyncio.run(scenario())
+
+
+def test_release_only_by_the_owner(broker):
+    async def scenario():
+        await broker.heartbeat("w1", "http://w1")
+        await broker.heartbeat("w2", "http://w2")
+        await broker.claim("room", "w1", "http://w1")
+        await broker.release("room", "w2")
+        assert await broker.claim("room", "w2", "http://w2") == ("w1", "http://w1")
+        await broker.release("room", "w1")
+        assert await broker.claim("room", "w2", "http://w2") == ("w2", "http://w2")
+
+    asyncio.run(scenario())
+
+
+def test_dead_owner_is_taken_over(broker):
+    async def scenario():
+        broker.worker_timeout = 0.05
+        await broker.heartbeat("w1", "http://w1")
+        await broker.claim("room", "w1", "http://w1")
+        await asyncio.sleep(0.1)
+        await broker.heartbeat("w2", "http://w2")
+        assert await broker.claim("room", "w2", "http://w2") == ("w2", "http://w2")
+
+    asyncio.run(scenario())
+
+
+def test_locate_picks_the_least_loaded_worker(broker):
+    async def scenario():
+        await broker.heartbeat("w1", "http://w1")
+        await broker.heartbeat("w2", "http://w2")
+        await broker.claim("a", "w1", "http://w1")
+        assert await broker.locate("b") == ("w2", "http://w2")
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_sockets_share_one_room():
+    async def scenario():
+        manager = RoomManager()
+        await manager.broker.heartbeat(manager.worker_id, "")
+        results = await asyncio.gather(*(manager.acquire("room") for _ in range(5)))
+        rooms = {id(room) for room, _ in results}
+        assert len(rooms) == 1 and manager.created == 1
+        assert results[0][0].sockets == 5
+
+    asyncio.run(scenario())
+
+
+def test_max_rooms_holds_for_concurrent_new_rooms():
+    async def scenario():
+        async def slow_simulation(room_id):
+            await asyncio.sleep(0.01)
+            return None
+
+        manager = RoomManager(simulation_factory=slow_simulation, max_rooms=2)
+        await manager.broker.heartbeat(manager.worker_id, "")
+        results = await asyncio.gather(*(manager.acquire(f"room{i}") for i in range(5)))
+        assert sum(room is not None for room, _ in results) == 2
+        assert results[4] == (None, None)
+        assert len(manager.rooms) == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_build_releases_the_claim():
+    async def scenario():
+        async def broken_simulation(room_id):
+            raise RuntimeError("no simulation")
+
+        manager = RoomManager(simulation_factory=broken_simulation)
+        await manager.broker.heartbeat(manager.worker_id, "")
+        with pytest.raises(RuntimeError):
+            await manager.acquire("room")
+        assert "room" not in manager.broker.owners
+        assert not manager.creating
+
+    asyncio.run(scenario())
+
+
+def test_idle_room_is_collected_and_released():
+    async def scenario():
+        manager = RoomManager(idle_timeout=0)
+        await manager.broker.heartbeat(manager.worker_id, "")
+        room, _ = await manager.acquire("room")
+        manager.release(room)
+        await manager.collect_garbage()
+        assert manager.rooms == {} and manager.collected == 1
+        assert "room" not in manager.broker.owners
+
+    asyncio.run(scenario())